@@ -0,0 +1,115 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from certificates.models import Certificate
+from certificates.regeneration import regenerate_certificates
+
+
+class Command(BaseCommand):
+    help = 'Regenerate certificate QR codes and PDFs in parallel (e.g. after a rebranding)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course', type=int, action='append', dest='course_ids',
+            help='Only certificates of this course id (repeatable)',
+        )
+        parser.add_argument(
+            '--interactive-course', type=int, action='append', dest='interactive_course_ids',
+            help='Only certificates of this interactive course id (repeatable)',
+        )
+        parser.add_argument(
+            '--issued-from', help='Only certificates issued on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--issued-to', help='Only certificates issued on or before this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--missing-pdf', action='store_true',
+            help='Only certificates that have no PDF yet',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Render processes (default: one per CPU, 1 renders in-process)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Certificates per bulk update (default: 200)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording the last regenerated certificate id; an existing '
+                 'checkpoint resumes the run after that id, and it is removed on completion',
+        )
+
+    def _parse_date(self, value, option):
+        date = parse_date(value) if value else None
+        if value and date is None:
+            raise CommandError(f'{option} must be a date in YYYY-MM-DD format')
+        return date
+
+    def handle(self, *args, **options):
+        queryset = Certificate.objects.all()
+        if options['course_ids'] or options['interactive_course_ids']:
+            queryset = queryset.filter(
+                Q(course_id__in=options['course_ids'] or [])
+                | Q(interactive_course_id__in=options['interactive_course_ids'] or [])
+            )
+        issued_from = self._parse_date(options['issued_from'], '--issued-from')
+        if issued_from:
+            queryset = queryset.filter(issue_date__date__gte=issued_from)
+        issued_to = self._parse_date(options['issued_to'], '--issued-to')
+        if issued_to:
+            queryset = queryset.filter(issue_date__date__lte=issued_to)
+        if options['missing_pdf']:
+            queryset = queryset.filter(Q(pdf_file='') | Q(pdf_file__isnull=True))
+
+        checkpoint = options['checkpoint']
+        start_after = None
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                start_after = int(f.read().strip() or 0) or None
+            if start_after:
+                self.stdout.write(f'Resuming after certificate #{start_after}')
+
+        remaining = queryset if start_after is None else queryset.filter(pk__gt=start_after)
+        total = remaining.count()
+        self.stdout.write(f'Regenerating {total} certificate(s)')
+
+        started = time.monotonic()
+        done = 0
+
+        def on_batch(last_id, regenerated, failed):
+            nonlocal done
+            done += regenerated + len(failed)
+            if checkpoint:
+                with open(checkpoint, 'w') as f:
+                    f.write(str(last_id))
+            for certificate_id, error in failed:
+                self.stderr.write(f'Certificate #{certificate_id} failed: {error}')
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'  {done}/{total} processed ({done / elapsed:.1f}/s), last id #{last_id}'
+            )
+
+        regenerated, failed = regenerate_certificates(
+            queryset,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            start_after=start_after,
+            on_batch=on_batch,
+        )
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.monotonic() - started
+        rate = regenerated / elapsed if elapsed else 0
+        message = f'Regenerated {regenerated} certificate(s) in {elapsed:.1f}s ({rate:.1f}/s)'
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{message}, {failed} failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
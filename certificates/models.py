@@ -3,10 +3,6 @@ from django.conf import settings
 from courses.models import Course
 from videos.models import InteractiveCourse
 from django.utils import timezone
-import qrcode
-from io import BytesIO
-from django.core.files import File
-import os
 
 class Certificate(models.Model):
     """Certificate model for course completion"""
@@ -39,46 +35,11 @@ class Certificate(models.Model):
         return 'Risk Management Program'
     
     def generate_qr_code(self):
-        """Generate QR code for certificate verification with comprehensive user details"""
-        import json
-        from django.utils import timezone
-        
-        course_title = self.get_course_title()
-        
-        # Create comprehensive, immediately readable QR data - no web lookup needed
-        qr_text = f"""🏆 CERTIFICATE OF COMPLETION 🏆
+        """
+        Generate the QR code for certificate verification.
 
-📜 Certificate #: {self.certificate_number}
-👤 Full Name: {self.user.get_full_name()}
-📧 Email: {self.user.email}
-🆔 Username: {self.user.username}
-📚 Course: {course_title}
-📊 Final Score: {self.overall_score:.1f}%
-📅 Completed: {self.issue_date.strftime('%B %d, %Y')}
-🏦 Issuing Bank: Co-operative Bank of Tanzania PLC
-🏢 Department: Risk Management & Compliance
-🌐 Website: www.coopbank.co.tz
-✅ Status: VALID & AUTHENTIC
+        What it encodes depends on CERTIFICATE_QR_PAYLOAD (see certificates.qr).
+        """
+        from .qr import store_certificate_qr
 
-This certificate confirms successful completion of the Risk Management training program with a score of {self.overall_score:.1f}%. 
-
-Verification: {self.verification_url}
-Generated: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} EAT"""
-        
-        qr = qrcode.QRCode(
-            version=4,  # Larger version for more detailed data
-            error_correction=qrcode.constants.ERROR_CORRECT_M,  # Medium error correction for larger data
-            box_size=12,  # Good balance of size and scannability
-            border=2,  # Minimal border
-        )
-        qr.add_data(qr_text)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        filename = f'{self.certificate_number}_qr.png'
-        self.qr_code.save(filename, File(buffer), save=False)
-        buffer.close()
+        self.qr_code.name = store_certificate_qr(self)
@@ -0,0 +1,107 @@
+"""
+Certificate QR codes.
+
+CERTIFICATE_QR_PAYLOAD picks what the QR code holds:
+
+- 'full': the certificate details as readable text, so a phone shows them
+  without a web lookup. Needs a large (slow to encode) symbol.
+- 'compact': the verification URL plus a short signed token, which fits a
+  small symbol and scans faster. The token lets the verify page reject
+  links that were not issued by us.
+
+Rendered images are stored under the hash of their payload and encoding
+parameters, so an identical payload (e.g. regenerating a certificate) reuses
+the stored image instead of encoding it again.
+"""
+import hashlib
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.crypto import constant_time_compare
+
+QR_UPLOAD_DIR = 'certificates/qr_codes'
+
+# Characters of the HMAC kept in compact payloads (72 bits)
+VERIFICATION_TOKEN_LENGTH = 12
+
+QR_PARAMS = {
+    'full': {'version': 4, 'error_correction': qrcode.constants.ERROR_CORRECT_M, 'box_size': 12, 'border': 2},
+    'compact': {'version': 1, 'error_correction': qrcode.constants.ERROR_CORRECT_M, 'box_size': 10, 'border': 2},
+}
+
+
+def get_payload_mode():
+    mode = getattr(settings, 'CERTIFICATE_QR_PAYLOAD', 'full')
+    return mode if mode in QR_PARAMS else 'full'
+
+
+def verification_token(certificate_number):
+    """Short signature of a certificate number, used in compact QR links"""
+    signature = signing.Signer(salt='certificates.qr').signature(certificate_number)
+    return signature[:VERIFICATION_TOKEN_LENGTH]
+
+
+def check_verification_token(certificate_number, token):
+    return constant_time_compare(verification_token(certificate_number), token or '')
+
+
+def full_payload(certificate):
+    """Readable certificate details; no web lookup needed"""
+    user = certificate.user
+    score = f'{certificate.overall_score:.1f}'
+    return f"""🏆 CERTIFICATE OF COMPLETION 🏆
+
+📜 Certificate #: {certificate.certificate_number}
+👤 Full Name: {user.get_full_name()}
+📧 Email: {user.email}
+🆔 Username: {user.username}
+📚 Course: {certificate.get_course_title()}
+📊 Final Score: {score}%
+📅 Completed: {certificate.issue_date.strftime('%B %d, %Y')}
+🏦 Issuing Bank: Co-operative Bank of Tanzania PLC
+🏢 Department: Risk Management & Compliance
+🌐 Website: www.coopbank.co.tz
+✅ Status: VALID & AUTHENTIC
+
+This certificate confirms successful completion of the Risk Management training program with a score of {score}%.
+
+Verification: {certificate.verification_url}"""
+
+
+def compact_payload(certificate):
+    """Verification URL with a signed token"""
+    token = verification_token(certificate.certificate_number)
+    return f'{certificate.verification_url}?t={token}'
+
+
+def render_qr_png(payload, mode='full'):
+    """Encode a payload as a QR code PNG"""
+    qr = qrcode.QRCode(**QR_PARAMS[mode])
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def store_certificate_qr(certificate):
+    """
+    Store the QR code image of a certificate and return its storage name.
+
+    The name is derived from the payload, so unchanged payloads are not
+    encoded or written again.
+    """
+    mode = get_payload_mode()
+    payload = compact_payload(certificate) if mode == 'compact' else full_payload(certificate)
+
+    key = hashlib.sha256(f'{mode}:{sorted(QR_PARAMS[mode].items())}\n{payload}'.encode('utf-8'))
+    name = f'{QR_UPLOAD_DIR}/{key.hexdigest()[:32]}.png'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(render_qr_png(payload, mode)))
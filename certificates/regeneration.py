@@ -0,0 +1,116 @@
+"""
+Bulk regeneration of certificate QR codes and PDFs.
+
+The parent process pages through certificates in id order with their user
+and course already joined. Worker processes render the QR codes and PDFs and
+write the files, and the parent stores the new file names with one
+bulk_update per batch. Callers get the last certificate id of every batch so
+an interrupted run can be resumed from there.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from .models import Certificate
+
+
+def _init_worker():
+    # Spawned workers (Windows) start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def _render(certificate):
+    """
+    Render and store the files of one certificate (runs in a worker).
+
+    Returns (qr_code_name, pdf_file_name, error).
+    """
+    from .views import generate_certificate_pdf
+
+    try:
+        certificate.generate_qr_code()
+        generate_certificate_pdf(certificate)
+    except Exception as e:
+        return None, None, f'{type(e).__name__}: {e}'
+    return certificate.qr_code.name, certificate.pdf_file.name, None
+
+
+def _store_batch(batch, previous, results):
+    """Save the new file names of a batch and delete the files they replace"""
+    regenerated = []
+    failed = []
+    replaced = []
+    for certificate, old_names, (qr_name, pdf_name, error) in zip(batch, previous, results):
+        if error:
+            failed.append((certificate.pk, error))
+            continue
+        replaced += [name for name in old_names if name and name not in (qr_name, pdf_name)]
+        certificate.qr_code = qr_name
+        certificate.pdf_file = pdf_name
+        regenerated.append(certificate)
+
+    Certificate.objects.bulk_update(regenerated, ['qr_code', 'pdf_file'])
+
+    storage = Certificate._meta.get_field('pdf_file').storage
+    for name in replaced:
+        storage.delete(name)
+
+    return len(regenerated), failed
+
+
+def regenerate_certificates(queryset=None, workers=None, batch_size=200, start_after=None, on_batch=None):
+    """
+    Regenerate the QR code and PDF of every certificate in ``queryset``.
+
+    ``workers`` is the number of render processes (default: one per CPU, 1
+    renders in this process). Certificates with an id up to ``start_after``
+    are skipped. ``on_batch(last_id, regenerated, failed)`` is called after
+    each batch is saved, ``failed`` being a list of (certificate_id, error).
+
+    Returns (regenerated, failed) totals.
+    """
+    if queryset is None:
+        queryset = Certificate.objects.all()
+    queryset = queryset.select_related('user', 'course', 'interactive_course').order_by('pk')
+
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1:
+        # Workers never touch the database; don't hand them our connections
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    total_regenerated = 0
+    total_failed = 0
+    last_id = start_after
+    try:
+        while True:
+            page = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+            batch = list(page[:batch_size])
+            if not batch:
+                break
+
+            # Rendering in-process updates the instances, remember what they replace
+            previous = [(c.qr_code.name, c.pdf_file.name) for c in batch]
+            if pool is None:
+                results = [_render(certificate) for certificate in batch]
+            else:
+                chunksize = max(1, len(batch) // (workers * 4))
+                results = list(pool.map(_render, batch, chunksize=chunksize))
+
+            regenerated, failed = _store_batch(batch, previous, results)
+            total_regenerated += regenerated
+            total_failed += len(failed)
+            last_id = batch[-1].pk
+
+            if on_batch:
+                on_batch(last_id, regenerated, failed)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return total_regenerated, total_failed
@@ -0,0 +1,41 @@
+"""
+Background rendering of certificate QR codes and PDFs.
+
+Issuing a certificate only creates the database record; the QR code and
+PDF are rendered here after the issuing transaction commits. The download
+view renders on demand if it gets there first.
+"""
+from django.db import transaction
+
+from risk_lms.background import background_task, enqueue
+from .models import Certificate
+
+
+def render_certificate(certificate):
+    """Generate the QR code and PDF of a certificate and store them"""
+    from .views import generate_certificate_pdf
+
+    certificate.generate_qr_code()
+    generate_certificate_pdf(certificate)
+    certificate.save(update_fields=['qr_code', 'pdf_file'])
+
+
+@background_task
+def render_certificate_task(certificate_id):
+    certificate = Certificate.objects.select_related(
+        'user', 'course', 'interactive_course'
+    ).filter(pk=certificate_id).first()
+
+    # Deleted meanwhile, or already rendered by a download
+    if certificate is None or certificate.pdf_file:
+        return
+
+    # Failures are logged by Celery or the thread-pool runner; the download
+    # view renders again when the PDF is missing
+    render_certificate(certificate)
+
+
+def queue_certificate_render(certificate):
+    """Render a newly issued certificate once its transaction has committed"""
+    certificate_id = certificate.id
+    transaction.on_commit(lambda: enqueue(render_certificate_task, certificate_id))
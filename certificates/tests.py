@@ -0,0 +1,156 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from reportlab import rl_config
+
+from accounts.models import User
+from courses.models import Course
+
+from .models import Certificate
+from .qr import check_verification_token, verification_token
+from .regeneration import regenerate_certificates
+from .tasks import render_certificate_task
+from .views import generate_certificate_pdf, get_certificate_logo
+
+
+def make_user(username, role='banker', **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **extra
+    )
+
+
+class CertificateTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker', first_name='Asha', last_name='Mushi')
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_certificate(self, number='CERT-1', **extra):
+        return Certificate.objects.create(
+            user=self.banker, course=self.course, certificate_number=number, overall_score=92.5,
+            verification_url=f'http://testserver/certificates/verify/{number}/', **extra
+        )
+
+
+class RenderCertificateTests(CertificateTestCase):
+    def test_task_renders_qr_code_and_pdf(self):
+        certificate = self.make_certificate()
+        render_certificate_task(certificate.id)
+        certificate.refresh_from_db()
+        self.assertTrue(certificate.qr_code.name)
+        with certificate.pdf_file.open('rb') as pdf:
+            content = pdf.read()
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertNotIn(b'ASCII85Decode', content)
+
+    def test_render_leaves_reportlab_settings_alone(self):
+        certificate = self.make_certificate()
+        default = rl_config.useA85
+        render_certificate_task(certificate.id)
+        self.assertEqual(rl_config.useA85, default)
+
+    def test_failure_is_raised_not_logged(self):
+        certificate = self.make_certificate()
+        with mock.patch('certificates.tasks.render_certificate', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError), self.assertNoLogs('certificates', level='ERROR'):
+                render_certificate_task(certificate.id)
+
+    def test_rendered_certificate_is_skipped(self):
+        certificate = self.make_certificate(pdf_file='certificates/pdfs/CERT-1.pdf')
+        with mock.patch('certificates.tasks.render_certificate') as render:
+            render_certificate_task(certificate.id)
+        render.assert_not_called()
+
+
+class CertificatePdfTests(CertificateTestCase):
+    def test_logo_is_decoded_once_per_process(self):
+        self.assertIs(get_certificate_logo(), get_certificate_logo())
+
+    def test_assets_are_embedded_once(self):
+        certificate = self.make_certificate()
+        certificate.generate_qr_code()
+        generate_certificate_pdf(certificate)
+        with certificate.pdf_file.open('rb') as pdf:
+            content = pdf.read()
+        # The logo (watermark and header), its alpha mask and the QR code
+        self.assertEqual(content.count(b'/Subtype /Image'), 3)
+        # One gradient shading per banner instead of painted strips
+        self.assertEqual(content.count(b'/ShadingType'), 2)
+
+
+class RegenerateCertificatesTests(CertificateTestCase):
+    def setUp(self):
+        super().setUp()
+        self.certificates = [self.make_certificate(f'CERT-{i}') for i in range(3)]
+
+    def test_regenerates_in_batches(self):
+        batches = []
+        totals = regenerate_certificates(
+            workers=1, batch_size=2, on_batch=lambda *batch: batches.append(batch)
+        )
+        self.assertEqual(totals, (3, 0))
+        ids = [certificate.pk for certificate in self.certificates]
+        self.assertEqual(batches, [(ids[1], 2, []), (ids[2], 1, [])])
+        for certificate in Certificate.objects.all():
+            self.assertTrue(certificate.qr_code.name)
+            self.assertTrue(certificate.pdf_file.storage.exists(certificate.pdf_file.name))
+
+    def test_resumes_after_last_batch(self):
+        totals = regenerate_certificates(workers=1, start_after=self.certificates[1].pk)
+        self.assertEqual(totals, (1, 0))
+        self.assertEqual(
+            list(Certificate.objects.exclude(pdf_file='').values_list('pk', flat=True)),
+            [self.certificates[2].pk],
+        )
+
+    def test_failures_are_reported_and_skipped(self):
+        with mock.patch('certificates.views.generate_certificate_pdf', side_effect=OSError('disk full')):
+            failures = []
+            totals = regenerate_certificates(workers=1, on_batch=lambda last_id, done, failed: failures.extend(failed))
+        self.assertEqual(totals, (0, 3))
+        self.assertEqual(failures[0], (self.certificates[0].pk, 'OSError: disk full'))
+        self.assertFalse(Certificate.objects.exclude(pdf_file='').exists())
+
+
+class CertificateQrTests(CertificateTestCase):
+    def test_identical_payload_reuses_image(self):
+        first = self.make_certificate()
+        first.generate_qr_code()
+        name = first.qr_code.name
+        with mock.patch('certificates.qr.render_qr_png') as render:
+            first.generate_qr_code()
+        render.assert_not_called()
+        self.assertEqual(first.qr_code.name, name)
+
+    @override_settings(CERTIFICATE_QR_PAYLOAD='compact')
+    def test_compact_payload_is_smaller(self):
+        compact = self.make_certificate()
+        compact.generate_qr_code()
+        with override_settings(CERTIFICATE_QR_PAYLOAD='full'):
+            full = self.make_certificate('CERT-2')
+            full.generate_qr_code()
+        self.assertNotEqual(compact.qr_code.name, full.qr_code.name)
+        self.assertLess(compact.qr_code.size, full.qr_code.size)
+
+    def test_verification_token(self):
+        token = verification_token('CERT-1')
+        self.assertTrue(check_verification_token('CERT-1', token))
+        self.assertFalse(check_verification_token('CERT-2', token))
+        self.assertFalse(check_verification_token('CERT-1', None))
+
+    def test_verify_page_rejects_forged_token(self):
+        self.make_certificate()
+        url = reverse('certificates:verify', args=['CERT-1'])
+        self.assertTrue(self.client.get(url, {'t': verification_token('CERT-1')}).context['valid'])
+        self.assertTrue(self.client.get(url).context['valid'])
+        self.assertFalse(self.client.get(url, {'t': 'forged'}).context['valid'])
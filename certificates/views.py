@@ -4,19 +4,85 @@ from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from django.db.models import Avg
 from .models import Certificate
+from .qr import check_verification_token
+from .tasks import queue_certificate_render, render_certificate
 from courses.models import Course, Enrollment
 from quizzes.models import QuizAttempt
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+from reportlab.lib.colors import HexColor
+from reportlab import rl_config
+from contextlib import contextmanager
+from functools import lru_cache
+import os
+import threading
 import uuid
 from io import BytesIO
 
+# ReportLab keeps useA85 in a process-wide setting (see _binary_pdf_streams)
+_rl_config_lock = threading.Lock()
+
+# Banner gradients: Navy Blue (#002B5C) -> Blue (#0052CC) -> Green (#00A651)
+BANNER_GRADIENT = [HexColor('#002B5C'), HexColor('#0052CC'), HexColor('#00A651')]
+
+
+@lru_cache(maxsize=1)
+def get_certificate_logo():
+    """
+    The bank logo as an ImageReader, loaded and decoded once per process.
+
+    Returns None if the logo file is missing.
+    """
+    from django.conf import settings
+    from PIL import Image
+
+    logo_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'CoopLogo.png')
+    if not os.path.exists(logo_path):
+        return None
+
+    with Image.open(logo_path) as image:
+        image.load()
+        reader = ImageReader(image.copy())
+    # Decode the pixel data now so every certificate reuses it
+    reader.getRGBData()
+    return reader
+
+
+@contextmanager
+def _binary_pdf_streams():
+    """
+    Write PDF streams as binary instead of ASCII85 for the duration; the
+    pure-Python ASCII85 encoder was more than half the time spent rendering
+    a certificate. The setting is global, so renders take turns and other
+    PDFs made in the process keep ReportLab's default.
+    """
+    with _rl_config_lock:
+        previous = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            yield
+        finally:
+            rl_config.useA85 = previous
+
+
+def _draw_gradient_band(p, x, y, width, height, colors, top_down=True):
+    """Fill a rectangle with a single vertical gradient shading"""
+    p.saveState()
+    path = p.beginPath()
+    path.rect(x, y, width, height)
+    p.clipPath(path, stroke=0, fill=0)
+    if top_down:
+        p.linearGradient(x, y + height, x, y, colors, extend=False)
+    else:
+        p.linearGradient(x, y, x, y + height, colors, extend=False)
+    p.restoreState()
+
 @login_required
 def my_certificates_view(request):
     """Display user's certificates"""
-    certificates = Certificate.objects.filter(user=request.user)
+    certificates = Certificate.objects.filter(user=request.user).select_related('course')
     
     context = {
         'certificates': certificates,
@@ -41,9 +107,8 @@ def download_certificate_view(request, certificate_id):
     certificate = get_object_or_404(Certificate, id=certificate_id, user=request.user)
     
     if not certificate.pdf_file:
-        # Generate PDF if it doesn't exist
-        generate_certificate_pdf(certificate)
-        certificate.save()
+        # Background render hasn't finished yet - render it now
+        render_certificate(certificate)
     
     if certificate.pdf_file:
         response = HttpResponse(
@@ -59,6 +124,11 @@ def download_certificate_view(request, certificate_id):
 def verify_certificate_view(request, certificate_number):
     """Public certificate verification"""
     try:
+        # Compact QR codes carry a signed token; a wrong one is a forged link
+        token = request.GET.get('t')
+        if token is not None and not check_verification_token(certificate_number, token):
+            raise Certificate.DoesNotExist
+
         certificate = Certificate.objects.get(certificate_number=certificate_number)
         
         context = {
@@ -156,13 +226,8 @@ def generate_certificate_view(request):
         verification_url=verification_url
     )
     
-    # Generate QR code
-    certificate.generate_qr_code()
-    
-    # Generate PDF
-    generate_certificate_pdf(certificate)
-    
-    certificate.save()
+    # QR code and PDF are rendered in the background
+    queue_certificate_render(certificate)
     
     return JsonResponse({
         'success': True,
@@ -173,6 +238,11 @@ def generate_certificate_view(request):
 
 def generate_certificate_pdf(certificate):
     """Generate professional A4 PDF certificate with Co-operative Bank Tanzania PLC branding"""
+    with _binary_pdf_streams():
+        return _draw_certificate_pdf(certificate)
+
+
+def _draw_certificate_pdf(certificate):
     buffer = BytesIO()
     
     # Create PDF - A4 Portrait format
@@ -198,65 +268,23 @@ def generate_certificate_pdf(certificate):
     p.rect(0, 0, width, height, fill=True, stroke=False)
     
     # === WATERMARK LOGO IN CENTER BACKGROUND ===
-    try:
-        import os
-        from django.conf import settings
-        logo_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'CoopLogo.png')
-        
-        if os.path.exists(logo_path):
-            p.saveState()
-            watermark_size = 4.5*inch
-            watermark_x = (width - watermark_size) / 2
-            watermark_y = (height - watermark_size) / 2
-            p.setFillAlpha(0.06)
-            p.setStrokeAlpha(0.06)
-            logo_img = ImageReader(logo_path)
-            p.drawImage(logo_img, watermark_x, watermark_y, width=watermark_size, height=watermark_size, mask='auto')
-            p.restoreState()
-    except Exception as e:
-        print(f"Watermark error: {e}")
-    
-    # === ELEGANT TOP BANNER - Smooth Blue to Green Gradient ===
+    logo_img = get_certificate_logo()
+    if logo_img:
+        p.saveState()
+        watermark_size = 4.5*inch
+        watermark_x = (width - watermark_size) / 2
+        watermark_y = (height - watermark_size) / 2
+        p.setFillAlpha(0.06)
+        p.setStrokeAlpha(0.06)
+        p.drawImage(logo_img, watermark_x, watermark_y, width=watermark_size, height=watermark_size, mask='auto')
+        p.restoreState()
+    
+    # === ELEGANT TOP BANNER - Smooth Navy -> Blue -> Green Gradient ===
     banner_height = 1.0*inch
-    num_strips = 60
-    strip_height = banner_height / num_strips
-    
-    for i in range(num_strips):
-        # Smooth gradient from Navy Blue (#002B5C) -> Blue (#0052CC) -> Green (#00A651)
-        if i < num_strips / 2:
-            # Navy to Blue
-            progress = i / (num_strips / 2)
-            r = 0
-            g = int(43 + (82 - 43) * progress)
-            b = int(92 + (204 - 92) * progress)
-        else:
-            # Blue to Green
-            progress = (i - num_strips / 2) / (num_strips / 2)
-            r = 0
-            g = int(82 + (166 - 82) * progress)
-            b = int(204 + (81 - 204) * progress)
-        
-        p.setFillColor(HexColor(f'#{r:02x}{g:02x}{b:02x}'))
-        p.rect(0, height - (i + 1) * strip_height, width, strip_height + 1, fill=True, stroke=False)
-    
-    # === ELEGANT BOTTOM BANNER - Smooth Green to Blue Gradient ===
-    for i in range(num_strips):
-        # Smooth gradient from Green (#00A651) -> Blue (#0052CC) -> Navy Blue (#002B5C)
-        if i < num_strips / 2:
-            # Green to Blue
-            progress = i / (num_strips / 2)
-            r = 0
-            g = int(166 + (82 - 166) * progress)
-            b = int(81 + (204 - 81) * progress)
-        else:
-            # Blue to Navy
-            progress = (i - num_strips / 2) / (num_strips / 2)
-            r = 0
-            g = int(82 + (43 - 82) * progress)
-            b = int(204 + (92 - 204) * progress)
-        
-        p.setFillColor(HexColor(f'#{r:02x}{g:02x}{b:02x}'))
-        p.rect(0, (num_strips - i - 1) * strip_height, width, strip_height + 1, fill=True, stroke=False)
+    _draw_gradient_band(p, 0, height - banner_height, width, banner_height, BANNER_GRADIENT)
+    
+    # === ELEGANT BOTTOM BANNER - Smooth Green -> Blue -> Navy Gradient ===
+    _draw_gradient_band(p, 0, 0, width, banner_height, BANNER_GRADIENT, top_down=False)
     
     # === GRADIENT BORDER (Blue to Green) ===
     # Outer border - Navy Blue
@@ -272,20 +300,12 @@ def generate_certificate_pdf(certificate):
     content_top = height - banner_height - 0.4*inch
     
     # === LOGO SECTION (Top) ===
-    try:
-        import os
-        from django.conf import settings
-        logo_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'CoopLogo.png')
-        
-        if os.path.exists(logo_path):
-            logo_img = ImageReader(logo_path)
-            logo_size = 1.1*inch
-            logo_x = (width - logo_size) / 2
-            p.drawImage(logo_img, logo_x, content_top - logo_size + 0.2*inch, width=logo_size, height=logo_size, mask='auto')
-            content_top -= logo_size + 0.15*inch
-    except Exception as e:
-        print(f"Logo error: {e}")
-        content_top -= 0.3*inch
+    # Same image as the watermark, so the PDF embeds it only once
+    if logo_img:
+        logo_size = 1.1*inch
+        logo_x = (width - logo_size) / 2
+        p.drawImage(logo_img, logo_x, content_top - logo_size + 0.2*inch, width=logo_size, height=logo_size, mask='auto')
+        content_top -= logo_size + 0.15*inch
     
     # === BANK NAME ===
     p.setFillColor(coop_dark_blue)
@@ -0,0 +1,703 @@
+"""
+Excel report pipeline.
+
+Workbooks are built with openpyxl's write-only mode, so rows are flushed to
+disk as they are appended instead of being held in memory. Column widths are
+computed from a sample of the first rows of each sheet (write-only sheets
+need their widths before any row is written), and source rows are pulled
+from querysets in fixed-size chunks.
+
+Reports are generated by background jobs (see ``request_report``) and the
+finished file is kept under MEDIA_ROOT/reports/. Each job records a
+fingerprint of the data it was built from, so repeated downloads are served
+from the stored file until the fingerprint changes.
+"""
+import hashlib
+import logging
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from certificates.models import Certificate
+from courses.models import Course, Enrollment
+from quizzes.models import Question, QuestionOption, QuizAttempt, QuizAnswer
+from videos.models import InteractiveCourse, InteractiveCourseProgress, Video
+from progress.analytics import (
+    build_course_analytics, build_user_progress_list,
+    get_active_interactive_courses, get_bankers,
+)
+from progress.models import ReportJob
+from risk_lms.background import background_task, enqueue
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched per query chunk (kept below the MSSQL 2100 parameter limit)
+CHUNK_SIZE = 1000
+
+# Rows inspected per sheet when sizing columns
+WIDTH_SAMPLE_ROWS = 200
+
+# Header styling
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="002B5C", end_color="002B5C", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+# Performance report header styling
+PERFORMANCE_HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+PERFORMANCE_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+
+# Success styling (green)
+SUCCESS_FILL = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+SUCCESS_FONT = Font(color="006100")
+
+# Warning styling (yellow)
+WARNING_FILL = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+WARNING_FONT = Font(color="9C5700")
+
+# Danger styling (red)
+DANGER_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+DANGER_FONT = Font(color="9C0006")
+
+# Info styling (blue)
+INFO_FILL = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
+INFO_FONT = Font(color="1F4E79")
+
+
+Styled = namedtuple('Styled', ['value', 'font', 'fill', 'alignment'], defaults=[None, None, None])
+
+
+def header(value, fill=HEADER_FILL, alignment=HEADER_ALIGNMENT):
+    return Styled(value, HEADER_FONT, fill, alignment)
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    """Yield lists of up to ``size`` items from ``iterable``"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class SheetWriter:
+    """
+    Write-only worksheet that sizes its columns from the first rows.
+
+    Rows are buffered until ``sample_rows`` have been seen (or the sheet is
+    closed), the column widths are fixed from that sample, and from then on
+    rows go straight to the worksheet.
+    """
+
+    def __init__(self, workbook, title, max_width=40, sample_rows=WIDTH_SAMPLE_ROWS):
+        self.ws = workbook.create_sheet(title)
+        self.max_width = max_width
+        self.sample_rows = sample_rows
+        self._pending = []
+        self._widths = {}
+        self._sized = False
+
+    def append(self, values=()):
+        if self._sized:
+            self._write(values)
+            return
+
+        for col, value in enumerate(values, 1):
+            if isinstance(value, Styled):
+                value = value.value
+            if value is not None:
+                self._widths[col] = max(self._widths.get(col, 0), len(str(value)))
+        self._pending.append(values)
+
+        if len(self._pending) >= self.sample_rows:
+            self._flush()
+
+    def close(self):
+        if not self._sized:
+            self._flush()
+
+    def _flush(self):
+        for col, length in self._widths.items():
+            self.ws.column_dimensions[get_column_letter(col)].width = min(length + 2, self.max_width)
+        self._sized = True
+        for values in self._pending:
+            self._write(values)
+        self._pending = []
+
+    def _write(self, values):
+        row = []
+        for value in values:
+            if isinstance(value, Styled):
+                cell = WriteOnlyCell(self.ws, value=value.value)
+                if value.font is not None:
+                    cell.font = value.font
+                if value.fill is not None:
+                    cell.fill = value.fill
+                if value.alignment is not None:
+                    cell.alignment = value.alignment
+                row.append(cell)
+            else:
+                row.append(value)
+        self.ws.append(row)
+
+
+# ==========================================
+# Course Enrollment & Completion Report
+# ==========================================
+
+def write_course_enrollment_report(fileobj, progress=None):
+    """
+    Write the course enrollment and completion workbook to ``fileobj``.
+
+    ``progress`` is called with the completed percentage after each sheet.
+    """
+    progress = progress or (lambda percent: None)
+    wb = Workbook(write_only=True)
+
+    all_bankers = get_bankers()
+    total_bankers = all_bankers.count()
+    interactive_courses = list(get_active_interactive_courses())
+
+    _write_summary_sheet(wb, all_bankers, total_bankers, interactive_courses)
+    progress(10)
+    _write_staff_progress_sheet(wb, all_bankers, interactive_courses)
+    progress(60)
+    _write_not_started_sheet(wb, all_bankers)
+    progress(70)
+    _write_certified_sheet(wb)
+    progress(85)
+    _write_course_overview_sheet(wb)
+    progress(95)
+
+    wb.save(fileobj)
+
+
+def _write_summary_sheet(wb, all_bankers, total_bankers, interactive_courses):
+    """Sheet 1: Summary Statistics"""
+    sheet = SheetWriter(wb, "Summary")
+
+    total_logged_in = all_bankers.filter(last_login__isnull=False).count()
+    never_logged_in = total_bankers - total_logged_in
+    total_certificates = Certificate.objects.filter(is_valid=True).count()
+
+    sheet.append([Styled("COURSE ENROLLMENT & COMPLETION REPORT", Font(bold=True, size=16))])
+    sheet.append([Styled(f"Generated: {datetime.now().strftime('%d %B %Y %H:%M')}", Font(italic=True))])
+    sheet.append([Styled("Co-operative Bank of Tanzania PLC - Risk Department LMS", Font(italic=True))])
+    sheet.append()
+    sheet.append([Styled("OVERALL STATISTICS", Font(bold=True, size=12))])
+
+    stats = [
+        ("Total Staff (AD Users)", total_bankers),
+        ("Staff Who Have Logged In", total_logged_in),
+        ("Staff Never Logged In", never_logged_in),
+        ("Total Certificates Issued", total_certificates),
+        ("Compliance Rate", f"{round((total_certificates / total_bankers * 100) if total_bankers > 0 else 0, 1)}%"),
+    ]
+    for label, value in stats:
+        sheet.append([Styled(label, Font(bold=True)), value])
+
+    # Per-course statistics
+    sheet.append()
+    sheet.append()
+    sheet.append([Styled("PER-COURSE STATISTICS", Font(bold=True, size=12))])
+
+    course_headers = ["Course Name", "Total Staff", "Enrolled", "Not Started", "In Progress", "Completed Content", "Certified", "Completion Rate"]
+    sheet.append([header(h) for h in course_headers])
+
+    for analytics in build_course_analytics(interactive_courses, total_bankers):
+        sheet.append([
+            analytics['interactive_course'].title,
+            total_bankers,
+            analytics['enrolled_count'],
+            analytics['not_enrolled_count'],
+            analytics['in_progress_count'],
+            analytics['completed_content_count'],
+            analytics['passed_quiz_count'],
+            f"{analytics['completion_rate']}%",
+        ])
+
+    sheet.close()
+
+
+def _write_staff_progress_sheet(wb, all_bankers, interactive_courses):
+    """Sheet 2: Detailed Staff Progress (AD Users)"""
+    sheet = SheetWriter(wb, "Staff Progress (AD)")
+
+    # Build headers dynamically based on courses
+    staff_headers = ["#", "Full Name", "Email (AD Account)", "Last Login", "Login Status"]
+    for ic in interactive_courses:
+        staff_headers.append(f"{ic.title[:30]} - Status")
+        staff_headers.append(f"{ic.title[:30]} - Progress %")
+        staff_headers.append(f"{ic.title[:30]} - Started")
+        staff_headers.append(f"{ic.title[:30]} - Certificate")
+    sheet.append([header(h) for h in staff_headers])
+
+    bankers = all_bankers.order_by('first_name', 'last_name').iterator(chunk_size=CHUNK_SIZE)
+    idx = 0
+    for chunk in chunked(bankers):
+        staff_progress = build_user_progress_list(
+            chunk, interactive_courses, user_ids=[banker.id for banker in chunk]
+        )
+        for user_data in staff_progress:
+            idx += 1
+            banker = user_data['user']
+
+            if banker.last_login:
+                row = [idx, user_data['full_name'], banker.email,
+                       banker.last_login.strftime('%d %b %Y %H:%M'),
+                       Styled("Logged In", SUCCESS_FONT, SUCCESS_FILL)]
+            else:
+                row = [idx, user_data['full_name'], banker.email,
+                       "Never",
+                       Styled("Never Logged In", DANGER_FONT, DANGER_FILL)]
+
+            # Course-specific data
+            for course_data in user_data['courses']:
+                started = course_data['status'] != 'not_started'
+
+                if course_data['has_certificate']:
+                    row.append(Styled("Certified", SUCCESS_FONT, SUCCESS_FILL))
+                elif course_data['content_completed']:
+                    row.append(Styled("Awaiting Quiz", INFO_FONT, INFO_FILL))
+                elif started:
+                    row.append(Styled("In Progress", WARNING_FONT, WARNING_FILL))
+                else:
+                    row.append(Styled("Not Started", DANGER_FONT, DANGER_FILL))
+
+                row.append(course_data['progress'])
+                row.append(course_data['started_at'].strftime('%d %b %Y') if started else "-")
+
+                if course_data['has_certificate']:
+                    row.append(Styled(course_data['certificate_number'], fill=SUCCESS_FILL))
+                else:
+                    row.append("No")
+
+            sheet.append(row)
+
+    sheet.close()
+
+
+def _write_not_started_sheet(wb, all_bankers):
+    """Sheet 3: Not Enrolled Staff"""
+    sheet = SheetWriter(wb, "Not Started")
+
+    not_enrolled_headers = ["#", "Full Name", "Email (AD Account)", "Last Login", "Login Status", "Action Required"]
+    sheet.append([header(h) for h in not_enrolled_headers])
+
+    users_with_progress = set(InteractiveCourseProgress.objects.values_list('user_id', flat=True).distinct())
+
+    idx = 0
+    for banker in all_bankers.order_by('first_name', 'last_name').iterator(chunk_size=CHUNK_SIZE):
+        # Check if user has started any course
+        if banker.id in users_with_progress:
+            continue
+        idx += 1
+        full_name = banker.get_full_name() or banker.username
+
+        if banker.last_login:
+            sheet.append([
+                idx, full_name, banker.email,
+                banker.last_login.strftime('%d %b %Y %H:%M'),
+                Styled("Logged In", fill=WARNING_FILL),
+                "Has logged in but not started course",
+            ])
+        else:
+            sheet.append([
+                idx, full_name, banker.email,
+                "Never",
+                Styled("Never Logged In", DANGER_FONT, DANGER_FILL),
+                "Needs to login and start course",
+            ])
+
+    sheet.close()
+
+
+def _write_certified_sheet(wb):
+    """Sheet 4: Certified Staff"""
+    sheet = SheetWriter(wb, "Certified Staff")
+
+    certified_headers = ["#", "Full Name", "Email", "Course", "Certificate Number", "Issue Date", "Score"]
+    sheet.append([header(h) for h in certified_headers])
+
+    certificates = Certificate.objects.filter(is_valid=True).select_related(
+        'user', 'course', 'interactive_course'
+    ).order_by('-issue_date').iterator(chunk_size=CHUNK_SIZE)
+
+    for idx, cert in enumerate(certificates, 1):
+        sheet.append([
+            idx,
+            cert.user.get_full_name(),
+            cert.user.email,
+            cert.interactive_course.title if cert.interactive_course else cert.course.title if cert.course else "N/A",
+            cert.certificate_number,
+            cert.issue_date.strftime('%d %b %Y') if cert.issue_date else "N/A",
+            f"{cert.overall_score}%" if cert.overall_score else "N/A",
+        ])
+
+    sheet.close()
+
+
+def _write_course_overview_sheet(wb):
+    """Sheet 5: Legacy Course Overview (Original)"""
+    sheet = SheetWriter(wb, "Course Overview")
+
+    overview_headers = [
+        "Course ID", "Course Title", "Created By", "Created Date",
+        "Total Enrollments", "Completed", "In Progress", "Completion Rate (%)",
+        "Avg Quiz Score", "Videos Count", "Questions Count", "Is Published"
+    ]
+    sheet.append([header(h) for h in overview_headers])
+
+    # Per-course aggregates in one grouped query each
+    avg_scores = dict(
+        QuizAttempt.objects.filter(course__isnull=False, completed_at__isnull=False)
+        .values('course_id').annotate(avg=Avg('score')).order_by()
+        .values_list('course_id', 'avg')
+    )
+    courses = Course.objects.select_related('created_by').annotate(
+        total_enrollments=Count('enrollments', distinct=True),
+        completed_enrollments=Count('enrollments', filter=Q(enrollments__is_completed=True), distinct=True),
+        videos_count=Count('videos', distinct=True),
+        questions_count=Count('questions', distinct=True),
+    ).order_by('-created_at')
+
+    for course in courses.iterator(chunk_size=CHUNK_SIZE):
+        total = course.total_enrollments
+        completed = course.completed_enrollments
+        completion_rate = (completed / total * 100) if total > 0 else 0
+        avg_score = avg_scores.get(course.id) or 0
+
+        sheet.append([
+            course.id,
+            course.title,
+            course.created_by.get_full_name() if course.created_by else "N/A",
+            course.created_at.strftime('%Y-%m-%d'),
+            total,
+            completed,
+            total - completed,
+            round(completion_rate, 1),
+            round(avg_score, 1),
+            course.videos_count,
+            course.questions_count,
+            "Yes" if course.is_published else "No",
+        ])
+
+    sheet.close()
+
+
+# ==========================================
+# User Performance Report
+# ==========================================
+
+def write_user_performance_report(fileobj, progress=None):
+    """
+    Write the individual quiz performance workbook to ``fileobj``.
+
+    ``progress`` is called with the completed percentage after each sheet.
+    """
+    progress = progress or (lambda percent: None)
+    wb = Workbook(write_only=True)
+
+    _write_performance_overview_sheet(wb)
+    progress(30)
+    _write_answer_details_sheet(wb)
+    progress(95)
+
+    wb.save(fileobj)
+
+
+def _performance_header(value):
+    return header(value, fill=PERFORMANCE_HEADER_FILL, alignment=PERFORMANCE_HEADER_ALIGNMENT)
+
+
+def _write_performance_overview_sheet(wb):
+    """Quiz Performance Overview: one row per banker and course"""
+    sheet = SheetWriter(wb, "Quiz Performance Overview", max_width=60)
+
+    overview_headers = [
+        "User ID", "Full Name", "Email", "Course Title", "Quiz Attempts",
+        "Best Score", "Latest Score", "Avg Score", "Questions Answered",
+        "Correct Answers", "Wrong Answers", "Accuracy (%)", "Last Attempt Date"
+    ]
+    sheet.append([_performance_header(h) for h in overview_headers])
+
+    bankers = {user.id: user for user in get_bankers().only('id', 'first_name', 'last_name', 'email')}
+    course_titles = dict(Course.objects.values_list('id', 'title'))
+    interactive_titles = dict(InteractiveCourse.objects.values_list('id', 'title'))
+
+    # Single pass over completed attempts, newest first, grouped by user/course
+    groups = {}
+    attempts = QuizAttempt.objects.filter(
+        user__role='banker', completed_at__isnull=False
+    ).filter(
+        Q(course__isnull=False) | Q(interactive_course__isnull=False)
+    ).order_by('-completed_at').values_list('user_id', 'course_id', 'interactive_course_id', 'score', 'completed_at')
+
+    for user_id, course_id, ic_id, score, completed_at in attempts.iterator(chunk_size=CHUNK_SIZE):
+        key = (user_id, course_id, ic_id)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'attempts_count': 0,
+                'scores': [],
+                'latest_score': score if score is not None else 0,
+                'last_attempt': completed_at,
+            }
+        group['attempts_count'] += 1
+        if score is not None:
+            group['scores'].append(score)
+
+    answer_stats = {
+        (row['attempt__user_id'], row['attempt__course_id'], row['attempt__interactive_course_id']): row
+        for row in QuizAnswer.objects.filter(
+            attempt__user__role='banker', attempt__completed_at__isnull=False
+        ).values(
+            'attempt__user_id', 'attempt__course_id', 'attempt__interactive_course_id'
+        ).annotate(
+            total=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+        ).order_by()
+    }
+
+    # Users in id order, their courses most recently attempted first
+    ordered = sorted(groups.items(), key=lambda item: (item[0][0], -item[1]['last_attempt'].timestamp()))
+
+    for (user_id, course_id, ic_id), group in ordered:
+        user = bankers.get(user_id)
+        if user is None:
+            continue
+        scores = group['scores']
+        stats = answer_stats.get((user_id, course_id, ic_id), {})
+        total_answers = stats.get('total', 0)
+        correct_answers = stats.get('correct', 0)
+        accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
+        course_title = course_titles.get(course_id) if course_id else interactive_titles.get(ic_id)
+
+        sheet.append([
+            user.id,
+            user.get_full_name(),
+            user.email,
+            course_title,
+            group['attempts_count'],
+            round(max(scores), 1) if scores else 0,
+            round(group['latest_score'], 1),
+            round(sum(scores) / len(scores), 1) if scores else 0,
+            total_answers,
+            correct_answers,
+            total_answers - correct_answers,
+            round(accuracy, 1),
+            group['last_attempt'].strftime('%Y-%m-%d %H:%M'),
+        ])
+
+    sheet.close()
+
+
+def _write_answer_details_sheet(wb):
+    """Detailed Answer Analysis: one row per answered question"""
+    sheet = SheetWriter(wb, "Detailed Answer Analysis", max_width=60)
+
+    detail_headers = [
+        "User Name", "Email", "Course", "Question Text", "Correct Answer",
+        "User Answer", "Is Correct", "Question Topic", "Difficulty",
+        "Points", "Attempt Date", "Attempt Score"
+    ]
+    sheet.append([_performance_header(h) for h in detail_headers])
+
+    # First correct option of every question, in option order
+    correct_options = {}
+    for question_id, option_text in QuestionOption.objects.filter(
+        is_correct=True
+    ).order_by('question_id', 'order_index').values_list('question_id', 'option_text'):
+        correct_options.setdefault(question_id, option_text)
+
+    answers = QuizAnswer.objects.filter(
+        attempt__completed_at__isnull=False, question__isnull=False
+    ).select_related(
+        'attempt__user', 'attempt__course', 'question'
+    ).prefetch_related('selected_options').order_by('-attempt__completed_at')
+
+    for answer in answers.iterator(chunk_size=CHUNK_SIZE):
+        attempt = answer.attempt
+        question = answer.question
+
+        # Multiple answer questions can have several selected options
+        selected_options = answer.selected_options.all()
+        user_answer_text = ", ".join([opt.option_text for opt in selected_options]) if selected_options else "No Answer"
+
+        if answer.is_correct:
+            result = Styled("✓ Correct", fill=SUCCESS_FILL)
+        else:
+            result = Styled("✗ Wrong", fill=DANGER_FILL)
+
+        sheet.append([
+            attempt.user.get_full_name(),
+            attempt.user.email,
+            attempt.course.title if attempt.course else "N/A",
+            question.question_text[:100] + "..." if len(question.question_text) > 100 else question.question_text,
+            correct_options.get(question.id, "N/A"),
+            user_answer_text,
+            result,
+            question.topic or "General",
+            question.get_difficulty_display(),
+            question.points,
+            attempt.completed_at.strftime('%Y-%m-%d %H:%M'),
+            round(attempt.score, 1) if attempt.score is not None else 0,
+        ])
+
+    sheet.close()
+
+
+# ==========================================
+# Background report jobs
+# ==========================================
+
+# Bump when a report's layout changes so cached files are regenerated
+REPORT_FORMAT_VERSION = 1
+
+
+def _enrollment_report_sources():
+    return [
+        get_bankers().aggregate(n=Count('id'), login=Max('last_login'), updated=Max('updated_at')),
+        Course.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        InteractiveCourse.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        InteractiveCourseProgress.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        Enrollment.objects.aggregate(n=Count('id'), completed=Count('id', filter=Q(is_completed=True)), last=Max('id')),
+        Certificate.objects.aggregate(n=Count('id'), valid=Count('id', filter=Q(is_valid=True)), last=Max('id'), issued=Max('issue_date')),
+        QuizAttempt.objects.filter(completed_at__isnull=False).aggregate(n=Count('id'), last=Max('completed_at')),
+        Video.objects.aggregate(n=Count('id')),
+        Question.objects.aggregate(n=Count('id')),
+    ]
+
+
+def _performance_report_sources():
+    return [
+        get_bankers().aggregate(n=Count('id'), updated=Max('updated_at')),
+        Course.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        InteractiveCourse.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        QuizAttempt.objects.filter(completed_at__isnull=False).aggregate(n=Count('id'), last=Max('completed_at')),
+        QuizAnswer.objects.aggregate(n=Count('id'), last=Max('id')),
+        Question.objects.aggregate(n=Count('id'), updated=Max('updated_at')),
+        QuestionOption.objects.aggregate(n=Count('id'), correct=Count('id', filter=Q(is_correct=True)), last=Max('id')),
+    ]
+
+
+REPORTS = {
+    'enrollment': {
+        'title': 'Course Enrollment & Completion Report',
+        'filename': 'Course_Enrollment_Report',
+        'writer': write_course_enrollment_report,
+        'sources': _enrollment_report_sources,
+    },
+    'performance': {
+        'title': 'User Performance Report',
+        'filename': 'User_Performance_Report',
+        'writer': write_user_performance_report,
+        'sources': _performance_report_sources,
+    },
+}
+
+
+def get_report_fingerprint(report_type):
+    """Hash of row counts and last-modified markers of the report's source tables"""
+    sources = REPORTS[report_type]['sources']()
+    state = repr((REPORT_FORMAT_VERSION, [sorted(source.items()) for source in sources]))
+    return hashlib.sha256(state.encode('utf-8')).hexdigest()[:40]
+
+
+def request_report(report_type, user=None):
+    """
+    Return the job for the current state of the data.
+
+    A completed job with the same fingerprint is reused as is; a job that is
+    still pending or running is shared; otherwise a new job is queued.
+    """
+    fingerprint = get_report_fingerprint(report_type)
+    jobs = ReportJob.objects.filter(report_type=report_type, fingerprint=fingerprint)
+
+    for job in jobs.filter(status='completed'):
+        if job.file and job.file.storage.exists(job.file.name):
+            return job
+
+    # Jobs older than the timeout were lost with a recycled worker process
+    cutoff = timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    job = jobs.filter(status__in=['pending', 'running'], created_at__gte=cutoff).first()
+    if job:
+        return job
+
+    job = ReportJob.objects.create(report_type=report_type, fingerprint=fingerprint, requested_by=user)
+    enqueue(generate_report, job.id)
+    return job
+
+
+def get_report_filename(job):
+    """Download filename for a completed job"""
+    stamp = timezone.localtime(job.completed_at or job.created_at).strftime('%Y%m%d_%H%M%S')
+    return f"{REPORTS[job.report_type]['filename']}_{stamp}.xlsx"
+
+
+@background_task
+def generate_report(job_id):
+    """Build the workbook for a ReportJob and store it under MEDIA_ROOT/reports/"""
+    # Only one worker may pick up a job
+    claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    job = ReportJob.objects.get(pk=job_id)
+    report = REPORTS[job.report_type]
+
+    def update_progress(percent):
+        ReportJob.objects.filter(pk=job_id).update(progress=percent)
+
+    try:
+        with tempfile.TemporaryFile(suffix='.xlsx') as temp_file:
+            report['writer'](temp_file, update_progress)
+            temp_file.seek(0)
+            job.file.save(f"{report['filename']}_{job.fingerprint[:12]}.xlsx", File(temp_file), save=False)
+    except Exception as e:
+        logger.exception('Report job %s failed', job_id)
+        ReportJob.objects.filter(pk=job_id).update(status='failed', error=str(e), completed_at=timezone.now())
+        return
+
+    job.status = 'completed'
+    job.progress = 100
+    job.completed_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'progress', 'completed_at'])
+
+    _discard_superseded_reports(job)
+
+
+def _discard_superseded_reports(job):
+    """
+    Remove older jobs (and their files) of the same report type.
+
+    A replaced file may still be downloading, so completed jobs are only
+    removed once a newer one has been available for REPORT_SUPERSEDED_GRACE
+    seconds.
+    """
+    jobs = ReportJob.objects.filter(report_type=job.report_type)
+    superseded = list(jobs.filter(status='failed', created_at__lt=job.created_at))
+
+    cutoff = timezone.now() - timedelta(seconds=settings.REPORT_SUPERSEDED_GRACE)
+    settled = jobs.filter(status='completed', completed_at__lte=cutoff).order_by('-created_at').first()
+    if settled is not None:
+        superseded += jobs.filter(status='completed', created_at__lt=settled.created_at)
+
+    for old_job in superseded:
+        if old_job.file:
+            old_job.file.delete(save=False)
+        old_job.delete()
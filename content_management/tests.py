@@ -0,0 +1,246 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from accounts.models import User
+from certificates.models import Certificate
+from courses.models import Course, Enrollment
+from progress.models import ReportJob
+from videos.interactive_progress import flush_interactive_progress
+from videos.models import InteractiveCourse, InteractiveCourseProgress
+
+from .reports import SheetWriter, generate_report, request_report, write_course_enrollment_report
+
+
+def make_user(username, role='banker', **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **extra
+    )
+
+
+class EnrollmentReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+        cls.certified = make_user('alice', first_name='Alice', last_name='A')
+        cls.started = make_user('bob', first_name='Bob', last_name='B')
+        cls.idle = make_user('carol', first_name='Carol', last_name='C')
+        InteractiveCourseProgress.objects.create(
+            user=cls.certified, interactive_course=cls.module, completion_percentage=100, content_completed=True
+        )
+        InteractiveCourseProgress.objects.create(user=cls.started, interactive_course=cls.module, completion_percentage=30)
+        Certificate.objects.create(
+            user=cls.certified, interactive_course=cls.module, certificate_number='CERT-1',
+            overall_score=90, verification_url='http://testserver/verify/CERT-1',
+        )
+
+    def write_report(self):
+        buffer = io.BytesIO()
+        percentages = []
+        write_course_enrollment_report(buffer, progress=percentages.append)
+        buffer.seek(0)
+        return load_workbook(buffer, read_only=True), percentages
+
+    def test_sheets_and_progress(self):
+        workbook, percentages = self.write_report()
+        self.assertEqual(
+            workbook.sheetnames,
+            ['Summary', 'Staff Progress (AD)', 'Not Started', 'Certified Staff', 'Course Overview'],
+        )
+        self.assertEqual(percentages, sorted(percentages))
+
+    def test_staff_progress_rows(self):
+        workbook, _ = self.write_report()
+        rows = list(workbook['Staff Progress (AD)'].iter_rows(values_only=True))
+        self.assertEqual(rows[0][5], 'Module 1 - Status')
+        by_email = {row[2]: row for row in rows[1:]}
+        self.assertEqual(by_email['alice@example.com'][5], 'Certified')
+        self.assertEqual(by_email['alice@example.com'][8], 'CERT-1')
+        self.assertEqual(by_email['bob@example.com'][5:7], ('In Progress', 30))
+        self.assertEqual(by_email['carol@example.com'][5], 'Not Started')
+
+    def test_not_started_sheet_lists_only_idle_bankers(self):
+        workbook, _ = self.write_report()
+        rows = list(workbook['Not Started'].iter_rows(values_only=True))
+        self.assertEqual([row[2] for row in rows[1:]], ['carol@example.com'])
+
+
+class SheetWriterTests(TestCase):
+    def test_widths_come_from_sample_rows(self):
+        workbook = Workbook(write_only=True)
+        sheet = SheetWriter(workbook, 'Sheet', max_width=40, sample_rows=2)
+        sheet.append(['ab', 'x' * 100])
+        sheet.append(['abcd'])
+        # Past the sample: written straight away and not measured
+        sheet.append(['a' * 30])
+        sheet.close()
+        workbook.save(io.BytesIO())
+        self.assertEqual(sheet.ws.column_dimensions['A'].width, 6)
+        self.assertEqual(sheet.ws.column_dimensions['B'].width, 40)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, REPORT_SUPERSEDED_GRACE=3600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def generate(self):
+        job = ReportJob.objects.create(report_type='enrollment', fingerprint=uuid.uuid4().hex)
+        generate_report(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        return job
+
+    def test_request_reuses_completed_report(self):
+        with mock.patch('content_management.reports.enqueue') as enqueue:
+            job = request_report('enrollment')
+        generate_report(job.id)
+        self.assertEqual(enqueue.call_count, 1)
+        self.assertEqual(request_report('enrollment'), job)
+
+    def test_replaced_report_is_kept_for_grace_period(self):
+        first = self.generate()
+        second = self.generate()
+        self.assertTrue(first.file.storage.exists(first.file.name))
+
+        # Once the second has been available for the grace period, the first goes
+        ReportJob.objects.filter(pk=second.pk).update(completed_at=timezone.now() - timedelta(hours=2))
+        self.generate()
+        self.assertFalse(ReportJob.objects.filter(pk=first.pk).exists())
+        self.assertFalse(first.file.storage.exists(first.file.name))
+        self.assertTrue(ReportJob.objects.filter(pk=second.pk).exists())
+
+
+class InteractiveProgressViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+
+    def setUp(self):
+        self.addCleanup(flush_interactive_progress)
+        self.client.force_login(self.banker)
+
+    def post(self, data):
+        return self.client.post(
+            reverse('content:update_interactive_progress', args=[self.module.id]),
+            json.dumps(data), content_type='application/json',
+        )
+
+    def test_invalid_event_is_rejected(self):
+        for event in [
+            {'time_spent': 'soon'},
+            {'time_spent': -5},
+            {'quiz_score': 'high'},
+            {'quiz_score': 150},
+            {'scorm_data': ['cmi.location', '3']},
+            {'scorm_suspend_data': {'slide': 3}},
+        ]:
+            with self.subTest(event=event):
+                response = self.post(event)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['code'], 'invalid_payload')
+        progress = InteractiveCourseProgress.objects.get(user=self.banker, interactive_course=self.module)
+        self.assertEqual((progress.total_time_spent, progress.quiz_attempts), (0, 0))
+
+    def test_invalid_event_is_skipped_in_batch(self):
+        response = self.post({'events': [
+            {'time_spent': 2},
+            {'time_spent': 'soon', 'quiz_score': 90},
+            {'time_spent': 3},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([rejection['index'] for rejection in body['rejected']], [1])
+        self.assertEqual(body['total_time_spent'], 5)
+        self.assertIsNone(body['quiz_score'])
+
+    def test_time_spent_in_batch_is_added_once(self):
+        response = self.post({'events': [{'time_spent': 2, 'current_slide': 1}, {'time_spent': 3}]})
+        self.assertEqual(response.json()['total_time_spent'], 5)
+        response = self.post({'events': [{'current_slide': 1}, {'time_spent': 1}]})
+        self.assertEqual(response.json()['total_time_spent'], 6)
+        flush_interactive_progress()
+        progress = InteractiveCourseProgress.objects.get(user=self.banker, interactive_course=self.module)
+        self.assertEqual(progress.total_time_spent, 6)
+
+    def test_player_page_does_not_write_progress(self):
+        Enrollment.objects.create(user=self.banker, course=self.module.course)
+        url = reverse('content:play_interactive', args=[self.module.course_id, self.module.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(InteractiveCourseProgress.objects.filter(user=self.banker).exists())
+
+        # Shown at the highest slide reached, but left as stored
+        InteractiveCourseProgress.objects.create(
+            user=self.banker, interactive_course=self.module, current_slide=7, highest_slide_reached=4
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.context['progress'].current_slide, 4)
+        self.assertEqual(InteractiveCourseProgress.objects.get(user=self.banker).current_slide, 7)
+
+
+class InteractiveContentFileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip',
+            extracted_path='interactive_courses/m1', total_slides=10,
+        )
+        Enrollment.objects.create(user=cls.banker, course=course)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(media_root, 'interactive_courses', 'm1', 'assets'))
+        with open(os.path.join(media_root, 'interactive_courses', 'm1', 'assets', 'app.js'), 'w') as asset:
+            asset.write('run()')
+        self.client.force_login(self.banker)
+
+    def get(self, path):
+        return self.client.get(reverse('content:interactive_file', args=[self.module.id, path]))
+
+    @override_settings(MEDIA_SENDFILE=None)
+    def test_static_media_without_sendfile(self):
+        self.assertEqual(self.module.get_launch_url(), '/media/interactive_courses/m1/index.html')
+        response = self.get('assets/app.js')
+        self.assertRedirects(response, '/media/interactive_courses/m1/assets/app.js', fetch_redirect_response=False)
+        self.assertEqual(self.get('../m2/index.html').status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_protected_files_with_sendfile(self):
+        self.assertEqual(
+            self.module.get_launch_url(), reverse('content:interactive_file', args=[self.module.id, 'index.html'])
+        )
+        response = self.get('assets/app.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Sendfile'].endswith(os.path.join('m1', 'assets', 'app.js')))
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+
+    def test_requires_enrollment(self):
+        self.client.force_login(make_user('outsider'))
+        self.assertEqual(self.get('assets/app.js').status_code, 403)
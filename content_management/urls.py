@@ -15,13 +15,19 @@ urlpatterns = [
     path('video/<int:video_id>/delete/', views.delete_video, name='delete_video'),
     path('question/<int:question_id>/delete/', views.delete_question, name='delete_question'),
     
+    # Chunked uploads of large videos and packages
+    path('upload/start/', views.start_chunked_upload, name='start_chunked_upload'),
+    path('upload/<uuid:token>/', views.chunked_upload, name='chunked_upload'),
+    
     # Interactive Course (SCORM/Captivate) Upload
     path('interactive/', views.interactive_course_list, name='interactive_list'),
     path('interactive/upload/', views.upload_interactive_course_new, name='upload_interactive_new'),
     path('interactive/<int:interactive_id>/delete/', views.delete_interactive_course, name='delete_interactive'),
+    path('interactive/<int:interactive_id>/status/', views.interactive_package_status, name='interactive_package_status'),
     path('course/<int:course_id>/interactive/', views.upload_interactive_course, name='upload_interactive'),
     path('course/<int:course_id>/interactive/<int:interactive_id>/play/', views.play_interactive_course, name='play_interactive'),
     path('interactive/<int:interactive_id>/progress/', views.update_interactive_progress, name='update_interactive_progress'),
+    path('interactive/<int:interactive_id>/files/<path:path>', views.interactive_content_file, name='interactive_file'),
     
     # Interactive Course Questions
     path('interactive/<int:interactive_id>/questions/', views.interactive_question_bank, name='interactive_question_bank'),
@@ -32,4 +38,6 @@ urlpatterns = [
     # Excel Reports
     path('reports/enrollment/', views.download_course_enrollment_report, name='enrollment_report'),
     path('reports/performance/', views.download_user_performance_report, name='performance_report'),
+    path('reports/jobs/<int:job_id>/status/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:job_id>/download/', views.download_report_job, name='report_job_download'),
 ]
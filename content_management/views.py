@@ -1,99 +1,53 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, HttpResponseForbidden, JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.db import transaction
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Max, Q
 from django.conf import settings
 from courses.models import Course, Enrollment
-from videos.models import Video, VideoSubtitle, VideoProgress, InteractiveCourse, InteractiveCourseProgress
+from videos.models import Video, VideoSubtitle, VideoProgress, InteractiveCourse, ChunkedUpload
 from quizzes.models import Question, QuestionOption, QuizAttempt, QuizAnswer
 from accounts.models import User
+from progress.models import ReportJob
+from risk_lms.media import safe_join, sendfile_enabled, serve_file, user_can_access_course
+from quizzes.answer_keys import invalidate_answer_key
+from videos.interactive_progress import get_interactive_progress, save_interactive_progress
+from videos.packages import package_folder, queue_package_ingest, release_blobs
+from videos.probe import probe_duration
+from videos.thumbnails import queue_thumbnail
+from videos.transcoding import delete_hls_files, queue_video_transcode
+from videos.uploads import UploadError, UploadOffsetError, complete_upload, start_upload, take_upload, write_chunk
+from .reports import REPORTS, XLSX_CONTENT_TYPE, get_report_filename, request_report
 import json
 import os
-import re
-import tempfile
-import zipfile
-import shutil
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from datetime import datetime
+from urllib.parse import quote
 import logging
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 
 logger = logging.getLogger(__name__)
 
-# Try to import moviepy, fallback to basic duration if not available
-try:
-    from moviepy.editor import VideoFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
-    print("MoviePy not available, using basic duration estimation")
-
 def calculate_video_duration(video_file):
-    """Calculate video duration with better error handling"""
+    """Video duration in seconds, from the container headers (see videos.probe)"""
     try:
-        # Reset file pointer to beginning
-        video_file.seek(0)
-        file_size = video_file.size
-        
-        if MOVIEPY_AVAILABLE:
-            try:
-                # Use moviepy for accurate duration calculation
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_file:
-                    # Write the video content to temp file
-                    video_file.seek(0)
-                    for chunk in video_file.chunks():
-                        temp_file.write(chunk)
-                    temp_file_path = temp_file.name
-                
-                # Calculate duration using moviepy
-                video_clip = VideoFileClip(temp_file_path)
-                duration = video_clip.duration
-                video_clip.close()
-                
-                # Clean up temp file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                
-                # Validate duration - MoviePy should give accurate results
-                if duration and duration > 0:
-                    print(f"MoviePy calculated duration: {duration} seconds")
-                    return int(duration)
-                else:
-                    print(f"MoviePy returned invalid duration: {duration}, using fallback")
-                    
-            except Exception as moviepy_error:
-                print(f"MoviePy error: {moviepy_error}")
-        
-        # Improved fallback estimation for browser-recorded WebM files
-        if file_size > 0:
-            # Browser recordings are typically much more compressed
-            # WebM from browser MediaRecorder: roughly 100-200 KB per second
-            # For a 3:14 video (194 seconds), expect ~19-38 MB file
-            
-            # More conservative estimation for WebM browser recordings
-            bytes_per_second = 150 * 1024  # ~150KB per second average
-            estimated_duration = file_size / bytes_per_second
-            
-            # Clamp to reasonable bounds (10 seconds to 1 hour)
-            estimated_duration = max(10, min(3600, estimated_duration))
-            
-            print(f"Fallback estimation: {file_size} bytes / {bytes_per_second} = {estimated_duration} seconds")
-            return int(estimated_duration)
-        
-        print("No file size available, using default duration")
-        return 30  # Default fallback
-            
+        duration = probe_duration(video_file)
     except Exception as e:
-        print(f"Error calculating video duration: {e}")
-        return 30  # Safe default
+        logger.warning('Could not probe video duration: %s', e)
+        duration = None
+    if duration:
+        return max(1, round(duration))
+
+    # Rough estimate for browser recordings (~150 KB per second), clamped
+    # to 10 seconds - 1 hour
+    file_size = getattr(video_file, 'size', 0)
+    if file_size > 0:
+        return int(max(10, min(3600, file_size / (150 * 1024))))
+    return 30  # Safe default
 
 @login_required
 def content_dashboard(request):
@@ -106,53 +60,70 @@ def content_dashboard(request):
     total_videos = Video.objects.filter(course__created_by=request.user).count()
     total_questions = Question.objects.filter(course__created_by=request.user).count()
     
-    # Get user performance metrics for dashboard display
+    # Get user performance metrics for dashboard display (grouped per user)
     user_performance_data = []
     banker_users = User.objects.filter(role='banker')
     
+    enrollment_stats = {
+        row['user_id']: row
+        for row in Enrollment.objects.filter(user__role='banker').values('user_id').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(is_completed=True)),
+        ).order_by()
+    }
+    quiz_stats = {
+        row['user_id']: row
+        for row in QuizAttempt.objects.filter(
+            user__role='banker', completed_at__isnull=False
+        ).values('user_id').annotate(
+            best=Max('score'),
+            avg=Avg('score'),
+            total=Count('id'),
+            last=Max('completed_at'),
+        ).order_by()
+    }
+    answer_stats = {
+        row['attempt__user_id']: row
+        for row in QuizAnswer.objects.filter(attempt__user__role='banker').values('attempt__user_id').annotate(
+            total=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+        ).order_by()
+    }
+    
     for user in banker_users:
-        # Get user's course enrollments
-        user_enrollments = Enrollment.objects.filter(user=user)
+        enrollments = enrollment_stats.get(user.id)
+        quiz = quiz_stats.get(user.id)
         
-        if user_enrollments.exists():
+        if enrollments and quiz:
             # Calculate overall progress
-            total_courses = user_enrollments.count()
-            completed_courses = user_enrollments.filter(is_completed=True).count()
+            total_courses = enrollments['total']
+            completed_courses = enrollments['completed']
             completion_rate = (completed_courses / total_courses * 100) if total_courses > 0 else 0
             
             # Get quiz performance
-            user_quiz_attempts = QuizAttempt.objects.filter(
-                user=user, completed_at__isnull=False
-            )
+            best_score = quiz['best']
+            avg_score = quiz['avg']
             
-            if user_quiz_attempts.exists():
-                best_score = user_quiz_attempts.order_by('-score').first().score
-                avg_score = user_quiz_attempts.aggregate(Avg('score'))['score__avg']
-                total_attempts = user_quiz_attempts.count()
-                
-                # Get answer accuracy
-                user_answers = QuizAnswer.objects.filter(attempt__user=user)
-                total_answers = user_answers.count()
-                correct_answers = user_answers.filter(is_correct=True).count()
-                accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
-                
-                # Get latest activity
-                latest_attempt = user_quiz_attempts.first()
-                
-                user_performance_data.append({
-                    'user': user,
-                    'total_courses': total_courses,
-                    'completed_courses': completed_courses,
-                    'completion_rate': round(completion_rate, 1),
-                    'best_score': round(best_score, 1),
-                    'avg_score': round(avg_score, 1),
-                    'total_attempts': total_attempts,
-                    'accuracy': round(accuracy, 1),
-                    'total_answers': total_answers,
-                    'correct_answers': correct_answers,
-                    'last_activity': latest_attempt.completed_at,
-                    'performance_level': 'Excellent' if avg_score >= 85 else 'Good' if avg_score >= 70 else 'Needs Improvement'
-                })
+            # Get answer accuracy
+            answers = answer_stats.get(user.id, {})
+            total_answers = answers.get('total', 0)
+            correct_answers = answers.get('correct', 0)
+            accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
+            
+            user_performance_data.append({
+                'user': user,
+                'total_courses': total_courses,
+                'completed_courses': completed_courses,
+                'completion_rate': round(completion_rate, 1),
+                'best_score': round(best_score, 1),
+                'avg_score': round(avg_score, 1),
+                'total_attempts': quiz['total'],
+                'accuracy': round(accuracy, 1),
+                'total_answers': total_answers,
+                'correct_answers': correct_answers,
+                'last_activity': quiz['last'],
+                'performance_level': 'Excellent' if avg_score >= 85 else 'Good' if avg_score >= 70 else 'Needs Improvement'
+            })
     
     # Sort by performance (best score descending)
     user_performance_data.sort(key=lambda x: x['best_score'], reverse=True)
@@ -202,6 +173,7 @@ def upload_course(request):
         if 'thumbnail' in request.FILES:
             course.thumbnail = request.FILES['thumbnail']
             course.save()
+            queue_thumbnail(course)
         
         messages.success(request, f'Course "{title}" created successfully!')
         return redirect('content:video_upload', course_id=course.id)
@@ -240,8 +212,8 @@ def video_upload(request, course_id):
             order_index=int(order_index)
         )
         
-        if 'video_file' in request.FILES:
-            video_file = request.FILES['video_file']
+        video_file = request.FILES.get('video_file') or take_upload(request, 'video_file', 'video')
+        if video_file:
             video.video_file = video_file
             
             # Try to verify duration from uploaded file if needed
@@ -257,6 +229,9 @@ def video_upload(request, course_id):
                 pass
                 
             video.save()
+            complete_upload(video_file)
+            queue_video_transcode(video)
+            queue_thumbnail(video)
         
         # Handle automatic translation (will be processed in background)
         target_languages = request.POST.getlist('languages')
@@ -343,7 +318,7 @@ def save_recorded_video(request):
     try:
         course_id = request.POST.get('course_id')
         title = request.POST.get('title')
-        video_blob = request.FILES.get('video_blob')
+        video_blob = request.FILES.get('video_blob') or take_upload(request, 'video_blob', 'video')
         
         if not video_blob:
             return JsonResponse({'error': 'No video file provided'}, status=400)
@@ -364,6 +339,9 @@ def save_recorded_video(request):
             file_size=video_blob.size,
             order_index=Video.objects.filter(course=course).count()
         )
+        complete_upload(video_blob)
+        queue_video_transcode(video)
+        queue_thumbnail(video)
         
         return JsonResponse({
             'success': True,
@@ -379,137 +357,6 @@ def save_recorded_video(request):
         }, status=500)
 
 
-def parse_captivate_metadata(extracted_path):
-    """Parse metadata from Adobe Captivate course package"""
-    metadata = {
-        'title': '',
-        'duration_minutes': 0,
-        'total_slides': 0,
-        'resolution_width': 1280,
-        'resolution_height': 720,
-        'entry_file': 'index.html',
-        'content_type': 'captivate'
-    }
-    
-    # Look for CPM.js or similar config files
-    for root, dirs, files in os.walk(extracted_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            
-            # Check CPM.js for Captivate metadata
-            if file == 'CPM.js':
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        # Extract project title
-                        title_match = re.search(r'projectTitle\s*[=:]\s*["\']([^"\']+)["\']', content)
-                        if title_match:
-                            metadata['title'] = title_match.group(1)
-                        
-                        # Extract duration
-                        duration_match = re.search(r'projectDuration\s*[=:]\s*(\d+)', content)
-                        if duration_match:
-                            # Duration is usually in milliseconds or seconds
-                            duration = int(duration_match.group(1))
-                            if duration > 10000:  # Likely milliseconds
-                                metadata['duration_minutes'] = duration // 60000
-                            else:
-                                metadata['duration_minutes'] = duration // 60
-                        
-                        # Extract slide count
-                        slide_match = re.search(r'totalSlides\s*[=:]\s*(\d+)', content)
-                        if slide_match:
-                            metadata['total_slides'] = int(slide_match.group(1))
-                        
-                        # Extract resolution
-                        width_match = re.search(r'stageWidth\s*[=:]\s*(\d+)', content)
-                        height_match = re.search(r'stageHeight\s*[=:]\s*(\d+)', content)
-                        if width_match:
-                            metadata['resolution_width'] = int(width_match.group(1))
-                        if height_match:
-                            metadata['resolution_height'] = int(height_match.group(1))
-                            
-                except Exception as e:
-                    print(f"Error parsing CPM.js: {e}")
-            
-            # Check project.txt for additional metadata (JSON format for Captivate)
-            elif file == 'project.txt':
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        # Try to parse as JSON (Captivate 11+ format)
-                        try:
-                            project_data = json.loads(content)
-                            
-                            # Extract metadata from JSON structure
-                            if 'metadata' in project_data:
-                                meta = project_data['metadata']
-                                
-                                # Title
-                                if meta.get('title') and not metadata['title']:
-                                    metadata['title'] = meta['title']
-                                
-                                # Total slides
-                                if meta.get('totalSlides'):
-                                    metadata['total_slides'] = int(meta['totalSlides'])
-                                
-                                # Duration from frames
-                                if meta.get('durationInFrames') and meta.get('frameRate'):
-                                    duration_seconds = meta['durationInFrames'] / meta['frameRate']
-                                    metadata['duration_minutes'] = int(duration_seconds / 60)
-                                
-                                # Resolution
-                                if meta.get('width'):
-                                    metadata['resolution_width'] = int(meta['width'])
-                                if meta.get('height'):
-                                    metadata['resolution_height'] = int(meta['height'])
-                                
-                                # Entry file
-                                if meta.get('launchFile'):
-                                    metadata['entry_file'] = meta['launchFile']
-                            
-                            # Also check for title in contentStructure (project name)
-                            if 'contentStructure' in project_data:
-                                for item in project_data['contentStructure']:
-                                    if item.get('class') == 'project' and item.get('title'):
-                                        if not metadata['title']:
-                                            metadata['title'] = item['title']
-                                        break
-                                        
-                        except json.JSONDecodeError:
-                            # Fallback to regex for non-JSON format
-                            if not metadata['title']:
-                                title_match = re.search(r'name\s*[=:]\s*(.+)', content)
-                                if title_match:
-                                    metadata['title'] = title_match.group(1).strip()
-                                    
-                            if not metadata['duration_minutes']:
-                                duration_match = re.search(r'duration\s*[=:]\s*(\d+)', content)
-                                if duration_match:
-                                    metadata['duration_minutes'] = int(duration_match.group(1))
-                                
-                except Exception as e:
-                    print(f"Error parsing project.txt: {e}")
-            
-            # Check index.html for title
-            elif file == 'index.html':
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        if not metadata['title']:
-                            title_match = re.search(r'<title>([^<]+)</title>', content, re.IGNORECASE)
-                            if title_match:
-                                metadata['title'] = title_match.group(1).strip()
-                                
-                except Exception as e:
-                    print(f"Error parsing index.html: {e}")
-    
-    return metadata
-
-
 @login_required
 def interactive_course_list(request):
     """List all interactive courses for browsing and enrollment"""
@@ -523,6 +370,10 @@ def interactive_course_list(request):
         course__is_published=True
     ).select_related('course', 'created_by').order_by('-created_at')
     
+    # Packages still being processed are only listed for admins
+    if not request.user.is_risk_admin():
+        interactive_courses = interactive_courses.filter(package_status='ready')
+    
     # Get user's enrolled courses
     user_enrollments = set()
     user_progress = {}
@@ -576,6 +427,58 @@ def interactive_course_list(request):
     return render(request, 'content/interactive_list.html', context)
 
 
+def _chunked_upload_state(upload):
+    return {
+        'token': str(upload.token),
+        'url': reverse('content:chunked_upload', args=[upload.token]),
+        'chunk_size': upload.chunk_size,
+        'size': upload.size,
+        'offset': upload.received,
+    }
+
+
+@login_required
+@require_POST
+def start_chunked_upload(request):
+    """Start a chunked upload of a video or package (see videos.uploads)"""
+    if not request.user.can_upload_content():
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    try:
+        data = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        upload = start_upload(request.user, data.get('purpose'), data.get('filename'), data.get('size'))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(_chunked_upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def chunked_upload(request, token):
+    """
+    GET: how far an upload has got. POST: the chunk at X-Upload-Offset as the
+    raw request body, with its CRC-32 (hex) in X-Chunk-CRC32.
+    """
+    upload = get_object_or_404(ChunkedUpload, token=token, user=request.user)
+    if request.method == 'POST':
+        try:
+            offset = int(request.headers['X-Upload-Offset'])
+            crc32 = int(request.headers['X-Chunk-CRC32'], 16)
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'X-Upload-Offset and X-Chunk-CRC32 are required'}, status=400)
+        try:
+            write_chunk(upload, offset, request, length, crc32)
+        except UploadOffsetError as e:
+            return JsonResponse(dict(_chunked_upload_state(upload), error=str(e)), status=409)
+        except UploadError as e:
+            return JsonResponse(dict(_chunked_upload_state(upload), error=str(e)), status=400)
+    return JsonResponse(_chunked_upload_state(upload))
+
+
 @login_required
 def upload_interactive_course_new(request):
     """Upload Adobe Captivate/SCORM package from interactive list page (without course_id in URL)"""
@@ -623,7 +526,7 @@ def upload_interactive_course_new(request):
     content_type = request.POST.get('content_type', 'captivate')
     order_index = request.POST.get('order_index', 0)
     
-    package_file = request.FILES.get('package_file')
+    package_file = request.FILES.get('package_file') or take_upload(request, 'package_file', 'package')
     
     if not package_file:
         messages.error(request, 'Please select a package file to upload.')
@@ -634,75 +537,33 @@ def upload_interactive_course_new(request):
         messages.error(request, 'Package must be a ZIP file.')
         return redirect('content:interactive_list')
     
+    # Safe integer conversion helper
+    def safe_int_convert(value, default=0):
+        if value is None or value == '':
+            return default
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return default
+    
     try:
-        # Create a unique extraction path
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_title = re.sub(r'[^\w\-]', '_', title or 'course')[:50]
-        extract_folder = f'interactive_courses/{timestamp}_{safe_title}'
-        extract_path = os.path.join(settings.MEDIA_ROOT, extract_folder)
-        
-        # Create directory
-        os.makedirs(extract_path, exist_ok=True)
-        
-        # Save and extract the zip file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-            for chunk in package_file.chunks():
-                temp_zip.write(chunk)
-            temp_zip_path = temp_zip.name
-        
-        # Extract the zip file
-        with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_path)
-        
-        # Clean up temp file
-        os.unlink(temp_zip_path)
-        
-        # Check if files were extracted to a subdirectory
-        extracted_items = os.listdir(extract_path)
-        if len(extracted_items) == 1 and os.path.isdir(os.path.join(extract_path, extracted_items[0])):
-            # Move contents up one level
-            sub_dir = os.path.join(extract_path, extracted_items[0])
-            for item in os.listdir(sub_dir):
-                shutil.move(os.path.join(sub_dir, item), extract_path)
-            os.rmdir(sub_dir)
-        
-        # Parse metadata from extracted files
-        metadata = parse_captivate_metadata(extract_path)
-        
-        # Find entry file
-        entry_file = 'index.html'
-        for possible_entry in ['index.html', 'index.htm', 'default.html', 'story.html']:
-            if os.path.exists(os.path.join(extract_path, possible_entry)):
-                entry_file = possible_entry
-                break
-        
-        # Safe integer conversion helper
-        def safe_int_convert(value, default=0):
-            if value is None or value == '':
-                return default
-            try:
-                return int(value)
-            except (ValueError, TypeError):
-                return default
-        
-        # Create the interactive course record
-        interactive_course = InteractiveCourse.objects.create(
-            course=course,
-            title=title or metadata.get('title', 'Untitled Course'),
-            description=description or metadata.get('description', ''),
-            content_type=content_type,
-            package_file=package_file,
-            extracted_path=extract_folder,
-            entry_file=entry_file,
-            duration_minutes=safe_int_convert(metadata.get('duration_minutes')),
-            total_slides=safe_int_convert(metadata.get('total_slides')),
-            resolution_width=safe_int_convert(metadata.get('resolution_width'), 1280),
-            resolution_height=safe_int_convert(metadata.get('resolution_height'), 720),
-            order_index=safe_int_convert(order_index),
-            created_by=request.user
-        )
+        # The package is extracted and its metadata read by a background job
+        with transaction.atomic():
+            interactive_course = InteractiveCourse.objects.create(
+                course=course,
+                title=title,
+                description=description,
+                content_type=content_type,
+                package_file=package_file,
+                extracted_path=package_folder(title),
+                order_index=safe_int_convert(order_index),
+                package_status='pending',
+                created_by=request.user
+            )
+            complete_upload(package_file)
+            queue_package_ingest(interactive_course)
         
-        messages.success(request, f'Interactive course "{interactive_course.title}" uploaded successfully!')
+        messages.success(request, f'Package "{package_file.name}" uploaded. It is being processed and will be available shortly.')
         return redirect('content:interactive_list')
         
     except Exception as e:
@@ -725,7 +586,7 @@ def upload_interactive_course(request, course_id):
         content_type = request.POST.get('content_type', 'captivate')
         order_index = request.POST.get('order_index', 0)
         
-        package_file = request.FILES.get('package_file')
+        package_file = request.FILES.get('package_file') or take_upload(request, 'package_file', 'package')
         
         if not package_file:
             messages.error(request, 'Please select a package file to upload.')
@@ -736,101 +597,39 @@ def upload_interactive_course(request, course_id):
             messages.error(request, 'Package must be a ZIP file.')
             return redirect('content:upload_interactive', course_id=course.id)
         
+        # Safely parse integer values from form
+        def safe_int(value, default=0):
+            try:
+                return int(value) if value else default
+            except (ValueError, TypeError):
+                return default
+        
         try:
-            # Create a unique extraction path
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_title = re.sub(r'[^\w\-]', '_', title or 'course')[:50]
-            extract_folder = f'interactive_courses/{timestamp}_{safe_title}'
-            extract_path = os.path.join(settings.MEDIA_ROOT, extract_folder)
-            
-            # Create directory
-            os.makedirs(extract_path, exist_ok=True)
-            
-            # Save and extract the zip file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-                for chunk in package_file.chunks():
-                    temp_zip.write(chunk)
-                temp_zip_path = temp_zip.name
-            
-            # Extract the zip file
-            with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-            
-            # Clean up temp file
-            os.unlink(temp_zip_path)
-            
-            # Check if files were extracted to a subdirectory
-            extracted_items = os.listdir(extract_path)
-            if len(extracted_items) == 1 and os.path.isdir(os.path.join(extract_path, extracted_items[0])):
-                # Move contents up one level
-                sub_dir = os.path.join(extract_path, extracted_items[0])
-                for item in os.listdir(sub_dir):
-                    shutil.move(os.path.join(sub_dir, item), extract_path)
-                os.rmdir(sub_dir)
-            
-            # Parse metadata from extracted files
-            metadata = parse_captivate_metadata(extract_path)
-            
-            # Use metadata title if no title provided
-            if not title and metadata['title']:
-                title = metadata['title']
-            
-            # Find entry file
-            entry_file = 'index.html'
-            if os.path.exists(os.path.join(extract_path, 'index.html')):
-                entry_file = 'index.html'
-            elif os.path.exists(os.path.join(extract_path, 'index.htm')):
-                entry_file = 'index.htm'
-            
-            # Reset package file pointer and save
-            package_file.seek(0)
-            
-            # Safely parse integer values from form
-            def safe_int(value, default=0):
-                try:
-                    return int(value) if value else default
-                except (ValueError, TypeError):
-                    return default
-            
-            # Get duration and slides - prefer metadata, fallback to form input
-            final_duration = metadata['duration_minutes'] or safe_int(request.POST.get('duration_minutes'))
-            final_slides = metadata['total_slides'] or safe_int(request.POST.get('total_slides'))
-            final_order = safe_int(order_index)
-            
-            # Create the interactive course record
-            interactive_course = InteractiveCourse.objects.create(
-                course=course,
-                title=title or metadata['title'] or 'Untitled Interactive Course',
-                description=description,
-                content_type=content_type,
-                package_file=package_file,
-                extracted_path=extract_folder,
-                entry_file=entry_file,
-                duration_minutes=final_duration,
-                total_slides=final_slides,
-                resolution_width=metadata['resolution_width'],
-                resolution_height=metadata['resolution_height'],
-                order_index=final_order,
-                created_by=request.user
-            )
-            
-            # Handle thumbnail upload
-            if 'thumbnail' in request.FILES:
-                interactive_course.thumbnail = request.FILES['thumbnail']
-                interactive_course.save()
+            # The package is extracted and its metadata read by a background
+            # job; duration and slides from the package replace these values
+            with transaction.atomic():
+                interactive_course = InteractiveCourse.objects.create(
+                    course=course,
+                    title=title,
+                    description=description,
+                    content_type=content_type,
+                    package_file=package_file,
+                    extracted_path=package_folder(title),
+                    duration_minutes=safe_int(request.POST.get('duration_minutes')),
+                    total_slides=safe_int(request.POST.get('total_slides')),
+                    order_index=safe_int(order_index),
+                    thumbnail=request.FILES.get('thumbnail'),
+                    package_status='pending',
+                    created_by=request.user
+                )
+                complete_upload(package_file)
+                queue_package_ingest(interactive_course)
             
-            # Use the final title for the success message
-            final_title = interactive_course.title
-            messages.success(request, 
-                f'Interactive course "{final_title}" uploaded successfully! '
-                f'Duration: {final_duration} minutes, '
-                f'Slides: {final_slides}'
+            messages.success(request,
+                f'Package "{package_file.name}" uploaded. It is being processed and will be available shortly.'
             )
             return redirect('content:course_detail', course_id=course.id)
             
-        except zipfile.BadZipFile:
-            messages.error(request, 'Invalid ZIP file. Please upload a valid package.')
-            return redirect('content:upload_interactive', course_id=course.id)
         except Exception as e:
             messages.error(request, f'Error uploading package: {str(e)}')
             return redirect('content:upload_interactive', course_id=course.id)
@@ -844,6 +643,43 @@ def upload_interactive_course(request, course_id):
     return render(request, 'content/upload_interactive.html', context)
 
 
+@login_required
+def interactive_content_file(request, interactive_id, path):
+    """Serve a file of an extracted package to users who may view its course"""
+    interactive_course = get_object_or_404(
+        InteractiveCourse.objects.only('id', 'course_id', 'extracted_path', 'package_status'),
+        id=interactive_id,
+    )
+    if not user_can_access_course(request.user, interactive_course.course_id):
+        return HttpResponseForbidden('You must be enrolled in this course to view content.')
+    if not interactive_course.is_ready or not interactive_course.extracted_path:
+        raise Http404('Module not available')
+
+    # Every upload gets a new folder, so its files never change
+    root = os.path.join(settings.MEDIA_ROOT, interactive_course.extracted_path)
+    file_path = safe_join(root, path)
+    if not sendfile_enabled():
+        # Streaming every asset from Python is slower than the static /media/ files
+        return redirect(f'{settings.MEDIA_URL}{interactive_course.extracted_path}/{quote(path)}')
+    return serve_file(request, file_path, immutable=True)
+
+
+@login_required
+def interactive_package_status(request, interactive_id):
+    """Ingestion progress of an uploaded package (polled by the module list)"""
+    if not request.user.is_risk_admin():
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    interactive_course = get_object_or_404(InteractiveCourse, id=interactive_id)
+    data = {
+        'status': interactive_course.package_status,
+        'progress': interactive_course.package_progress,
+    }
+    if interactive_course.package_status == 'failed':
+        data['error'] = interactive_course.package_error
+    return JsonResponse(data)
+
+
 @login_required
 def play_interactive_course(request, course_id, interactive_id):
     """Play/launch an interactive course"""
@@ -857,16 +693,17 @@ def play_interactive_course(request, course_id, interactive_id):
             messages.error(request, 'You must be enrolled in this course to view content.')
             return redirect('courses:course_detail', course_id=course.id)
     
-    # Get or create progress record
-    progress, created = InteractiveCourseProgress.objects.get_or_create(
-        user=request.user,
-        interactive_course=interactive_course
-    )
+    if not interactive_course.is_ready:
+        messages.info(request, 'This module is still being processed. Please try again shortly.')
+        return redirect('courses:course_detail', course_id=course.id)
+    
+    # Read only: the row is created by the first progress update
+    progress = get_interactive_progress(request.user, interactive_course, create=False)
 
     # Resume safety: never resume beyond the highest legitimately reached slide.
+    # The next progress update stores the slide the player actually shows.
     if progress.highest_slide_reached and progress.current_slide > progress.highest_slide_reached:
         progress.current_slide = progress.highest_slide_reached
-        progress.save(update_fields=['current_slide', 'updated_at'])
     
     # Calculate progress dash offset for circular SVG (circumference is 339.292)
     circumference = 339.292
@@ -889,12 +726,21 @@ def play_interactive_course(request, course_id, interactive_id):
 @login_required
 @require_POST
 def update_interactive_progress(request, interactive_id):
-    """Update progress for interactive course - tracks slides, quiz, and completion"""
+    """
+    Update progress for interactive course - tracks slides, quiz, and completion.
+
+    Accepts a single update or an ordered batch ({"events": [...]}) from the
+    SCORM commit queue, applied in one transaction. Beacons sent on page
+    unload post the same JSON as a form field named "payload".
+    """
     interactive_course = get_object_or_404(InteractiveCourse, id=interactive_id)
     
     try:
         try:
-            data = json.loads(request.body or "{}")
+            if request.content_type == 'application/json':
+                data = json.loads(request.body or "{}")
+            else:
+                data = json.loads(request.POST.get('payload') or "{}")
         except json.JSONDecodeError:
             return JsonResponse(
                 {
@@ -905,10 +751,21 @@ def update_interactive_progress(request, interactive_id):
                 status=400,
             )
         
-        progress, created = InteractiveCourseProgress.objects.get_or_create(
-            user=request.user,
-            interactive_course=interactive_course
-        )
+        events = data.get('events') if isinstance(data, dict) else None
+        if events is None:
+            events = [data]
+        if not isinstance(events, list) or not all(isinstance(event, dict) for event in events):
+            return JsonResponse(
+                {
+                    'success': False,
+                    'error': 'Invalid events batch.',
+                    'code': 'invalid_json',
+                },
+                status=400,
+            )
+        
+        # Includes updates still buffered in this process (see videos.interactive_progress)
+        progress = get_interactive_progress(request.user, interactive_course)
         
         total_slides = interactive_course.total_slides
         min_time_per_slide_seconds = progress.get_min_time_per_slide_seconds()
@@ -920,166 +777,188 @@ def update_interactive_progress(request, interactive_id):
             except (TypeError, ValueError):
                 raise ValueError(f'Invalid {field_name}. Must be an integer.')
 
-        def _parse_ts(value):
-            if not value:
-                return None
-            dt = parse_datetime(str(value))
-            if not dt:
-                return None
-            if timezone.is_naive(dt):
-                dt = timezone.make_aware(dt, timezone.get_current_timezone())
-            return dt
+        def _validate_event(data):
+            """Check the fields applied without further checks, before anything is changed"""
+            if 'time_spent' in data and _parse_int(data['time_spent'], 'time_spent') < 0:
+                raise ValueError('Invalid time_spent. Must not be negative.')
+            if 'quiz_score' in data:
+                try:
+                    quiz_score = float(data['quiz_score'])
+                except (TypeError, ValueError):
+                    quiz_score = None
+                if quiz_score is None or not 0 <= quiz_score <= 100:
+                    raise ValueError('Invalid quiz_score. Must be a number from 0 to 100.')
+            if 'scorm_data' in data and not isinstance(data['scorm_data'], dict):
+                raise ValueError('Invalid scorm_data. Must be an object.')
+            if 'scorm_suspend_data' in data and not isinstance(data['scorm_suspend_data'], str):
+                raise ValueError('Invalid scorm_suspend_data. Must be a string.')
 
         def _reject(message, *, status=400, code='invalid_request'):
-            return JsonResponse(
-                {
-                    'success': False,
-                    'error': message,
-                    'code': code,
-                    'current_slide': progress.current_slide,
-                    'highest_slide_reached': progress.highest_slide_reached,
-                    'allowed_next_slide': (progress.highest_slide_reached or 0) + 1,
-                    'total_slides': total_slides,
-                },
-                status=status,
-            )
+            return {
+                'success': False,
+                'error': message,
+                'code': code,
+                'current_slide': progress.current_slide,
+                'highest_slide_reached': progress.highest_slide_reached,
+                'allowed_next_slide': (progress.highest_slide_reached or 0) + 1,
+                'total_slides': total_slides,
+            }, status
+
+        def _apply_event(data):
+            """Apply one update; returns a (payload, status) rejection or None"""
+            try:
+                _validate_event(data)
+
+                # Reject obvious slide-jump attempts early (even if client sends highest_slide_reached).
+                if 'highest_slide_reached' in data:
+                    requested_highest = _parse_int(data.get('highest_slide_reached'), 'highest_slide_reached')
+                    if requested_highest > (progress.highest_slide_reached or 0) + 1:
+                        progress.skip_attempts = (progress.skip_attempts or 0) + 1
+                        progress.save(update_fields=['skip_attempts', 'updated_at'])
+                        logger.warning(
+                            'Interactive skip attempt: user=%s course=%s requested_highest=%s current=%s highest=%s',
+                            request.user.id,
+                            interactive_course.id,
+                            requested_highest,
+                            progress.current_slide,
+                            progress.highest_slide_reached,
+                        )
+                        return _reject(
+                            'Cannot unlock future slides. Complete the previous slide to continue.',
+                            status=403,
+                            code='slide_skip',
+                        )
+
+                requested_current_slide = None
+                if 'current_slide' in data:
+                    requested_current_slide = _parse_int(data.get('current_slide'), 'current_slide')
+            except ValueError as ve:
+                return _reject(str(ve), status=400, code='invalid_payload')
 
-        try:
-            # Reject obvious slide-jump attempts early (even if client sends highest_slide_reached).
-            if 'highest_slide_reached' in data:
-                requested_highest = _parse_int(data.get('highest_slide_reached'), 'highest_slide_reached')
-                if requested_highest > (progress.highest_slide_reached or 0) + 1:
+            # Slide completion must be explicit (Next button). Enforce sequential completion + minimum time.
+            slide_completed = None
+            if 'slide_completed' in data:
+                try:
+                    slide_completed = _parse_int(data.get('slide_completed'), 'slide_completed')
+                except ValueError as ve:
+                    return _reject(str(ve), status=400, code='invalid_payload')
+                if slide_completed < 1 or (total_slides and slide_completed > total_slides):
+                    return _reject('Invalid slide number.', status=400, code='invalid_slide')
+
+                if slide_completed > (progress.highest_slide_reached or 0) + 1:
                     progress.skip_attempts = (progress.skip_attempts or 0) + 1
                     progress.save(update_fields=['skip_attempts', 'updated_at'])
                     logger.warning(
-                        'Interactive skip attempt: user=%s course=%s requested_highest=%s current=%s highest=%s',
+                        'Interactive skip attempt (complete): user=%s course=%s slide_completed=%s current=%s highest=%s',
                         request.user.id,
                         interactive_course.id,
-                        requested_highest,
+                        slide_completed,
                         progress.current_slide,
                         progress.highest_slide_reached,
                     )
                     return _reject(
-                        'Cannot unlock future slides. Complete the previous slide to continue.',
+                        f'Cannot complete slide {slide_completed} yet. Complete previous slides first.',
                         status=403,
                         code='slide_skip',
                     )
 
-            requested_current_slide = None
-            if 'current_slide' in data:
-                requested_current_slide = _parse_int(data.get('current_slide'), 'current_slide')
-        except ValueError as ve:
-            return _reject(str(ve), status=400, code='invalid_payload')
-
-        # Slide completion must be explicit (Next button). Enforce sequential completion + minimum time.
-        slide_completed = None
-        if 'slide_completed' in data:
-            try:
-                slide_completed = _parse_int(data.get('slide_completed'), 'slide_completed')
-            except ValueError as ve:
-                return _reject(str(ve), status=400, code='invalid_payload')
-            if slide_completed < 1 or (total_slides and slide_completed > total_slides):
-                return _reject('Invalid slide number.', status=400, code='invalid_slide')
-
-            if slide_completed > (progress.highest_slide_reached or 0) + 1:
-                progress.skip_attempts = (progress.skip_attempts or 0) + 1
-                progress.save(update_fields=['skip_attempts', 'updated_at'])
-                logger.warning(
-                    'Interactive skip attempt (complete): user=%s course=%s slide_completed=%s current=%s highest=%s',
-                    request.user.id,
-                    interactive_course.id,
-                    slide_completed,
-                    progress.current_slide,
-                    progress.highest_slide_reached,
-                )
-                return _reject(
-                    f'Cannot complete slide {slide_completed} yet. Complete previous slides first.',
-                    status=403,
-                    code='slide_skip',
-                )
+                # Completed slides already met the minimum time; otherwise time
+                # it from the recorded start (recording one now if missing).
+                if progress.is_slide_completed(slide_completed):
+                    elapsed = min_time_per_slide_seconds
+                else:
+                    elapsed = (now - progress.start_slide(slide_completed).started_at).total_seconds()
+                if elapsed < min_time_per_slide_seconds:
+                    remaining = int(max(1, min_time_per_slide_seconds - elapsed))
+                    return _reject(
+                        f'Slide unlocks in {remaining}s. Please finish the slide before continuing.',
+                        status=400,
+                        code='min_time_not_met',
+                    )
 
-            # Ensure we have a recorded start time for this slide.
-            progress.start_slide(slide_completed)
-            started_at = _parse_ts(progress.slide_started_at.get(str(slide_completed)))
-            if not started_at:
-                started_at = now
-                progress.slide_started_at[str(slide_completed)] = started_at.isoformat()
-
-            elapsed = (now - started_at).total_seconds()
-            if elapsed < min_time_per_slide_seconds:
-                remaining = int(max(1, min_time_per_slide_seconds - elapsed))
-                progress.save(update_fields=['slide_started_at', 'updated_at'])
-                return _reject(
-                    f'Slide unlocks in {remaining}s. Please finish the slide before continuing.',
-                    status=400,
-                    code='min_time_not_met',
-                )
+                progress.mark_slide_completed(slide_completed)
 
-            progress.mark_slide_completed(slide_completed)
-
-        # Track current slide (allowed only for current/previous/next-unlocked slide).
-        if requested_current_slide and requested_current_slide > 0:
-            if not progress.can_access_slide(requested_current_slide):
-                progress.skip_attempts = (progress.skip_attempts or 0) + 1
-                progress.save(update_fields=['skip_attempts', 'updated_at'])
-                logger.warning(
-                    'Interactive skip attempt: user=%s course=%s requested_current=%s current=%s highest=%s',
-                    request.user.id,
-                    interactive_course.id,
-                    requested_current_slide,
-                    progress.current_slide,
-                    progress.highest_slide_reached,
-                )
-                return _reject(
-                    f'Slide {requested_current_slide} is locked. Complete previous slides to unlock.',
-                    status=403,
-                    code='slide_locked',
-                )
+            # Track current slide (allowed only for current/previous/next-unlocked slide).
+            if requested_current_slide and requested_current_slide > 0:
+                if not progress.can_access_slide(requested_current_slide):
+                    progress.skip_attempts = (progress.skip_attempts or 0) + 1
+                    progress.save(update_fields=['skip_attempts', 'updated_at'])
+                    logger.warning(
+                        'Interactive skip attempt: user=%s course=%s requested_current=%s current=%s highest=%s',
+                        request.user.id,
+                        interactive_course.id,
+                        requested_current_slide,
+                        progress.current_slide,
+                        progress.highest_slide_reached,
+                    )
+                    return _reject(
+                        f'Slide {requested_current_slide} is locked. Complete previous slides to unlock.',
+                        status=403,
+                        code='slide_locked',
+                    )
 
-            progress.current_slide = requested_current_slide
-            progress.start_slide(requested_current_slide)
-        
-        # Track time spent (in minutes)
-        if 'time_spent' in data:
-            progress.total_time_spent += int(data['time_spent'])
-        
-        # Handle quiz results from Captivate or LMS quiz
-        if 'quiz_score' in data:
-            progress.quiz_score = float(data['quiz_score'])
-            progress.quiz_attempts += 1
-            progress.quiz_passed = progress.quiz_score >= 80  # 80% passing threshold
+                # Slides up to highest_slide_reached were completed, so already started
+                if (requested_current_slide > progress.highest_slide_reached
+                        and requested_current_slide != progress.current_slide):
+                    progress.start_slide(requested_current_slide)
+                progress.current_slide = requested_current_slide
             
-            # If content is completed and quiz passed, mark course as fully completed
-            if progress.content_completed and progress.quiz_passed:
-                if not progress.is_completed:
-                    progress.is_completed = True
-                    progress.completed_at = datetime.now()
-        
-        # Store SCORM data
-        if 'scorm_data' in data:
-            progress.scorm_data.update(data['scorm_data'])
-        
-        # Store SCORM suspend_data (for course resume)
-        if 'scorm_suspend_data' in data:
-            progress.scorm_suspend_data = data['scorm_suspend_data']
-        
-        # Calculate completion percentage based on highest slide reached
-        if total_slides > 0:
-            progress.completion_percentage = min(100, int((progress.highest_slide_reached / total_slides) * 100))
-        
-        # Check content completion (all slides reached OR frontend signals completion)
-        if total_slides > 0 and progress.highest_slide_reached >= total_slides:
-            if not progress.content_completed:
-                progress.content_completed = True
-                progress.content_completed_at = timezone.now()
-        
-        # Also accept content_completed from frontend (fallback)
-        if data.get('content_completed') == True and not progress.content_completed:
-            if progress.highest_slide_reached >= total_slides:
-                progress.content_completed = True
-                progress.content_completed_at = timezone.now()
+            # Minutes not reported before; the SCORM queue sends each minute once
+            if 'time_spent' in data:
+                progress.total_time_spent += int(data['time_spent'])
+            
+            # Handle quiz results from Captivate or LMS quiz
+            if 'quiz_score' in data:
+                progress.quiz_score = float(data['quiz_score'])
+                progress.quiz_attempts += 1
+                progress.quiz_passed = progress.quiz_score >= 80  # 80% passing threshold
+                
+                # If content is completed and quiz passed, mark course as fully completed
+                if progress.content_completed and progress.quiz_passed:
+                    if not progress.is_completed:
+                        progress.is_completed = True
+                        progress.completed_at = datetime.now()
+            
+            # Store SCORM data
+            if 'scorm_data' in data:
+                progress.scorm_data.update(data['scorm_data'])
+            
+            # Store SCORM suspend_data (for course resume)
+            if 'scorm_suspend_data' in data:
+                progress.scorm_suspend_data = data['scorm_suspend_data']
+            
+            # Calculate completion percentage based on highest slide reached
+            if total_slides > 0:
+                progress.completion_percentage = min(100, int((progress.highest_slide_reached / total_slides) * 100))
+            
+            # Check content completion (all slides reached OR frontend signals completion)
+            if total_slides > 0 and progress.highest_slide_reached >= total_slides:
+                if not progress.content_completed:
+                    progress.content_completed = True
+                    progress.content_completed_at = timezone.now()
+            
+            # Also accept content_completed from frontend (fallback)
+            if data.get('content_completed') == True and not progress.content_completed:
+                if progress.highest_slide_reached >= total_slides:
+                    progress.content_completed = True
+                    progress.content_completed_at = timezone.now()
+            return None
+        
+        rejected = []
+        with transaction.atomic():
+            for index, event in enumerate(events):
+                rejection = _apply_event(event)
+                if rejection:
+                    rejected.append((index, rejection))
+            
+            # Slide, quiz and completion changes are saved now; slide position,
+            # time spent and SCORM data are coalesced and written in batches
+            save_interactive_progress(progress)
         
-        progress.save()
+        # The outcome of the last (latest) event is the outcome of the request
+        if rejected and rejected[-1][0] == len(events) - 1:
+            payload, status = rejected[-1][1]
+            return JsonResponse(payload, status=status)
         
         return JsonResponse({
             'success': True,
@@ -1093,7 +972,11 @@ def update_interactive_progress(request, interactive_id):
             'can_take_quiz': progress.content_completed,
             'slides_completed': progress.highest_slide_reached,
             'total_slides': total_slides,
-            'total_time_spent': progress.total_time_spent
+            'total_time_spent': progress.total_time_spent,
+            'rejected': [
+                {'index': index, 'code': payload['code'], 'error': payload['error']}
+                for index, (payload, _) in rejected
+            ],
         })
         
     except Exception as e:
@@ -1132,6 +1015,7 @@ def question_bank(request, course_id):
                 order_index=idx
             )
         
+        invalidate_answer_key(course_id=course.id)
         messages.success(request, 'Question added successfully!')
         return redirect('content:question_bank', course_id=course.id)
     
@@ -1198,7 +1082,9 @@ def delete_video(request, video_id):
             
             video_title = video.title
             course_id = video.course.id
+            video_id = video.id
             video.delete()
+            transaction.on_commit(lambda: delete_hls_files(video_id))
             
             messages.success(request, f'Video "{video_title}" deleted successfully!')
             
@@ -1229,6 +1115,7 @@ def delete_question(request, question_id):
             question_text = question.question_text[:50] + "..." if len(question.question_text) > 50 else question.question_text
             course_id = question.course.id
             question.delete()
+            invalidate_answer_key(course_id=course_id)
             
             messages.success(request, f'Question "{question_text}" deleted successfully!')
             
@@ -1304,561 +1191,67 @@ def edit_course_settings(request, course_id):
     return render(request, 'content/edit_course.html', context)
 
 
-@login_required
-def download_course_enrollment_report(request):
-    # ...existing code...
-    # ==========================================
-    # Sheet 6: Enrolled Individuals by Course
-    # ==========================================
-    ws_enrolled = wb.create_sheet("Enrolled Individuals")
-    enrolled_headers = ["#", "Course Title", "Full Name", "Email"]
-    for col, header in enumerate(enrolled_headers, 1):
-        cell = ws_enrolled.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    row = 2
-    idx = 1
-    for course in Course.objects.all().order_by('title'):
-        enrollments = course.enrollments.select_related('user').all()
-        for enrollment in enrollments:
-            user = enrollment.user
-            ws_enrolled.cell(row=row, column=1, value=idx)
-            ws_enrolled.cell(row=row, column=2, value=course.title)
-            ws_enrolled.cell(row=row, column=3, value=user.get_full_name() if hasattr(user, 'get_full_name') else user.username)
-            ws_enrolled.cell(row=row, column=4, value=user.email)
-            row += 1
-            idx += 1
-        # ==========================================
-        # Sheet 6: Enrolled Individuals by Course
-        # ==========================================
-        ws_enrolled = wb.create_sheet("Enrolled Individuals")
-        enrolled_headers = ["#", "Course Title", "Full Name", "Email"]
-        for col, header in enumerate(enrolled_headers, 1):
-            cell = ws_enrolled.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-
-        row = 2
-        idx = 1
-        for course in Course.objects.all().order_by('title'):
-            enrollments = course.enrollments.select_related('user').all()
-            for enrollment in enrollments:
-                user = enrollment.user
-                ws_enrolled.cell(row=row, column=1, value=idx)
-                ws_enrolled.cell(row=row, column=2, value=course.title)
-                ws_enrolled.cell(row=row, column=3, value=user.get_full_name() if hasattr(user, 'get_full_name') else user.username)
-                ws_enrolled.cell(row=row, column=4, value=user.email)
-                row += 1
-                idx += 1
-
-
-# Top-level function definition for download_course_enrollment_report
 @login_required
 def download_course_enrollment_report(request):
     """Download Excel report of course enrollments and completion statistics"""
+    return _report_download(request, 'enrollment')
+
+
+@login_required
+def download_user_performance_report(request):
+    """Download detailed Excel report of individual user quiz performance"""
+    return _report_download(request, 'performance')
+
+
+def _report_download(request, report_type):
+    """Serve the cached report, or queue it and show its progress page"""
     if not request.user.is_risk_admin():
         messages.error(request, 'Unauthorized access.')
         return redirect('content:dashboard')
 
-    from videos.models import InteractiveCourse, InteractiveCourseProgress
-    from certificates.models import Certificate
-
-    # Create workbook
-    wb = Workbook()
-
-    # Header styling
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="002B5C", end_color="002B5C", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    # Success styling (green)
-    success_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    success_font = Font(color="006100")
-
-    # Warning styling (yellow)
-    warning_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-    warning_font = Font(color="9C5700")
-
-    # Danger styling (red)
-    danger_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    danger_font = Font(color="9C0006")
-
-    # Info styling (blue)
-    info_fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-    info_font = Font(color="1F4E79")
-
-    # ==========================================
-    # Sheet 1: Summary Statistics
-    # ==========================================
-    ws_summary = wb.active
-    ws_summary.title = "Summary"
-
-    # Get all bankers
-    all_bankers = User.objects.filter(role='banker')
-    total_bankers = all_bankers.count()
-
-    # Get interactive courses
-    interactive_courses = InteractiveCourse.objects.filter(is_active=True)
-
-    # Calculate statistics
-    total_logged_in = all_bankers.filter(last_login__isnull=False).count()
-    never_logged_in = total_bankers - total_logged_in
-    total_certificates = Certificate.objects.filter(is_valid=True).count()
-
-    # Summary headers
-    ws_summary.cell(row=1, column=1, value="COURSE ENROLLMENT & COMPLETION REPORT").font = Font(bold=True, size=16)
-    ws_summary.cell(row=2, column=1, value=f"Generated: {datetime.now().strftime('%d %B %Y %H:%M')}").font = Font(italic=True)
-    ws_summary.cell(row=3, column=1, value="Co-operative Bank of Tanzania PLC - Risk Department LMS").font = Font(italic=True)
-
-    ws_summary.cell(row=5, column=1, value="OVERALL STATISTICS").font = Font(bold=True, size=12)
-
-    stats = [
-        ("Total Staff (AD Users)", total_bankers),
-        ("Staff Who Have Logged In", total_logged_in),
-        ("Staff Never Logged In", never_logged_in),
-        ("Total Certificates Issued", total_certificates),
-        ("Compliance Rate", f"{round((total_certificates / total_bankers * 100) if total_bankers > 0 else 0, 1)}%"),
-    ]
-
-    for i, (label, value) in enumerate(stats, 6):
-        ws_summary.cell(row=i, column=1, value=label).font = Font(bold=True)
-        ws_summary.cell(row=i, column=2, value=value)
-
-    # Per-course statistics
-    row = len(stats) + 8
-    ws_summary.cell(row=row, column=1, value="PER-COURSE STATISTICS").font = Font(bold=True, size=12)
-    row += 1
-
-    course_headers = ["Course Name", "Total Staff", "Enrolled", "Not Started", "In Progress", "Completed Content", "Certified", "Completion Rate"]
-    for col, header in enumerate(course_headers, 1):
-        cell = ws_summary.cell(row=row, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    row += 1
-    for ic in interactive_courses:
-        enrolled = InteractiveCourseProgress.objects.filter(interactive_course=ic).count()
-        not_started = total_bankers - enrolled
-        completed_content = InteractiveCourseProgress.objects.filter(interactive_course=ic, content_completed=True).count()
-        in_progress = enrolled - completed_content
-        certified = Certificate.objects.filter(interactive_course=ic, is_valid=True).count()
-        completion_rate = round((certified / enrolled * 100) if enrolled > 0 else 0, 1)
-        
-        ws_summary.cell(row=row, column=1, value=ic.title)
-        ws_summary.cell(row=row, column=2, value=total_bankers)
-        ws_summary.cell(row=row, column=3, value=enrolled)
-        ws_summary.cell(row=row, column=4, value=not_started)
-        ws_summary.cell(row=row, column=5, value=in_progress)
-        ws_summary.cell(row=row, column=6, value=completed_content)
-        ws_summary.cell(row=row, column=7, value=certified)
-        ws_summary.cell(row=row, column=8, value=f"{completion_rate}%")
-        row += 1
-
-    # ==========================================
-    # Sheet 2: Detailed Staff Progress (AD Users)
-    # ==========================================
-    ws_staff = wb.create_sheet("Staff Progress (AD)")
-
-    # Build headers dynamically based on courses
-    staff_headers = ["#", "Full Name", "Email (AD Account)", "Last Login", "Login Status"]
-    for ic in interactive_courses:
-        staff_headers.append(f"{ic.title[:30]} - Status")
-        staff_headers.append(f"{ic.title[:30]} - Progress %")
-        staff_headers.append(f"{ic.title[:30]} - Started")
-        staff_headers.append(f"{ic.title[:30]} - Certificate")
-
-    for col, header in enumerate(staff_headers, 1):
-        cell = ws_staff.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    # Add staff data
-    row = 2
-    for idx, banker in enumerate(all_bankers.order_by('first_name', 'last_name'), 1):
-        col = 1
-        
-        # Basic info
-        ws_staff.cell(row=row, column=col, value=idx)
-        col += 1
-        
-        ws_staff.cell(row=row, column=col, value=banker.get_full_name() or banker.username)
-        col += 1
-        
-        ws_staff.cell(row=row, column=col, value=banker.email)
-        col += 1
-        
-        # Last login
-        if banker.last_login:
-            ws_staff.cell(row=row, column=col, value=banker.last_login.strftime('%d %b %Y %H:%M'))
-        else:
-            ws_staff.cell(row=row, column=col, value="Never")
-        col += 1
-        
-        # Login status with color coding
-        login_cell = ws_staff.cell(row=row, column=col)
-        if banker.last_login:
-            login_cell.value = "Logged In"
-            login_cell.fill = success_fill
-            login_cell.font = success_font
-        else:
-            login_cell.value = "Never Logged In"
-            login_cell.fill = danger_fill
-            login_cell.font = danger_font
-        col += 1
-        
-        # Course-specific data
-        for ic in interactive_courses:
-            progress = InteractiveCourseProgress.objects.filter(user=banker, interactive_course=ic).first()
-            certificate = Certificate.objects.filter(user=banker, interactive_course=ic, is_valid=True).first()
-            
-            # Status
-            status_cell = ws_staff.cell(row=row, column=col)
-            if certificate:
-                status_cell.value = "Certified"
-                status_cell.fill = success_fill
-                status_cell.font = success_font
-            elif progress and progress.content_completed:
-                status_cell.value = "Awaiting Quiz"
-                status_cell.fill = info_fill
-                status_cell.font = info_font
-            elif progress:
-                status_cell.value = "In Progress"
-                status_cell.fill = warning_fill
-                status_cell.font = warning_font
-            else:
-                status_cell.value = "Not Started"
-                status_cell.fill = danger_fill
-                status_cell.font = danger_font
-            col += 1
-            
-            # Progress %
-            ws_staff.cell(row=row, column=col, value=progress.completion_percentage if progress else 0)
-            col += 1
-            
-            # Started date
-            if progress:
-                ws_staff.cell(row=row, column=col, value=progress.started_at.strftime('%d %b %Y'))
-            else:
-                ws_staff.cell(row=row, column=col, value="-")
-            col += 1
-            
-            # Certificate
-            cert_cell = ws_staff.cell(row=row, column=col)
-            if certificate:
-                cert_cell.value = certificate.certificate_number
-                cert_cell.fill = success_fill
-            else:
-                cert_cell.value = "No"
-            col += 1
-        
-        row += 1
-
-    # ==========================================
-    # Sheet 3: Not Enrolled Staff
-    # ==========================================
-    ws_not_enrolled = wb.create_sheet("Not Started")
-
-    not_enrolled_headers = ["#", "Full Name", "Email (AD Account)", "Last Login", "Login Status", "Action Required"]
-    for col, header in enumerate(not_enrolled_headers, 1):
-        cell = ws_not_enrolled.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    row = 2
-    idx = 1
-    for banker in all_bankers.order_by('first_name', 'last_name'):
-        # Check if user has started any course
-        has_progress = InteractiveCourseProgress.objects.filter(user=banker).exists()
-        if not has_progress:
-            ws_not_enrolled.cell(row=row, column=1, value=idx)
-            ws_not_enrolled.cell(row=row, column=2, value=banker.get_full_name() or banker.username)
-            ws_not_enrolled.cell(row=row, column=3, value=banker.email)
-            
-            if banker.last_login:
-                ws_not_enrolled.cell(row=row, column=4, value=banker.last_login.strftime('%d %b %Y %H:%M'))
-                login_cell = ws_not_enrolled.cell(row=row, column=5, value="Logged In")
-                login_cell.fill = warning_fill
-                ws_not_enrolled.cell(row=row, column=6, value="Has logged in but not started course")
-            else:
-                ws_not_enrolled.cell(row=row, column=4, value="Never")
-                login_cell = ws_not_enrolled.cell(row=row, column=5, value="Never Logged In")
-                login_cell.fill = danger_fill
-                login_cell.font = danger_font
-                ws_not_enrolled.cell(row=row, column=6, value="Needs to login and start course")
-            
-            row += 1
-            idx += 1
-
-    # ==========================================
-    # Sheet 4: Certified Staff
-    # ==========================================
-    ws_certified = wb.create_sheet("Certified Staff")
-
-    certified_headers = ["#", "Full Name", "Email", "Course", "Certificate Number", "Issue Date", "Score"]
-    for col, header in enumerate(certified_headers, 1):
-        cell = ws_certified.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    certificates = Certificate.objects.filter(is_valid=True).select_related('user', 'interactive_course').order_by('-issue_date')
-
-    for row, cert in enumerate(certificates, 2):
-        ws_certified.cell(row=row, column=1, value=row-1)
-        ws_certified.cell(row=row, column=2, value=cert.user.get_full_name())
-        ws_certified.cell(row=row, column=3, value=cert.user.email)
-        ws_certified.cell(row=row, column=4, value=cert.interactive_course.title if cert.interactive_course else cert.course.title if cert.course else "N/A")
-        ws_certified.cell(row=row, column=5, value=cert.certificate_number)
-        ws_certified.cell(row=row, column=6, value=cert.issue_date.strftime('%d %b %Y') if cert.issue_date else "N/A")
-        ws_certified.cell(row=row, column=7, value=f"{cert.overall_score}%" if cert.overall_score else "N/A")
-
-    # ==========================================
-    # Sheet 5: Legacy Course Overview (Original)
-    # ==========================================
-    ws_overview = wb.create_sheet("Course Overview")
-
-    overview_headers = [
-        "Course ID", "Course Title", "Created By", "Created Date", 
-        "Total Enrollments", "Completed", "In Progress", "Completion Rate (%)",
-        "Avg Quiz Score", "Videos Count", "Questions Count", "Is Published"
-    ]
-    
-    for col, header in enumerate(overview_headers, 1):
-        cell = ws_overview.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # Get course data
-    courses = Course.objects.all().order_by('-created_at')
-    
-    for row, course in enumerate(courses, 2):
-        enrollments = course.enrollments.all()
-        completed = enrollments.filter(is_completed=True).count()
-        total = enrollments.count()
-        completion_rate = (completed / total * 100) if total > 0 else 0
-        
-        # Get average quiz score for this course
-        quiz_attempts = QuizAttempt.objects.filter(course=course, completed_at__isnull=False)
-        avg_score = quiz_attempts.aggregate(Avg('score'))['score__avg'] or 0
-        
-        ws_overview.cell(row=row, column=1, value=course.id)
-        ws_overview.cell(row=row, column=2, value=course.title)
-        ws_overview.cell(row=row, column=3, value=course.created_by.get_full_name() if course.created_by else "N/A")
-        ws_overview.cell(row=row, column=4, value=course.created_at.strftime('%Y-%m-%d'))
-        ws_overview.cell(row=row, column=5, value=total)
-        ws_overview.cell(row=row, column=6, value=completed)
-        ws_overview.cell(row=row, column=7, value=total - completed)
-        ws_overview.cell(row=row, column=8, value=round(completion_rate, 1))
-        ws_overview.cell(row=row, column=9, value=round(avg_score, 1))
-        ws_overview.cell(row=row, column=10, value=course.videos.count())
-        ws_overview.cell(row=row, column=11, value=course.questions.count())
-        ws_overview.cell(row=row, column=12, value="Yes" if course.is_published else "No")
-    
-    # Auto-adjust column widths for all sheets
-    for ws in wb.worksheets:
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 40)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Prepare response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"Course_Enrollment_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
+    job = request_report(report_type, user=request.user)
+    if job.status == 'completed':
+        return _report_file_response(job)
+
+    return render(request, 'content/report_status.html', {
+        'job': job,
+        'report_title': REPORTS[report_type]['title'],
+    })
+
+
+def _report_file_response(job):
+    response = FileResponse(job.file.open('rb'), as_attachment=True, filename=get_report_filename(job))
+    response['Content-Type'] = XLSX_CONTENT_TYPE
     return response
 
 
 @login_required
-def download_user_performance_report(request):
-    """Download detailed Excel report of individual user quiz performance"""
+def report_job_status(request, job_id):
+    """Progress of a background report job (polled by the report status page)"""
+    if not request.user.is_risk_admin():
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    job = get_object_or_404(ReportJob, id=job_id)
+    data = {
+        'status': job.status,
+        'progress': job.progress,
+    }
+    if job.status == 'completed':
+        data['download_url'] = reverse('content:report_job_download', args=[job.id])
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return JsonResponse(data)
+
+
+@login_required
+def download_report_job(request, job_id):
+    """Download the file produced by a completed report job"""
     if not request.user.is_risk_admin():
         messages.error(request, 'Unauthorized access.')
         return redirect('content:dashboard')
-    
-    # Create workbook
-    wb = Workbook()
-    
-    # Quiz Performance Overview Sheet
-    ws_overview = wb.active
-    ws_overview.title = "Quiz Performance Overview"
-    
-    # Header styling
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    overview_headers = [
-        "User ID", "Full Name", "Email", "Course Title", "Quiz Attempts", 
-        "Best Score", "Latest Score", "Avg Score", "Questions Answered", 
-        "Correct Answers", "Wrong Answers", "Accuracy (%)", "Last Attempt Date"
-    ]
-    
-    for col, header in enumerate(overview_headers, 1):
-        cell = ws_overview.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # Get all completed quiz attempts (regular and interactive courses)
-    attempts_data = []
-    users = User.objects.filter(role='banker')
-
-    for user in users:
-        # All completed quiz attempts for this user (regular and interactive)
-        user_attempts = QuizAttempt.objects.filter(
-            user=user,
-            completed_at__isnull=False
-        ).order_by('-completed_at')
-
-        # Group attempts by course or interactive_course
-        course_attempts = {}
-        for attempt in user_attempts:
-            # Use course or interactive_course as key
-            course_key = attempt.course if attempt.course else attempt.interactive_course
-            if not course_key:
-                continue
-            if course_key not in course_attempts:
-                course_attempts[course_key] = []
-            course_attempts[course_key].append(attempt)
-
-        for course_key, attempts in course_attempts.items():
-            best_score = max(a.score for a in attempts if a.score is not None)
-            latest_score = attempts[0].score if attempts[0].score is not None else 0
-            avg_score = sum(a.score for a in attempts if a.score is not None) / len([a for a in attempts if a.score is not None])
-
-            # Get answer statistics for this course/interactive_course
-            user_answers = QuizAnswer.objects.filter(
-                attempt__in=attempts
-            )
-            total_answers = user_answers.count()
-            correct_answers = user_answers.filter(is_correct=True).count()
-            wrong_answers = total_answers - correct_answers
-            accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
-
-            # Get course/inter_course title
-            if hasattr(course_key, 'title'):
-                course_title = course_key.title
-            else:
-                course_title = str(course_key)
 
-            attempts_data.append({
-                'user': user,
-                'course': course_title,
-                'attempts_count': len(attempts),
-                'best_score': best_score,
-                'latest_score': latest_score,
-                'avg_score': avg_score,
-                'total_answers': total_answers,
-                'correct_answers': correct_answers,
-                'wrong_answers': wrong_answers,
-                'accuracy': accuracy,
-                'last_attempt': attempts[0].completed_at
-            })
-    
-    # Populate overview sheet
-    for row, data in enumerate(attempts_data, 2):
-        ws_overview.cell(row=row, column=1, value=data['user'].id)
-        ws_overview.cell(row=row, column=2, value=data['user'].get_full_name())
-        ws_overview.cell(row=row, column=3, value=data['user'].email)
-        ws_overview.cell(row=row, column=4, value=data['course'])
-        ws_overview.cell(row=row, column=5, value=data['attempts_count'])
-        ws_overview.cell(row=row, column=6, value=round(data['best_score'], 1))
-        ws_overview.cell(row=row, column=7, value=round(data['latest_score'], 1))
-        ws_overview.cell(row=row, column=8, value=round(data['avg_score'], 1))
-        ws_overview.cell(row=row, column=9, value=data['total_answers'])
-        ws_overview.cell(row=row, column=10, value=data['correct_answers'])
-        ws_overview.cell(row=row, column=11, value=data['wrong_answers'])
-        ws_overview.cell(row=row, column=12, value=round(data['accuracy'], 1))
-        ws_overview.cell(row=row, column=13, value=data['last_attempt'].strftime('%Y-%m-%d %H:%M'))
-    
-    # Detailed Answers Sheet
-    ws_details = wb.create_sheet("Detailed Answer Analysis")
-    
-    detail_headers = [
-        "User Name", "Email", "Course", "Question Text", "Correct Answer", 
-        "User Answer", "Is Correct", "Question Topic", "Difficulty", 
-        "Points", "Attempt Date", "Attempt Score"
-    ]
-    
-    for col, header in enumerate(detail_headers, 1):
-        cell = ws_details.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # Get detailed answer data
-    user_answers = QuizAnswer.objects.select_related(
-        'attempt__user', 'attempt__course', 'question'
-    ).order_by('-attempt__completed_at')
-    
-    for row, answer in enumerate(user_answers, 2):
-        attempt = answer.attempt
-        question = answer.question
-        
-        # Find correct answer
-        correct_option = question.options.filter(is_correct=True).first()
-        correct_text = correct_option.option_text if correct_option else "N/A"
-        
-        # Get user's selected answers (could be multiple for multiple answer questions)
-        selected_options = answer.selected_options.all()
-        user_answer_text = ", ".join([opt.option_text for opt in selected_options]) if selected_options else "No Answer"
-        
-        ws_details.cell(row=row, column=1, value=attempt.user.get_full_name())
-        ws_details.cell(row=row, column=2, value=attempt.user.email)
-        ws_details.cell(row=row, column=3, value=attempt.course.title if attempt.course else "N/A")
-        ws_details.cell(row=row, column=4, value=question.question_text[:100] + "..." if len(question.question_text) > 100 else question.question_text)
-        ws_details.cell(row=row, column=5, value=correct_text)
-        ws_details.cell(row=row, column=6, value=user_answer_text)
-        ws_details.cell(row=row, column=7, value="✓ Correct" if answer.is_correct else "✗ Wrong")
-        ws_details.cell(row=row, column=8, value=question.topic or "General")
-        ws_details.cell(row=row, column=9, value=question.get_difficulty_display())
-        ws_details.cell(row=row, column=10, value=question.points)
-        ws_details.cell(row=row, column=11, value=attempt.completed_at.strftime('%Y-%m-%d %H:%M'))
-        ws_details.cell(row=row, column=12, value=round(attempt.score, 1))
-        
-        # Color code correct/wrong answers
-        if answer.is_correct:
-            ws_details.cell(row=row, column=7).fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        else:
-            ws_details.cell(row=row, column=7).fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    
-    # Auto-adjust column widths
-    for ws in [ws_overview, ws_details]:
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 60)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Prepare response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"User_Performance_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+    job = get_object_or_404(ReportJob, id=job_id, status='completed')
+    return _report_file_response(job)
 
 
 # =====================================================
@@ -1939,6 +1332,7 @@ def add_interactive_question(request, interactive_id):
                 )
                 order_index += 1
         
+        invalidate_answer_key(interactive_course_id=interactive_course.id)
         messages.success(request, f'Question added successfully! Total questions: {Question.objects.filter(interactive_course=interactive_course).count()}')
         return redirect('content:interactive_question_bank', interactive_id=interactive_id)
     
@@ -1990,6 +1384,7 @@ def edit_interactive_question(request, interactive_id, question_id):
                 )
                 order_index += 1
         
+        invalidate_answer_key(interactive_course_id=interactive_course.id)
         messages.success(request, 'Question updated successfully!')
         return redirect('content:interactive_question_bank', interactive_id=interactive_id)
     
@@ -2016,6 +1411,7 @@ def delete_interactive_question(request, interactive_id, question_id):
     
     if request.method == 'POST':
         question.delete()
+        invalidate_answer_key(interactive_course_id=interactive_course.id)
         messages.success(request, 'Question deleted successfully!')
     
     return redirect('content:interactive_question_bank', interactive_id=interactive_id)
@@ -2042,6 +1438,7 @@ def delete_interactive_course(request, interactive_id):
         
         # Delete questions associated with this interactive course
         Question.objects.filter(interactive_course=interactive_course).delete()
+        invalidate_answer_key(interactive_course_id=interactive_course.id)
         
         # Delete extracted files if they exist
         if interactive_course.extracted_path:
@@ -2059,8 +1456,10 @@ def delete_interactive_course(request, interactive_id):
             except Exception:
                 pass
         
-        # Delete the interactive course record
+        # Delete the interactive course record, then the blobs only it used
+        blob_hashes = list(interactive_course.package_files.values_list('sha256', flat=True))
         interactive_course.delete()
+        release_blobs(blob_hashes)
         
         messages.success(request, f'Interactive course "{title}" and all associated data have been deleted.')
     
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Course, Enrollment
 from risk_lms.admin import risk_admin_site
+from videos.thumbnails import queue_thumbnail
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -35,6 +36,8 @@ class CourseAdmin(admin.ModelAdmin):
         if not change:  # If creating new course
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+        if 'thumbnail' in form.changed_data:
+            queue_thumbnail(obj)
 
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
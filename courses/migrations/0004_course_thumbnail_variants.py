@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_target_departments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized thumbnails (see videos.thumbnails)'),
+        ),
+    ]
@@ -2,8 +2,9 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+from risk_lms.images import ThumbnailVariantsMixin
 
-class Course(models.Model):
+class Course(ThumbnailVariantsMixin, models.Model):
     """Course model"""
     DEPARTMENT_CHOICES = [
         ('all', 'All Departments'),
@@ -26,6 +27,7 @@ class Course(models.Model):
     is_published = models.BooleanField(default=False)
     passing_score = models.IntegerField(default=80)
     thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, help_text='Resized thumbnails (see videos.thumbnails)')
     target_departments = models.JSONField(default=list, blank=True, help_text='List of department keys that should be enrolled/targeted')
     
     # Course completion time limits
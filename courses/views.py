@@ -7,85 +7,52 @@ from videos.models import Video, VideoProgress, InteractiveCourse, InteractiveCo
 from quizzes.models import Question, QuizAttempt
 from certificates.models import Certificate
 from accounts.models import User
+from progress.analytics import get_dashboard_summary
+from progress.summary import ensure_summaries, get_user_summaries
 import re
 
 @login_required
 def dashboard_view(request):
     """Main dashboard view"""
     if request.user.is_risk_admin():
-        # Risk Admin dashboard
-        from accounts.models import User
-        
-        # Basic counts
-        total_bankers = User.objects.filter(role='banker').count()
+        # Risk Admin dashboard - basic counts
         total_courses = Course.objects.count()
         total_videos = Video.objects.count()
         total_questions = Question.objects.count()
         courses = Course.objects.all()
         
-        # Real enrollment and completion statistics
-        interactive_courses = InteractiveCourse.objects.filter(is_active=True)
-        
-        # Total enrollments (users who started any course)
-        total_enrollments = InteractiveCourseProgress.objects.values('user').distinct().count()
-        
-        # Total completed (passed quiz and got certificate)
-        total_certificates = Certificate.objects.filter(is_valid=True).count()
-        
-        # Users in progress (started but not completed)
-        users_with_certificates = Certificate.objects.filter(is_valid=True).values_list('user_id', flat=True)
-        users_in_progress = InteractiveCourseProgress.objects.exclude(
-            user_id__in=users_with_certificates
-        ).values('user').distinct().count()
-        
-        # Not enrolled (haven't started any course)
-        enrolled_user_ids = InteractiveCourseProgress.objects.values_list('user_id', flat=True).distinct()
-        not_enrolled = total_bankers - len(set(enrolled_user_ids))
-        
-        # Compliance rate (certified / total bankers)
-        compliance_rate = round((total_certificates / total_bankers * 100) if total_bankers > 0 else 0, 1)
-        
-        # Pending certifications (completed content but no certificate)
-        pending_certifications = InteractiveCourseProgress.objects.filter(
-            content_completed=True
-        ).exclude(
-            user_id__in=users_with_certificates
-        ).count()
+        # Real enrollment and completion statistics (constant number of queries)
+        summary = get_dashboard_summary()
         
         context = {
-            'total_bankers': total_bankers,
             'total_courses': total_courses,
             'total_videos': total_videos,
             'total_questions': total_questions,
             'courses': courses,
             # New analytics data
-            'total_enrollments': total_enrollments,
-            'total_certificates': total_certificates,
-            'users_in_progress': users_in_progress,
-            'not_enrolled': not_enrolled,
-            'compliance_rate': compliance_rate,
-            'pending_certifications': pending_certifications,
-            'total_users': total_bankers,  # For template compatibility
+            **summary,
+            'total_users': summary['total_bankers'],  # For template compatibility
         }
     else:
         # Banker dashboard
         enrolled_courses = Enrollment.objects.filter(user=request.user).select_related('course')
-        videos_completed = VideoProgress.objects.filter(user=request.user, is_completed=True).count()
         quizzes_passed = QuizAttempt.objects.filter(user=request.user, passed=True).count()
         certificates_earned = Certificate.objects.filter(user=request.user, is_valid=True).count()
         
+        # Per-course figures come from the progress rollup table
+        ensure_summaries((request.user.id, enrollment.course_id) for enrollment in enrolled_courses)
+        summaries = get_user_summaries(request.user)
+        videos_completed = sum(summary.videos_completed for summary in summaries.values())
+        
         # Get total videos across all enrolled courses for progress calculation
         total_videos_enrolled = 0
         course_progress_data = []
         
         for enrollment in enrolled_courses:
             course = enrollment.course
-            course_videos = course.videos.count()
-            course_completed_videos = VideoProgress.objects.filter(
-                user=request.user,
-                video__course=course,
-                is_completed=True
-            ).count()
+            summary = summaries.get(course.id)
+            course_videos = summary.videos_total if summary else 0
+            course_completed_videos = summary.videos_completed if summary else 0
             
             total_videos_enrolled += course_videos
             
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from .models import CourseProgressSummary, ReportJob
+from risk_lms.admin import risk_admin_site
+
+@admin.register(CourseProgressSummary)
+class CourseProgressSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'course', 'videos_completed', 'videos_total', 'interactive_completed', 'interactive_total', 'best_score', 'certified', 'last_activity']
+    list_filter = ['certified', 'course']
+    search_fields = ['user__email', 'course__title']
+    list_select_related = ['user', 'course']
+    readonly_fields = ['updated_at']
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['report_type', 'status', 'progress', 'requested_by', 'created_at', 'completed_at']
+    list_filter = ['report_type', 'status']
+    readonly_fields = ['fingerprint', 'created_at', 'started_at', 'completed_at', 'error']
+
+# Register with custom admin site
+risk_admin_site.register(CourseProgressSummary, CourseProgressSummaryAdmin)
+risk_admin_site.register(ReportJob, ReportJobAdmin)
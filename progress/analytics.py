@@ -0,0 +1,256 @@
+"""
+Set-based analytics engine for interactive course progress.
+
+Builds the banker x module status matrix from a fixed number of grouped
+queries and joins the results in memory, so the query count does not grow
+with the number of bankers. Used by the analytics page, the Excel reports
+and the admin dashboard.
+"""
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from accounts.models import User
+from certificates.models import Certificate
+from videos.models import InteractiveCourse, InteractiveCourseProgress
+
+
+def get_bankers():
+    """All bankers (potential learners)"""
+    return User.objects.filter(role='banker')
+
+
+def get_active_interactive_courses():
+    """Active interactive courses with their parent course preloaded"""
+    return InteractiveCourse.objects.filter(is_active=True).select_related('course')
+
+
+def get_progress_index(interactive_courses, user_ids=None):
+    """
+    Map (user_id, interactive_course_id) -> progress row values.
+
+    Only the columns the reports need are loaded; the JSON slide blobs are
+    never deserialized.
+    """
+    progress_qs = InteractiveCourseProgress.objects.filter(
+        interactive_course__in=interactive_courses
+    )
+    if user_ids is not None:
+        progress_qs = progress_qs.filter(user_id__in=user_ids)
+
+    index = {}
+    for row in progress_qs.values(
+        'user_id', 'interactive_course_id', 'completion_percentage',
+        'content_completed', 'started_at', 'updated_at',
+    ):
+        index[(row['user_id'], row['interactive_course_id'])] = row
+    return index
+
+
+def get_certificate_index(interactive_courses, user_ids=None):
+    """Map (user_id, interactive_course_id) -> latest valid certificate number"""
+    certificate_qs = Certificate.objects.filter(
+        interactive_course__in=interactive_courses,
+        is_valid=True,
+    )
+    if user_ids is not None:
+        certificate_qs = certificate_qs.filter(user_id__in=user_ids)
+
+    index = {}
+    for user_id, ic_id, number in certificate_qs.order_by('-issue_date').values_list(
+        'user_id', 'interactive_course_id', 'certificate_number'
+    ):
+        # Keep the most recent certificate, matching the old .first() lookups
+        index.setdefault((user_id, ic_id), number)
+    return index
+
+
+def build_course_analytics(interactive_courses, total_bankers):
+    """Per-module enrollment/completion statistics (two grouped queries)"""
+    seven_days_ago = timezone.now() - timedelta(days=7)
+
+    progress_stats = {
+        row['interactive_course_id']: row
+        for row in InteractiveCourseProgress.objects.filter(
+            interactive_course__in=interactive_courses
+        ).values('interactive_course_id').annotate(
+            enrolled=Count('id'),
+            completed_content=Count('id', filter=Q(content_completed=True)),
+            avg_completion=Avg('completion_percentage'),
+            recent_activity=Count('id', filter=Q(updated_at__gte=seven_days_ago)),
+        ).order_by()
+    }
+
+    certificate_counts = dict(
+        Certificate.objects.filter(
+            interactive_course__in=interactive_courses,
+            is_valid=True,
+        ).values('interactive_course_id').annotate(
+            total=Count('id')
+        ).order_by().values_list('interactive_course_id', 'total')
+    )
+
+    # Keep the original grouping: courses newest first, modules in play order
+    ordered = sorted(
+        interactive_courses,
+        key=lambda ic: (-ic.course.created_at.timestamp(), ic.course_id, ic.order_index, ic.created_at),
+    )
+
+    course_analytics = []
+    for ic in ordered:
+        stats = progress_stats.get(ic.id, {})
+        enrolled_count = stats.get('enrolled', 0)
+        completed_content_count = stats.get('completed_content', 0)
+        passed_quiz_count = certificate_counts.get(ic.id, 0)
+        avg_completion = stats.get('avg_completion') or 0
+
+        course_analytics.append({
+            'course': ic.course,
+            'interactive_course': ic,
+            'total_bankers': total_bankers,
+            'enrolled_count': enrolled_count,
+            'not_enrolled_count': total_bankers - enrolled_count,
+            'in_progress_count': enrolled_count - completed_content_count,
+            'completed_content_count': completed_content_count,
+            'passed_quiz_count': passed_quiz_count,
+            'avg_completion': round(avg_completion, 1),
+            'recent_activity': stats.get('recent_activity', 0),
+            'enrollment_rate': round((enrolled_count / total_bankers * 100) if total_bankers > 0 else 0, 1),
+            'completion_rate': round((passed_quiz_count / enrolled_count * 100) if enrolled_count > 0 else 0, 1),
+        })
+
+    return course_analytics
+
+
+def build_user_progress_list(bankers, interactive_courses, user_ids=None):
+    """
+    Per-banker status for every module, joined in memory.
+
+    Each course entry keeps the keys the analytics template expects and adds
+    ``content_completed`` and ``certificate_number`` for the Excel reports.
+    Pass ``user_ids`` to restrict the lookups when processing bankers in chunks.
+    """
+    progress_index = get_progress_index(interactive_courses, user_ids=user_ids)
+    certificate_index = get_certificate_index(interactive_courses, user_ids=user_ids)
+
+    user_progress_list = []
+    for banker in bankers:
+        user_data = {
+            'user': banker,
+            'full_name': banker.get_full_name() or banker.username,
+            'email': banker.email,
+            'last_login': banker.last_login,
+            'has_logged_in': banker.last_login is not None,
+            'courses': []
+        }
+
+        for ic in interactive_courses:
+            progress = progress_index.get((banker.id, ic.id))
+            certificate_number = certificate_index.get((banker.id, ic.id))
+
+            if progress:
+                if certificate_number:
+                    status = 'completed'
+                elif progress['completion_percentage'] < 100:
+                    status = 'in_progress'
+                else:
+                    status = 'awaiting_quiz'
+                course_data = {
+                    'course': ic,
+                    'status': status,
+                    'progress': progress['completion_percentage'],
+                    'has_certificate': bool(certificate_number),
+                    'certificate_number': certificate_number,
+                    'content_completed': progress['content_completed'],
+                    'last_activity': progress['updated_at'],
+                    'started_at': progress['started_at'],
+                }
+            else:
+                course_data = {
+                    'course': ic,
+                    'status': 'not_started',
+                    'progress': 0,
+                    'has_certificate': False,
+                    'certificate_number': None,
+                    'content_completed': False,
+                    'last_activity': None,
+                    'started_at': None,
+                }
+
+            user_data['courses'].append(course_data)
+
+        user_progress_list.append(user_data)
+
+    return user_progress_list
+
+
+def _status_sort_key(user_data):
+    """In progress first, then not started, then completed"""
+    statuses = [c['status'] for c in user_data['courses']]
+    if 'in_progress' in statuses:
+        return 0
+    elif 'not_started' in statuses:
+        return 1
+    return 2
+
+
+def build_analytics():
+    """Full context for the course analytics dashboard"""
+    bankers = list(get_bankers())
+    total_bankers = len(bankers)
+    interactive_courses = list(get_active_interactive_courses())
+
+    course_analytics = build_course_analytics(interactive_courses, total_bankers)
+
+    user_progress_list = build_user_progress_list(bankers, interactive_courses)
+    user_progress_list.sort(key=_status_sort_key)
+
+    total_enrollments = InteractiveCourseProgress.objects.count()
+    total_completed = InteractiveCourseProgress.objects.filter(content_completed=True).count()
+    total_certificates = Certificate.objects.filter(is_valid=True).count()
+
+    return {
+        'course_analytics': course_analytics,
+        'total_bankers': total_bankers,
+        'total_enrollments': total_enrollments,
+        'total_completed': total_completed,
+        'total_certificates': total_certificates,
+        'overall_enrollment_rate': round((total_enrollments / total_bankers * 100) if total_bankers > 0 else 0, 1),
+        'overall_completion_rate': round((total_certificates / total_enrollments * 100) if total_enrollments > 0 else 0, 1),
+        'user_progress_list': user_progress_list,
+        'interactive_courses': interactive_courses,
+    }
+
+
+def get_dashboard_summary():
+    """Headline enrollment/compliance figures for the admin dashboard"""
+    total_bankers = get_bankers().count()
+
+    certified_user_ids = Certificate.objects.filter(is_valid=True).values('user_id')
+    progress_qs = InteractiveCourseProgress.objects.all()
+
+    # Users who started any course / are in progress (started, no certificate)
+    total_enrollments = progress_qs.values('user').distinct().count()
+    users_in_progress = progress_qs.exclude(
+        user_id__in=certified_user_ids
+    ).values('user').distinct().count()
+
+    total_certificates = Certificate.objects.filter(is_valid=True).count()
+
+    # Completed content but no certificate yet
+    pending_certifications = progress_qs.filter(
+        content_completed=True
+    ).exclude(
+        user_id__in=certified_user_ids
+    ).count()
+
+    return {
+        'total_bankers': total_bankers,
+        'total_enrollments': total_enrollments,
+        'total_certificates': total_certificates,
+        'users_in_progress': users_in_progress,
+        'not_enrolled': total_bankers - total_enrollments,
+        'compliance_rate': round((total_certificates / total_bankers * 100) if total_bankers > 0 else 0, 1),
+        'pending_certifications': pending_certifications,
+    }
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ProgressConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'progress'
+
+    def ready(self):
+        # Keep CourseProgressSummary rows in sync with progress writes
+        from . import signals  # noqa: F401
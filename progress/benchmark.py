@@ -0,0 +1,131 @@
+"""
+Query-count budgets of the main pages.
+
+``run_benchmarks`` requests every page in BENCHMARKS through the test client
+as the seeded risk admin or banker (see progress.seeding). For each page it
+records the number of queries, the wall time and the peak Python memory.
+A page that makes more queries than its budget fails, so an N+1 query that
+creeps back in is caught before it reaches a bank-sized database.
+
+Caches are cleared before every request, so each figure is that of a cold
+page. The statement repeated most often is reported with the counts, since
+a repeated statement is usually how an N+1 pattern shows.
+"""
+import re
+import statistics
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+# user: 'admin' or 'banker'; args: keys of the seed_bank result
+Benchmark = namedtuple('Benchmark', 'name user url_name args budget')
+
+# Budgets are the query counts at the default seed_bank sizes plus a little
+# headroom. Pages noted "per ..." still make a query per row shown; lower
+# their budgets when that is fixed.
+BENCHMARKS = [
+    # per course: enrollment counts
+    Benchmark('admin_dashboard', 'admin', 'courses:dashboard', (), 47),
+    Benchmark('banker_dashboard', 'banker', 'courses:dashboard', (), 13),
+    # per course: video counts
+    Benchmark('course_list', 'banker', 'courses:course_list', (), 40),
+    # per video: progress
+    Benchmark('course_detail', 'banker', 'courses:course_detail', ('course_id',), 31),
+    Benchmark('play_interactive', 'banker', 'content:play_interactive', ('course_id', 'interactive_id'), 12),
+    Benchmark('my_certificates', 'banker', 'certificates:my_certificates', (), 12),
+    # per course: video, module and question counts
+    Benchmark('content_dashboard', 'admin', 'content:dashboard', (), 46),
+    Benchmark('content_course_detail', 'admin', 'content:course_detail', ('course_id',), 14),
+    # per module: question counts
+    Benchmark('interactive_course_list', 'admin', 'content:interactive_list', (), 33),
+    # per question: options
+    Benchmark('question_bank', 'admin', 'content:question_bank', ('course_id',), 31),
+    Benchmark('course_analytics', 'admin', 'progress:course_analytics', (), 17),
+    Benchmark('course_progress', 'admin', 'progress:course_progress', ('course_id',), 13),
+    Benchmark('user_progress', 'admin', 'progress:user_progress', ('banker_id',), 14),
+]
+
+# Literals replaced when grouping statements that differ only in their values
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+SQL_SAMPLE_LENGTH = 300
+
+
+def _clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def _most_repeated(queries):
+    statements = Counter(SQL_LITERALS.sub('?', query['sql']) for query in queries)
+    if not statements:
+        return None
+    sql, count = statements.most_common(1)[0]
+    return {'count': count, 'sql': sql[:SQL_SAMPLE_LENGTH]}
+
+
+def measure(client, url, repeat=3):
+    """Status, queries, timings (ms) and peak memory (KB) of GET ``url``"""
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Read before the next request resets the query log
+    queries = captured.captured_queries
+
+    # Timed without tracemalloc, which slows Python down several times
+    timings = []
+    for _ in range(repeat):
+        _clear_caches()
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'status': response.status_code,
+        'queries': len(queries),
+        'most_repeated': _most_repeated(queries),
+        'time_ms': {
+            'min': round(min(timings), 1) if timings else None,
+            'median': round(statistics.median(timings), 1) if timings else None,
+        },
+        'peak_memory_kb': round(peak / 1024),
+    }
+
+
+def run_benchmarks(seeded, repeat=3, names=None):
+    """Measure the BENCHMARKS (or those named) against the data made by seed_bank"""
+    User = get_user_model()
+    clients = {}
+    for user, key in (('admin', 'admin_id'), ('banker', 'banker_id')):
+        # An error page counts as a failure instead of stopping the run
+        client = Client(raise_request_exception=False)
+        client.force_login(User.objects.get(pk=seeded[key]))
+        clients[user] = client
+
+    results = []
+    for benchmark in BENCHMARKS:
+        if names and benchmark.name not in names:
+            continue
+        url = reverse(benchmark.url_name, args=[seeded[key] for key in benchmark.args])
+        result = measure(clients[benchmark.user], url, repeat)
+        result.update({
+            'name': benchmark.name,
+            'user': benchmark.user,
+            'url': url,
+            'budget': benchmark.budget,
+            'passed': result['status'] == 200 and result['queries'] <= benchmark.budget,
+        })
+        results.append(result)
+    return results
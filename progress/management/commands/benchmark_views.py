@@ -0,0 +1,79 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.utils import timezone
+
+from progress.benchmark import BENCHMARKS, run_benchmarks
+from progress.seeding import seed_bank
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database, request the main pages and fail if one makes more '
+        'queries than its budget (see progress.benchmark); optionally write the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bankers', type=int, default=200, help='Bankers to seed (default: 200)')
+        parser.add_argument('--courses', type=int, default=10, help='Courses to seed (default: 10)')
+        parser.add_argument('--videos', type=int, default=5, help='Videos per course (default: 5)')
+        parser.add_argument('--modules', type=int, default=2, help='Interactive modules per course (default: 2)')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per course (default: 20)')
+        parser.add_argument('--attempts', type=int, default=3, help='Quiz attempts until a pass, at most (default: 3)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed requests per page (default: 3)')
+        parser.add_argument(
+            '--only', action='append', dest='names', choices=[benchmark.name for benchmark in BENCHMARKS],
+            help='Only this page (repeatable)',
+        )
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        # The same throwaway database "manage.py test" uses, never the real one
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            self.stdout.write('Seeding...')
+            seeded = seed_bank(
+                bankers=options['bankers'], courses=options['courses'],
+                videos_per_course=options['videos'], modules_per_course=options['modules'],
+                questions_per_course=options['questions'], max_attempts=options['attempts'],
+            )
+            results = run_benchmarks(seeded, repeat=options['repeat'], names=options['names'])
+            vendor = connection.vendor
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        for result in results:
+            line = (
+                f"{result['name']:<26} {result['queries']:>4}/{result['budget']:<4} queries "
+                f"{result['time_ms']['median'] or 0:>8.1f} ms {result['peak_memory_kb']:>7} KB"
+            )
+            if result['status'] != 200:
+                line += f" HTTP {result['status']}"
+            repeated = result['most_repeated']
+            if not result['passed'] and repeated and repeated['count'] > 1:
+                line += f"\n    {repeated['count']}x {repeated['sql']}"
+            self.stdout.write(self.style.SUCCESS(line) if result['passed'] else self.style.ERROR(line))
+
+        if options['output']:
+            report = {
+                'generated_at': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': vendor,
+                'seed': seeded['counts'],
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        failed = [result['name'] for result in results if not result['passed']]
+        if failed:
+            raise CommandError(f"Over budget or not HTTP 200: {', '.join(failed)}")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from progress.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CourseProgressSummary rollup table from raw progress, quiz and certificate rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course', type=int, action='append', dest='course_ids',
+            help='Only rebuild summaries for this course id (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per bulk insert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_summaries(
+            course_ids=options['course_ids'],
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} progress summary row(s) in {elapsed:.1f}s'
+        ))
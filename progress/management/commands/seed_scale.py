@@ -0,0 +1,60 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from progress.seeding import SEED_PASSWORD, SEED_PREFIX, seed_bank
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with production-scale synthetic data (bankers, courses, videos, '
+        'interactive modules, questions, progress, quiz attempts and certificates) for profiling'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bankers', type=int, default=20000, help='Bankers to create (default: 20000)')
+        parser.add_argument('--courses', type=int, default=40, help='Courses to create (default: 40)')
+        parser.add_argument('--videos', type=int, default=8, help='Videos per course (default: 8)')
+        parser.add_argument('--modules', type=int, default=3, help='Interactive modules per course (default: 3)')
+        parser.add_argument('--questions', type=int, default=30, help='Questions per course (default: 30)')
+        parser.add_argument('--module-questions', type=int, default=10, help='Questions per module (default: 10)')
+        parser.add_argument('--attempts', type=int, default=3, help='Quiz attempts until a pass, at most (default: 3)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Bankers (and rows per insert) per batch (default: 1000)')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive', help='Do not ask for confirmation')
+
+    def handle(self, *args, **options):
+        if get_user_model().objects.filter(username__startswith=SEED_PREFIX).exists():
+            raise CommandError(
+                'The database already holds seeded data. Seed an empty database '
+                '(e.g. run "manage.py flush" on a scratch copy) instead.'
+            )
+        database = connection.settings_dict['NAME']
+        if options['interactive']:
+            answer = input(
+                f"This adds {options['bankers']} bankers and their activity to database '{database}'. "
+                "Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Cancelled.')
+
+        started = time.monotonic()
+
+        def report(done, total):
+            self.stdout.write(f'  {done}/{total} bankers ({time.monotonic() - started:.0f}s)')
+
+        seeded = seed_bank(
+            bankers=options['bankers'], courses=options['courses'],
+            videos_per_course=options['videos'], modules_per_course=options['modules'],
+            questions_per_course=options['questions'], questions_per_module=options['module_questions'],
+            max_attempts=options['attempts'], seed=options['seed'], batch_size=options['batch_size'],
+            on_progress=report,
+        )
+        for name, count in seeded['counts'].items():
+            self.stdout.write(f'{name:<22} {count:>9}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.monotonic() - started:.1f}s. Users are {SEED_PREFIX}admin@... and '
+            f'{SEED_PREFIX}banker-000001@... with password "{SEED_PASSWORD}".'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0003_course_target_departments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgressSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('videos_total', models.IntegerField(default=0)),
+                ('videos_completed', models.IntegerField(default=0)),
+                ('interactive_total', models.IntegerField(default=0)),
+                ('interactive_completed', models.IntegerField(default=0)),
+                ('best_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('attempts', models.IntegerField(default=0, help_text='Completed quiz attempts')),
+                ('certified', models.BooleanField(default=False, help_text='Holds a valid certificate for the course or one of its modules')),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_summaries', to='courses.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'course_progress_summaries',
+                'indexes': [models.Index(fields=['course', 'user'], name='cps_course_user_idx')],
+                'unique_together': {('user', 'course')},
+            },
+        ),
+    ]
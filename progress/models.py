@@ -0,0 +1,92 @@
+from django.db import models
+from django.conf import settings
+from courses.models import Course
+
+
+class CourseProgressSummary(models.Model):
+    """
+    Denormalized per-user/per-course progress rollup.
+
+    Maintained incrementally by the signal handlers in progress.signals and
+    rebuilt in bulk by the rebuild_progress_summary management command, so
+    dashboards can read one row per user-course instead of aggregating raw
+    progress, quiz and certificate rows on every request.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='course_summaries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress_summaries')
+
+    videos_total = models.IntegerField(default=0)
+    videos_completed = models.IntegerField(default=0)
+    interactive_total = models.IntegerField(default=0)
+    interactive_completed = models.IntegerField(default=0)
+
+    # Quiz results for the course quiz and its interactive module quizzes
+    best_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    attempts = models.IntegerField(default=0, help_text='Completed quiz attempts')
+
+    certified = models.BooleanField(default=False, help_text='Holds a valid certificate for the course or one of its modules')
+    last_activity = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'course_progress_summaries'
+        unique_together = ['user', 'course']
+        indexes = [
+            models.Index(fields=['course', 'user'], name='cps_course_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.course_id} summary"
+
+    @property
+    def video_progress(self):
+        """Percentage of course videos completed"""
+        return (self.videos_completed / self.videos_total * 100) if self.videos_total > 0 else 0
+
+    @property
+    def content_progress(self):
+        """Percentage of videos and interactive modules completed"""
+        total = self.videos_total + self.interactive_total
+        completed = self.videos_completed + self.interactive_completed
+        return (completed / total * 100) if total > 0 else 0
+
+
+class ReportJob(models.Model):
+    """
+    Background generation of an Excel report.
+
+    ``fingerprint`` identifies the state of the data the report was built
+    from; a completed job is served again for as long as the fingerprint of
+    the live data still matches.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    report_type = models.CharField(max_length=50)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.IntegerField(default=0, help_text='Percentage of the report written')
+    file = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['report_type', 'fingerprint'], name='report_job_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} report ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
@@ -0,0 +1,384 @@
+"""
+Synthetic training data for benchmarks and load tests.
+
+``seed_bank`` creates a risk admin who authored every course, bankers spread
+over Course.DEPARTMENT_CHOICES, published courses with videos, interactive
+modules and question banks, and enrollments with video progress, slide
+progress, quiz attempts and certificates. Rows are written with
+bulk_create, so no model save() or signal handler runs; the progress rollup
+is rebuilt once at the end.
+
+Bankers are created and given their activity ``batch_size`` at a time, so
+memory stays flat however many are seeded. Each banker has an engagement
+level that decides how far they get: content is watched in order, the quiz
+is taken once the content is done (retaken until passed, up to
+``max_attempts``), and a pass earns a certificate.
+
+Every seeded user's username starts with SEED_PREFIX. Values come from a
+random.Random(seed), so the same arguments give the same data.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from certificates.models import Certificate
+from courses.models import Course, Enrollment
+from quizzes.models import Question, QuestionOption, QuizAttempt
+from videos.models import InteractiveCourse, InteractiveCourseProgress, Video, VideoProgress
+from .summary import rebuild_summaries
+
+SEED_PREFIX = 'seed-'
+SEED_EMAIL_DOMAIN = 'example.com'
+SEED_PASSWORD = 'seed-password'
+
+# Relative share of bankers per department (Course.DEPARTMENT_CHOICES keys)
+DEPARTMENT_WEIGHTS = {
+    'branch_network': 30,
+    'retail_banking': 20,
+    'operations': 15,
+    'corporate_banking': 8,
+    'risk_management': 5,
+    'compliance': 5,
+    'finance': 5,
+    'it': 5,
+    'hr': 3,
+    'audit': 2,
+    'marketing': 2,
+}
+
+# Courses each banker takes besides those for their department: 0 to this
+MAX_EXTRA_ENROLLMENTS = 3
+
+# Engagement ~ Beta(a, b) is a banker's chance of finishing the content of
+# each course: most finish most courses, some barely start
+ENGAGEMENT_BETA = (2.0, 1.5)
+
+# Chance that the lesson where a banker stopped was left part way, not unstarted
+PARTIAL_RATE = 0.5
+
+# Quiz score ~ N(QUIZ_MEAN_BASE + QUIZ_MEAN_ENGAGEMENT * engagement, QUIZ_SD),
+# a few points better on each retake
+QUIZ_MEAN_BASE = 55
+QUIZ_MEAN_ENGAGEMENT = 35
+QUIZ_SD = 12
+QUIZ_RETAKE_GAIN = 5
+QUIZ_QUESTIONS = 10
+
+# Days back over which completion dates are spread (recent ones more likely)
+HISTORY_DAYS = 365
+
+FIRST_NAMES = ['Amina', 'Baraka', 'Neema', 'Juma', 'Rehema', 'Daudi', 'Zawadi', 'Hamisi', 'Upendo', 'Salim']
+LAST_NAMES = ['Mushi', 'Mwakyusa', 'Kimaro', 'Massawe', 'Lyimo', 'Njau', 'Temba', 'Swai', 'Mollel', 'Shirima']
+TOPICS = ['Credit Risk', 'Operational Risk', 'AML', 'KYC', 'Fraud', 'Cyber Security', 'Market Risk', 'Liquidity']
+
+
+def seed_bank(bankers=200, courses=10, videos_per_course=5, modules_per_course=2,
+              questions_per_course=20, questions_per_module=10, max_attempts=3,
+              seed=0, batch_size=1000, on_progress=None):
+    """
+    Create the data set; returns the number of rows of each kind and the ids
+    of an admin, a banker, a course and a module to request pages with.
+    ``on_progress(done, total)`` is called after each batch of bankers.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    password = make_password(SEED_PASSWORD)
+
+    admin = User.objects.create(
+        username=f'{SEED_PREFIX}admin', email=f'{SEED_PREFIX}admin@{SEED_EMAIL_DOMAIN}',
+        first_name='Seed', last_name='Admin', role='admin', is_staff=True,
+        profile_completed=True, password=password,
+    )
+    catalog = _seed_catalog(
+        rng, admin, courses, videos_per_course, modules_per_course,
+        questions_per_course, questions_per_module, batch_size,
+    )
+
+    counts = dict.fromkeys([
+        'bankers', 'enrollments', 'video_progress', 'interactive_progress', 'quiz_attempts', 'certificates',
+    ], 0)
+    busiest = (-1, None)
+    departments = list(DEPARTMENT_WEIGHTS)
+    weights = list(DEPARTMENT_WEIGHTS.values())
+    designations = [key for key, _ in User.DESIGNATION_CHOICES]
+
+    for start in range(0, bankers, batch_size):
+        numbers = range(start + 1, min(start + batch_size, bankers) + 1)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{SEED_PREFIX}banker-{number:06d}',
+                    email=f'{SEED_PREFIX}banker-{number:06d}@{SEED_EMAIL_DOMAIN}',
+                    first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                    role='banker', department=rng.choices(departments, weights)[0],
+                    designation=rng.choice(designations), profile_completed=True, password=password,
+                )
+                for number in numbers
+            ],
+            batch_size=batch_size,
+        )
+        # Zero-padded names sort in creation order
+        users = list(
+            User.objects.filter(
+                username__gte=f'{SEED_PREFIX}banker-{numbers[0]:06d}',
+                username__lte=f'{SEED_PREFIX}banker-{numbers[-1]:06d}',
+            ).order_by('id').values_list('id', 'department')
+        )
+        rows = _seed_activity(rng, users, catalog, max_attempts)
+        with transaction.atomic():
+            for model, objects in rows.items():
+                model.objects.bulk_create(objects, batch_size=batch_size)
+
+        counts['bankers'] += len(users)
+        counts['enrollments'] += len(rows[Enrollment])
+        counts['video_progress'] += len(rows[VideoProgress])
+        counts['interactive_progress'] += len(rows[InteractiveCourseProgress])
+        counts['quiz_attempts'] += len(rows[QuizAttempt])
+        counts['certificates'] += len(rows[Certificate])
+        enrolled = {}
+        for enrollment in rows[Enrollment]:
+            enrolled[enrollment.user_id] = enrolled.get(enrollment.user_id, 0) + 1
+        for user_id, count in enrolled.items():
+            busiest = max(busiest, (count, -user_id))
+        if on_progress:
+            on_progress(counts['bankers'], bankers)
+
+    course_ids = [course['id'] for course in catalog]
+    rebuild_summaries(course_ids=course_ids, batch_size=batch_size)
+
+    first_course = catalog[0] if catalog else None
+    counts.update({
+        'courses': len(catalog),
+        'videos': sum(len(course['videos']) for course in catalog),
+        'interactive_courses': sum(len(course['modules']) for course in catalog),
+        'questions': sum(
+            len(course['questions']) + sum(len(module['questions']) for module in course['modules'])
+            for course in catalog
+        ),
+    })
+    return {
+        'admin_id': admin.id,
+        # The banker with the most enrollments shows the heaviest pages
+        'banker_id': -busiest[1] if busiest[1] is not None else None,
+        'course_id': first_course['id'] if first_course else None,
+        'interactive_id': first_course['modules'][0]['id'] if first_course and first_course['modules'] else None,
+        'counts': counts,
+    }
+
+
+def _seed_catalog(rng, admin, courses, videos_per_course, modules_per_course,
+                  questions_per_course, questions_per_module, batch_size):
+    """Courses with their videos, modules and question banks; returns a list of dicts describing them"""
+    departments = list(DEPARTMENT_WEIGHTS)
+    Course.objects.bulk_create(
+        [
+            Course(
+                title=f'{TOPICS[number % len(TOPICS)]} {number + 1}',
+                description=f'Synthetic course {number + 1} on {TOPICS[number % len(TOPICS)].lower()}.',
+                created_by=admin, is_published=True, passing_score=rng.choice([70, 75, 80]),
+                # A few mandatory courses for everyone, the rest for some departments
+                target_departments=['all'] if number % 10 == 0 else rng.sample(departments, rng.randint(1, 3)),
+            )
+            for number in range(courses)
+        ],
+        batch_size=batch_size,
+    )
+    catalog = [
+        {'id': course_id, 'passing_score': passing_score, 'targets': targets, 'videos': [], 'modules': [], 'questions': []}
+        for course_id, passing_score, targets in Course.objects.filter(created_by=admin)
+        .order_by('id').values_list('id', 'passing_score', 'target_departments')
+    ]
+    by_id = {course['id']: course for course in catalog}
+    course_ids = list(by_id)
+
+    Video.objects.bulk_create(
+        [
+            Video(
+                course_id=course_id, title=f'Lesson {number + 1}', description='Synthetic video',
+                video_file=f'videos/seed/{course_id}-{number + 1}.mp4', duration=rng.randint(120, 1200),
+                file_size=rng.randint(20, 400) * 1024 * 1024, order_index=number,
+            )
+            for course_id in course_ids
+            for number in range(videos_per_course)
+        ],
+        batch_size=batch_size,
+    )
+    for course_id, video_id, duration in (
+        Video.objects.filter(course__created_by=admin).order_by('course_id', 'order_index')
+        .values_list('course_id', 'id', 'duration')
+    ):
+        by_id[course_id]['videos'].append((video_id, duration))
+
+    InteractiveCourse.objects.bulk_create(
+        [
+            InteractiveCourse(
+                course_id=course_id, title=f'Module {number + 1}', description='Synthetic interactive module',
+                package_file=f'interactive_courses/seed/{course_id}-{number + 1}.zip',
+                extracted_path=f'interactive_courses/seed/{course_id}-{number + 1}',
+                duration_minutes=rng.randint(10, 60), total_slides=rng.randint(10, 60),
+                order_index=number, created_by=admin,
+            )
+            for course_id in course_ids
+            for number in range(modules_per_course)
+        ],
+        batch_size=batch_size,
+    )
+    modules = {}
+    for course_id, module_id, total_slides in (
+        InteractiveCourse.objects.filter(created_by=admin).order_by('course_id', 'order_index')
+        .values_list('course_id', 'id', 'total_slides')
+    ):
+        module = {'id': module_id, 'total_slides': total_slides, 'questions': []}
+        by_id[course_id]['modules'].append(module)
+        modules[module_id] = module
+
+    def question(number, **owner):
+        return Question(
+            question_text=f'Synthetic question {number + 1}?', question_type='multiple_choice',
+            topic=rng.choice(TOPICS), difficulty=rng.choices(['easy', 'medium', 'hard'], [3, 5, 2])[0], **owner,
+        )
+
+    Question.objects.bulk_create(
+        [question(number, course_id=course_id) for course_id in course_ids for number in range(questions_per_course)]
+        + [question(number, interactive_course_id=module_id)
+           for module_id in modules for number in range(questions_per_module)],
+        batch_size=batch_size,
+    )
+    question_ids = []
+    for question_id, course_id, module_id in (
+        Question.objects.filter(Q(course__created_by=admin) | Q(interactive_course__created_by=admin))
+        .order_by('id').values_list('id', 'course_id', 'interactive_course_id')
+    ):
+        owner = modules[module_id] if module_id else by_id[course_id]
+        owner['questions'].append(question_id)
+        question_ids.append(question_id)
+    for start in range(0, len(question_ids), batch_size):
+        QuestionOption.objects.bulk_create(
+            [
+                QuestionOption(
+                    question_id=question_id, option_text=f'Option {index + 1}',
+                    is_correct=index == 0, order_index=index,
+                )
+                for question_id in question_ids[start:start + batch_size]
+                for index in range(4)
+            ],
+            batch_size=batch_size,
+        )
+    return catalog
+
+
+def _seed_activity(rng, users, catalog, max_attempts):
+    """Unsaved enrollment, progress, attempt and certificate rows of some bankers, keyed by model"""
+    now = timezone.now()
+    base_url = getattr(settings, 'CERTIFICATE_BASE_URL', 'http://localhost:8000')
+    rows = {model: [] for model in (
+        Enrollment, VideoProgress, InteractiveCourseProgress, QuizAttempt, Certificate,
+    )}
+
+    def past():
+        # Recent activity is more common than old
+        days = min(HISTORY_DAYS, rng.expovariate(3 / HISTORY_DAYS))
+        return now - timedelta(days=days)
+
+    def take_quiz(user_id, engagement, passing_score, question_ids, **owner):
+        """Attempts until a pass (or max_attempts); returns the best passing score or None"""
+        for attempt in range(max_attempts):
+            mean = QUIZ_MEAN_BASE + QUIZ_MEAN_ENGAGEMENT * engagement + QUIZ_RETAKE_GAIN * attempt
+            total = min(QUIZ_QUESTIONS, len(question_ids)) or QUIZ_QUESTIONS
+            correct = max(0, min(total, round(rng.gauss(mean, QUIZ_SD) * total / 100)))
+            score = (Decimal(correct * 100) / total).quantize(Decimal('0.01'))
+            passed = score >= passing_score
+            rows[QuizAttempt].append(QuizAttempt(
+                user_id=user_id, score=score, total_questions=total, correct_answers=correct,
+                passed=passed, completed_at=past(), question_ids=rng.sample(question_ids, min(total, len(question_ids))),
+                **owner,
+            ))
+            if passed:
+                return score
+        return None
+
+    def certify(user_id, score, **owner):
+        if 'course_id' in owner:
+            number = f"SEED-{user_id}-C{owner['course_id']}"
+        else:
+            number = f"SEED-{user_id}-M{owner['interactive_course_id']}"
+        rows[Certificate].append(Certificate(
+            user_id=user_id, certificate_number=number, issue_date=past(), overall_score=score,
+            verification_url=f'{base_url}/certificates/verify/{number}/', **owner,
+        ))
+
+    for user_id, department in users:
+        engagement = rng.betavariate(*ENGAGEMENT_BETA)
+        enrolled = [course for course in catalog if 'all' in course['targets'] or department in course['targets']]
+        others = [course for course in catalog if course not in enrolled]
+        enrolled += rng.sample(others, min(len(others), rng.randint(0, MAX_EXTRA_ENROLLMENTS)))
+
+        for course in enrolled:
+            # Content is taken in order. A banker who does not finish it stops
+            # at some lesson, part way through it or before starting it
+            lessons = [('video', video) for video in course['videos']] + [('module', module) for module in course['modules']]
+            stop = len(lessons) if rng.random() < engagement else rng.randint(0, max(len(lessons) - 1, 0))
+            content_done = stop == len(lessons)
+
+            for index, (kind, lesson) in enumerate(lessons):
+                finished = index < stop
+                if not finished and rng.random() >= PARTIAL_RATE:
+                    break
+                if kind == 'video':
+                    video_id, duration = lesson
+                    watched = duration if finished else rng.randint(1, duration - 1)
+                    rows[VideoProgress].append(VideoProgress(
+                        user_id=user_id, video_id=video_id, watched_duration=watched, last_position=watched,
+                        is_completed=finished, completed_at=past() if finished else None,
+                    ))
+                else:
+                    total_slides = lesson['total_slides']
+                    slides = total_slides if finished else rng.randint(1, total_slides - 1)
+                    quiz_score = None
+                    quiz_attempts = len(rows[QuizAttempt])
+                    if finished and lesson['questions']:
+                        quiz_score = take_quiz(
+                            user_id, engagement, course['passing_score'], lesson['questions'],
+                            interactive_course_id=lesson['id'],
+                        )
+                    quiz_attempts = len(rows[QuizAttempt]) - quiz_attempts
+                    module_done = finished and (quiz_score is not None or not lesson['questions'])
+                    rows[InteractiveCourseProgress].append(InteractiveCourseProgress(
+                        user_id=user_id, interactive_course_id=lesson['id'],
+                        completion_percentage=slides * 100 // total_slides, current_slide=slides,
+                        highest_slide_reached=slides, slides_completed_count=slides,
+                        completed_slides=((1 << slides) - 1).to_bytes((slides + 7) // 8, 'little'),
+                        total_time_spent=rng.randint(1, 90),
+                        quiz_score=float(quiz_score) if quiz_score is not None else None,
+                        quiz_passed=(quiz_score is not None) if quiz_attempts else None, quiz_attempts=quiz_attempts,
+                        content_completed=finished, content_completed_at=past() if finished else None,
+                        is_completed=module_done, completed_at=past() if module_done else None,
+                    ))
+                    if quiz_score is not None:
+                        certify(user_id, quiz_score, interactive_course_id=lesson['id'])
+                    if finished and not module_done:
+                        # Failed the module quiz: no further
+                        content_done = False
+                        break
+                if not finished:
+                    break
+
+            score = None
+            if content_done and course['questions']:
+                score = take_quiz(user_id, engagement, course['passing_score'], course['questions'], course_id=course['id'])
+                if score is not None:
+                    certify(user_id, score, course_id=course['id'])
+            completed = content_done and (score is not None or not course['questions'])
+            rows[Enrollment].append(Enrollment(
+                user_id=user_id, course_id=course['id'],
+                is_completed=completed, completed_at=past() if completed else None,
+            ))
+    return rows
+
@@ -0,0 +1,200 @@
+"""
+Signal handlers that keep CourseProgressSummary in step with the progress,
+quiz and certificate write paths.
+
+Counts are only recomputed when a completion state changes; plain progress
+pings just bump ``last_activity``. Refreshes run on commit so they see the
+final state of the surrounding transaction (and of cascading deletes).
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from certificates.models import Certificate
+from courses.models import Enrollment
+from quizzes.models import QuizAttempt
+from videos.models import InteractiveCourse, InteractiveCourseProgress, Video, VideoProgress
+from .summary import rebuild_summaries, refresh_course_summary, refresh_course_totals, touch_course_summary
+
+SUMMARY_TOUCH_INTERVAL = timedelta(seconds=60)
+
+
+def _content_course_id(instance, relation):
+    """
+    Course of the video or module a row points at. Read from the relation
+    when the caller has loaded it, so the hot progress paths add no query.
+    """
+    field = instance._meta.get_field(relation)
+    content_id = getattr(instance, field.attname)
+    if content_id is None:
+        return None
+    if field.is_cached(instance):
+        return getattr(instance, relation).course_id
+    return field.related_model.objects.filter(pk=content_id).values_list('course_id', flat=True).first()
+
+
+def _attempt_course_id(attempt):
+    if attempt.course_id:
+        return attempt.course_id
+    return _content_course_id(attempt, 'interactive_course')
+
+
+def _certificate_course_ids(certificate):
+    course_ids = set()
+    if certificate.course_id:
+        course_ids.add(certificate.course_id)
+    if certificate.interactive_course_id:
+        course_ids.add(_content_course_id(certificate, 'interactive_course'))
+    return course_ids
+
+
+def _schedule_refresh(user_id, course_id):
+    transaction.on_commit(lambda: refresh_course_summary(user_id, course_id))
+
+
+def _touch_key(user_id, course_id):
+    return f'progress-summary-touched:{user_id}:{course_id}'
+
+
+def _mark_touched(instance, course_id):
+    cache.set(_touch_key(instance.user_id, course_id), instance.updated_at, SUMMARY_TOUCH_INTERVAL.total_seconds())
+
+
+def _schedule_progress_refresh(instance, course_id):
+    _schedule_refresh(instance.user_id, course_id)
+    _mark_touched(instance, course_id)
+
+
+def _schedule_touch(instance, course_id):
+    # last_activity may lag by SUMMARY_TOUCH_INTERVAL, saving an UPDATE per
+    # ping. When each summary was last touched is kept in the cache.
+    touched = cache.get(_touch_key(instance.user_id, course_id))
+    if touched is not None and instance.updated_at - touched < SUMMARY_TOUCH_INTERVAL:
+        return
+    _mark_touched(instance, course_id)
+    user_id, when = instance.user_id, instance.updated_at
+    transaction.on_commit(lambda: touch_course_summary(user_id, course_id, when))
+
+
+# ---------------------------------------------------------------------------
+# Remember the loaded completion state so saves can detect transitions
+# ---------------------------------------------------------------------------
+
+@receiver(post_init, sender=VideoProgress)
+@receiver(post_init, sender=InteractiveCourseProgress)
+def remember_completion_state(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query per row
+    instance._summary_was_completed = instance.__dict__.get('is_completed')
+
+
+@receiver(post_init, sender=QuizAttempt)
+def remember_attempt_state(sender, instance, **kwargs):
+    instance._summary_was_completed = instance.__dict__.get('completed_at') is not None
+
+
+# ---------------------------------------------------------------------------
+# Progress write paths
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=VideoProgress)
+def video_progress_saved(sender, instance, created, **kwargs):
+    course_id = _content_course_id(instance, 'video')
+    if created or instance.is_completed != instance._summary_was_completed:
+        _schedule_progress_refresh(instance, course_id)
+    else:
+        _schedule_touch(instance, course_id)
+    instance._summary_was_completed = instance.is_completed
+
+
+@receiver(post_save, sender=InteractiveCourseProgress)
+def interactive_progress_saved(sender, instance, created, **kwargs):
+    course_id = _content_course_id(instance, 'interactive_course')
+    if created or instance.is_completed != instance._summary_was_completed:
+        _schedule_progress_refresh(instance, course_id)
+    else:
+        _schedule_touch(instance, course_id)
+    instance._summary_was_completed = instance.is_completed
+
+
+@receiver(post_delete, sender=VideoProgress)
+def video_progress_deleted(sender, instance, **kwargs):
+    _schedule_refresh(instance.user_id, _content_course_id(instance, 'video'))
+
+
+@receiver(post_delete, sender=InteractiveCourseProgress)
+def interactive_progress_deleted(sender, instance, **kwargs):
+    _schedule_refresh(instance.user_id, _content_course_id(instance, 'interactive_course'))
+
+
+# ---------------------------------------------------------------------------
+# Quiz and certificate write paths
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=QuizAttempt)
+def quiz_attempt_saved(sender, instance, created, **kwargs):
+    is_completed = instance.completed_at is not None
+    if is_completed and (created or not instance._summary_was_completed):
+        _schedule_refresh(instance.user_id, _attempt_course_id(instance))
+    instance._summary_was_completed = is_completed
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def quiz_attempt_deleted(sender, instance, **kwargs):
+    if instance.completed_at is not None:
+        _schedule_refresh(instance.user_id, _attempt_course_id(instance))
+
+
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def certificate_changed(sender, instance, **kwargs):
+    for course_id in _certificate_course_ids(instance):
+        _schedule_refresh(instance.user_id, course_id)
+
+
+# ---------------------------------------------------------------------------
+# Enrollment and course content changes
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    if created:
+        _schedule_refresh(instance.user_id, instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    _schedule_refresh(instance.user_id, instance.course_id)
+
+
+@receiver(post_init, sender=Video)
+@receiver(post_init, sender=InteractiveCourse)
+def remember_content_placement(sender, instance, **kwargs):
+    instance._summary_course_id = instance.__dict__.get('course_id')
+    instance._summary_was_active = instance.__dict__.get('is_active', True)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=InteractiveCourse)
+def course_content_saved(sender, instance, created, **kwargs):
+    # From __dict__: a deferred field was not loaded, so it was not changed
+    course_id = instance.__dict__.get('course_id')
+    is_active = instance.__dict__.get('is_active', True)
+    previous_course_id = instance._summary_course_id
+    if created:
+        transaction.on_commit(lambda: refresh_course_totals(course_id))
+    elif (course_id, is_active) != (previous_course_id, instance._summary_was_active):
+        # Moved or (un)published: completed counts change with the totals
+        course_ids = {course_id, previous_course_id} - {None}
+        transaction.on_commit(lambda: rebuild_summaries(course_ids=course_ids))
+    instance._summary_course_id = course_id
+    instance._summary_was_active = is_active
+
+
+@receiver(post_delete, sender=Video)
+@receiver(post_delete, sender=InteractiveCourse)
+def course_content_deleted(sender, instance, **kwargs):
+    course_id = instance.course_id
+    transaction.on_commit(lambda: refresh_course_totals(course_id))
@@ -0,0 +1,242 @@
+"""
+Maintenance of the CourseProgressSummary rollup table.
+
+Every figure is computed with grouped queries keyed by (user_id, course_id),
+so refreshing a single pair and rebuilding the whole table share the same
+code path.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from certificates.models import Certificate
+from courses.models import Enrollment
+from quizzes.models import QuizAttempt
+from videos.models import InteractiveCourse, InteractiveCourseProgress, Video, VideoProgress
+from .models import CourseProgressSummary
+
+def _latest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def compute_summaries(user_ids=None, course_ids=None):
+    """Return {(user_id, course_id): summary field values} for the given scope"""
+
+    def scoped(qs, user_field, course_field):
+        if user_ids is not None:
+            qs = qs.filter(**{f'{user_field}__in': user_ids})
+        if course_ids is not None:
+            qs = qs.filter(**{f'{course_field}__in': course_ids})
+        return qs
+
+    def course_scoped(qs, course_field):
+        if course_ids is not None:
+            qs = qs.filter(**{f'{course_field}__in': course_ids})
+        return qs
+
+    videos_total = dict(
+        course_scoped(Video.objects.all(), 'course_id')
+        .values('course_id').annotate(total=Count('id')).order_by()
+        .values_list('course_id', 'total')
+    )
+    # Inactive (unpublished) modules count neither towards totals nor completions
+    interactive_total = dict(
+        course_scoped(InteractiveCourse.objects.filter(is_active=True), 'course_id')
+        .values('course_id').annotate(total=Count('id')).order_by()
+        .values_list('course_id', 'total')
+    )
+
+    summaries = {}
+
+    def row(user_id, course_id):
+        if (user_id, course_id) not in summaries:
+            summaries[(user_id, course_id)] = {
+                'videos_total': videos_total.get(course_id, 0),
+                'videos_completed': 0,
+                'interactive_total': interactive_total.get(course_id, 0),
+                'interactive_completed': 0,
+                'best_score': None,
+                'attempts': 0,
+                'certified': False,
+                'last_activity': None,
+            }
+        return summaries[(user_id, course_id)]
+
+    for user_id, course_id in scoped(Enrollment.objects.all(), 'user_id', 'course_id').values_list('user_id', 'course_id'):
+        row(user_id, course_id)
+
+    video_stats = scoped(VideoProgress.objects.all(), 'user_id', 'video__course_id').values(
+        'user_id', 'video__course_id'
+    ).annotate(
+        completed=Count('id', filter=Q(is_completed=True)),
+        last=Max('updated_at'),
+    ).order_by()
+    for stats in video_stats:
+        data = row(stats['user_id'], stats['video__course_id'])
+        data['videos_completed'] = stats['completed']
+        data['last_activity'] = _latest(data['last_activity'], stats['last'])
+
+    interactive_stats = scoped(
+        InteractiveCourseProgress.objects.filter(interactive_course__is_active=True),
+        'user_id', 'interactive_course__course_id',
+    ).values(
+        'user_id', 'interactive_course__course_id'
+    ).annotate(
+        completed=Count('id', filter=Q(is_completed=True)),
+        last=Max('updated_at'),
+    ).order_by()
+    for stats in interactive_stats:
+        data = row(stats['user_id'], stats['interactive_course__course_id'])
+        data['interactive_completed'] = stats['completed']
+        data['last_activity'] = _latest(data['last_activity'], stats['last'])
+
+    # Course quizzes and interactive module quizzes both roll up to the course
+    completed_attempts = QuizAttempt.objects.filter(completed_at__isnull=False)
+    for course_field in ('course_id', 'interactive_course__course_id'):
+        attempt_stats = scoped(
+            completed_attempts.filter(**{f'{course_field}__isnull': False}), 'user_id', course_field
+        ).values('user_id', course_field).annotate(
+            best=Max('score'),
+            total=Count('id'),
+            last=Max('completed_at'),
+        ).order_by()
+        for stats in attempt_stats:
+            data = row(stats['user_id'], stats[course_field])
+            data['best_score'] = _latest(data['best_score'], stats['best'])
+            data['attempts'] += stats['total']
+            data['last_activity'] = _latest(data['last_activity'], stats['last'])
+
+    valid_certificates = Certificate.objects.filter(is_valid=True)
+    for course_field in ('course_id', 'interactive_course__course_id'):
+        certified_pairs = scoped(
+            valid_certificates.filter(**{f'{course_field}__isnull': False}), 'user_id', course_field
+        ).values_list('user_id', course_field).distinct()
+        for user_id, course_id in certified_pairs:
+            row(user_id, course_id)['certified'] = True
+
+    return summaries
+
+
+def refresh_course_summary(user_id, course_id):
+    """Recompute and store the summary row for one user/course pair"""
+    if not user_id or not course_id:
+        return None
+
+    values = compute_summaries(user_ids=[user_id], course_ids=[course_id]).get((user_id, course_id))
+    if values is None:
+        # Nothing left to summarize (e.g. the last progress row was deleted)
+        CourseProgressSummary.objects.filter(user_id=user_id, course_id=course_id).delete()
+        return None
+
+    summary, _ = CourseProgressSummary.objects.update_or_create(
+        user_id=user_id, course_id=course_id, defaults=values
+    )
+    return summary
+
+
+def refresh_course_totals(course_id):
+    """Update video/module totals on every summary row of a course"""
+    if not course_id:
+        return
+    CourseProgressSummary.objects.filter(course_id=course_id).update(
+        videos_total=Video.objects.filter(course_id=course_id).count(),
+        interactive_total=InteractiveCourse.objects.filter(course_id=course_id, is_active=True).count(),
+        updated_at=timezone.now(),
+    )
+
+
+def touch_course_summary(user_id, course_id, when=None):
+    """Bump last_activity without recomputing the counts"""
+    when = when or timezone.now()
+    updated = CourseProgressSummary.objects.filter(user_id=user_id, course_id=course_id).update(
+        last_activity=when, updated_at=timezone.now()
+    )
+    if not updated:
+        refresh_course_summary(user_id, course_id)
+
+
+def touch_course_summaries(pairs, when=None):
+    """Bump last_activity of many (user_id, course_id) pairs, one UPDATE per course"""
+    when = when or timezone.now()
+    user_ids_by_course = {}
+    for user_id, course_id in pairs:
+        if user_id and course_id:
+            user_ids_by_course.setdefault(course_id, set()).add(user_id)
+
+    for course_id, user_ids in user_ids_by_course.items():
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), 1000):
+            CourseProgressSummary.objects.filter(
+                course_id=course_id, user_id__in=user_ids[start:start + 1000]
+            ).update(last_activity=when, updated_at=timezone.now())
+
+
+def rebuild_summaries(course_ids=None, batch_size=1000):
+    """
+    Rebuild the rollup table (optionally for some courses only).
+
+    Returns the number of summary rows written.
+    """
+    summaries = compute_summaries(course_ids=course_ids)
+    now = timezone.now()
+
+    rows = [
+        CourseProgressSummary(user_id=user_id, course_id=course_id, updated_at=now, **values)
+        for (user_id, course_id), values in summaries.items()
+    ]
+
+    with transaction.atomic():
+        existing = CourseProgressSummary.objects.all()
+        if course_ids is not None:
+            existing = existing.filter(course_id__in=course_ids)
+        existing.delete()
+        CourseProgressSummary.objects.bulk_create(rows, batch_size=batch_size)
+
+    return len(rows)
+
+
+def get_user_summaries(user):
+    """Summary rows for a user keyed by course_id"""
+    return {s.course_id: s for s in CourseProgressSummary.objects.filter(user=user)}
+
+
+def get_course_summaries(course):
+    """Summary rows for a course keyed by user_id"""
+    return {s.user_id: s for s in CourseProgressSummary.objects.filter(course=course)}
+
+
+def ensure_summaries(pairs):
+    """
+    Make sure summary rows exist for the given (user_id, course_id) pairs.
+
+    Covers rows that predate the rollup table until the rebuild command has
+    been run; missing rows are computed in one grouped pass.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+
+    user_ids = {user_id for user_id, _ in pairs}
+    course_ids = {course_id for _, course_id in pairs}
+    existing = set(
+        CourseProgressSummary.objects.filter(
+            user_id__in=user_ids, course_id__in=course_ids
+        ).values_list('user_id', 'course_id')
+    )
+    missing = pairs - existing
+    if not missing:
+        return
+
+    summaries = compute_summaries(
+        user_ids={user_id for user_id, _ in missing},
+        course_ids={course_id for _, course_id in missing},
+    )
+    CourseProgressSummary.objects.bulk_create(
+        [
+            CourseProgressSummary(user_id=user_id, course_id=course_id, **summaries[(user_id, course_id)])
+            for user_id, course_id in missing
+            if (user_id, course_id) in summaries
+        ],
+        ignore_conflicts=True,
+    )
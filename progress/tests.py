@@ -0,0 +1,229 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from certificates.models import Certificate
+from courses.models import Course, Enrollment
+from quizzes.models import QuizAttempt
+from videos.models import InteractiveCourse, InteractiveCourseProgress, Video, VideoProgress
+
+from .analytics import build_analytics, build_course_analytics, build_user_progress_list
+from .benchmark import run_benchmarks
+from .models import CourseProgressSummary
+from .seeding import DEPARTMENT_WEIGHTS, SEED_PREFIX, seed_bank
+from .signals import SUMMARY_TOUCH_INTERVAL
+
+
+def make_user(username, role='banker', **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **extra
+    )
+
+
+class AnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', role='admin')
+        cls.course = Course.objects.create(title='AML', description='', created_by=cls.admin, is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=cls.course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+        cls.bankers = [make_user(f'banker{i}') for i in range(4)]
+        # banker0: certified, banker1: awaiting quiz, banker2: in progress, banker3: not started
+        for banker, percentage in zip(cls.bankers, (100, 100, 40)):
+            InteractiveCourseProgress.objects.create(
+                user=banker, interactive_course=cls.module,
+                completion_percentage=percentage, content_completed=percentage == 100,
+            )
+        Certificate.objects.create(
+            user=cls.bankers[0], interactive_course=cls.module, certificate_number='CERT-1',
+            overall_score=90, verification_url='http://testserver/verify/CERT-1',
+        )
+
+    def test_course_analytics_counts(self):
+        [stats] = build_course_analytics([self.module], total_bankers=4)
+        self.assertEqual(stats['enrolled_count'], 3)
+        self.assertEqual(stats['not_enrolled_count'], 1)
+        self.assertEqual(stats['completed_content_count'], 2)
+        self.assertEqual(stats['in_progress_count'], 1)
+        self.assertEqual(stats['passed_quiz_count'], 1)
+        self.assertEqual(stats['avg_completion'], 80.0)
+        self.assertEqual(stats['enrollment_rate'], 75.0)
+
+    def test_user_statuses(self):
+        users = build_user_progress_list(self.bankers, [self.module])
+        statuses = [user['courses'][0]['status'] for user in users]
+        self.assertEqual(statuses, ['completed', 'awaiting_quiz', 'in_progress', 'not_started'])
+        self.assertEqual(users[0]['courses'][0]['certificate_number'], 'CERT-1')
+
+    def test_query_count_does_not_grow_with_bankers(self):
+        with CaptureQueriesContext(connection) as before:
+            build_analytics()
+        for i in range(4, 24):
+            banker = make_user(f'banker{i}')
+            InteractiveCourseProgress.objects.create(user=banker, interactive_course=self.module, completion_percentage=10)
+        with CaptureQueriesContext(connection) as after:
+            context = build_analytics()
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(context['total_bankers'], 24)
+
+
+class ProgressSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.other_course = Course.objects.create(title='KYC', description='', is_published=True)
+        cls.video = Video.objects.create(course=cls.course, title='Intro', video_file='videos/intro.mp4', duration=100)
+        cls.module = InteractiveCourse.objects.create(
+            course=cls.course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.banker, course=self.course)
+
+    def summary(self, course=None):
+        return CourseProgressSummary.objects.get(user=self.banker, course=course or self.course)
+
+    def test_completion_refreshes_summary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = VideoProgress.objects.create(user=self.banker, video=self.video, watched_duration=10)
+        self.assertEqual(self.summary().videos_completed, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.is_completed = True
+            progress.save()
+        summary = self.summary()
+        self.assertEqual((summary.videos_completed, summary.videos_total), (1, 1))
+        self.assertEqual(summary.interactive_total, 1)
+
+    def test_save_with_loaded_video_does_not_look_up_course(self):
+        progress = VideoProgress.objects.create(user=self.banker, video=self.video)
+        progress.watched_duration = 50
+        with CaptureQueriesContext(connection) as captured:
+            progress.save()
+        self.assertFalse([query for query in captured if 'FROM "videos"' in query['sql']])
+
+    def test_pings_within_touch_interval_skip_summary_update(self):
+        progress = VideoProgress.objects.create(user=self.banker, video=self.video)
+        with self.captureOnCommitCallbacks() as callbacks:
+            progress.watched_duration = 20
+            progress.save()
+        self.assertEqual(callbacks, [])
+
+    def test_frequent_pings_still_touch_summary(self):
+        started = timezone.now()
+        progress = InteractiveCourseProgress.objects.create(user=self.banker, interactive_course=self.module)
+        for seconds in range(0, 300, 30):
+            with mock.patch('django.utils.timezone.now', return_value=started + timedelta(seconds=seconds)):
+                with self.captureOnCommitCallbacks(execute=True):
+                    progress.total_time_spent += 1
+                    progress.save()
+        self.assertGreaterEqual(self.summary().last_activity, started + timedelta(seconds=270) - SUMMARY_TOUCH_INTERVAL)
+
+    def test_moving_video_updates_both_courses(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoProgress.objects.create(user=self.banker, video=self.video, is_completed=True)
+            Enrollment.objects.create(user=self.banker, course=self.other_course)
+        video = Video.objects.get(pk=self.video.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            video.course = self.other_course
+            video.save()
+        self.assertEqual((self.summary().videos_completed, self.summary().videos_total), (0, 0))
+        moved_to = self.summary(self.other_course)
+        self.assertEqual((moved_to.videos_completed, moved_to.videos_total), (1, 1))
+
+    def test_deactivating_module_updates_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            InteractiveCourseProgress.objects.create(user=self.banker, interactive_course=self.module, is_completed=True)
+        self.assertEqual(self.summary().interactive_completed, 1)
+        module = InteractiveCourse.objects.get(pk=self.module.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            module.is_active = False
+            module.save()
+        summary = self.summary()
+        self.assertEqual((summary.interactive_completed, summary.interactive_total), (0, 0))
+
+
+class BenchmarkTests(TestCase):
+    # Budgets hold at the default catalog size; an N+1 query over bankers
+    # or their certificates shows at the larger size
+
+    def assertWithinBudget(self, bankers):
+        results = run_benchmarks(seed_bank(bankers=bankers, seed=bankers), repeat=0)
+        self.assertEqual([(result['name'], result['queries']) for result in results if not result['passed']], [])
+
+    def test_small_bank(self):
+        self.assertWithinBudget(5)
+
+    def test_larger_bank(self):
+        self.assertWithinBudget(40)
+
+
+class SeedingTests(TestCase):
+    sizes = {
+        'bankers': 12, 'courses': 3, 'videos_per_course': 2, 'modules_per_course': 1,
+        'questions_per_course': 4, 'questions_per_module': 2,
+    }
+
+    def seeded_rows(self):
+        return (
+            list(User.objects.filter(role='banker').order_by('username').values_list('username', 'department')),
+            list(
+                Enrollment.objects.order_by('user__username', 'course__title')
+                .values_list('user__username', 'course__title')
+            ),
+            list(
+                QuizAttempt.objects.order_by('user__username', 'id')
+                .values_list('user__username', 'score', 'passed')
+            ),
+        )
+
+    def test_counts_and_activity(self):
+        batches = []
+        seeded = seed_bank(batch_size=5, on_progress=lambda done, total: batches.append((done, total)), **self.sizes)
+        self.assertEqual(batches, [(5, 12), (10, 12), (12, 12)])
+
+        counts = seeded['counts']
+        bankers = User.objects.filter(username__startswith=SEED_PREFIX, role='banker')
+        self.assertEqual(counts['bankers'], bankers.count())
+        self.assertEqual(counts['enrollments'], Enrollment.objects.count())
+        self.assertEqual(counts['video_progress'], VideoProgress.objects.count())
+        self.assertEqual(counts['interactive_progress'], InteractiveCourseProgress.objects.count())
+        self.assertEqual(counts['quiz_attempts'], QuizAttempt.objects.count())
+        self.assertEqual(counts['certificates'], Certificate.objects.count())
+        self.assertEqual((counts['courses'], counts['videos'], counts['questions']), (3, 6, 3 * 4 + 3 * 2))
+        self.assertTrue(set(bankers.values_list('department', flat=True)) <= set(DEPARTMENT_WEIGHTS))
+
+        # Attempts only in enrolled courses, certificates only for passes
+        enrolled = set(Enrollment.objects.values_list('user_id', 'course_id'))
+        attempted = set(QuizAttempt.objects.filter(course__isnull=False).values_list('user_id', 'course_id'))
+        self.assertTrue(attempted <= enrolled)
+        owner = ('user_id', 'course_id', 'interactive_course_id')
+        passed = set(QuizAttempt.objects.filter(passed=True).values_list(*owner))
+        self.assertTrue(set(Certificate.objects.values_list(*owner)) <= passed)
+        self.assertEqual(CourseProgressSummary.objects.count(), len(enrolled))
+
+    def test_same_seed_gives_same_data(self):
+        seed_bank(seed=7, **self.sizes)
+        first = self.seeded_rows()
+        User.objects.all().delete()
+        Course.objects.all().delete()
+        seed_bank(seed=7, **self.sizes)
+        self.assertEqual(self.seeded_rows(), first)
+
+    def test_command_refuses_seeded_database(self):
+        args = ['seed_scale', '--bankers', '3', '--courses', '1', '--noinput']
+        call_command(*args, stdout=io.StringIO())
+        self.assertEqual(User.objects.filter(username__startswith=SEED_PREFIX, role='banker').count(), 3)
+        with self.assertRaises(CommandError):
+            call_command(*args, stdout=io.StringIO())
@@ -0,0 +1,179 @@
+"""
+Per-course answer-key cache.
+
+Question banks change rarely, so the questions of a Course or
+InteractiveCourse are loaded once with their ordered options and correct
+option ids and reused for rendering and grading quizzes.
+
+Each bank has a version token in the Django cache. Edits to questions or
+options replace the token (see quizzes.signals), which retires the cached
+key in every process that shares the cache. Keys are held in process memory
+and, when QUIZ_ANSWER_KEY_SHARED is on, also in the Django cache so other
+processes can pick them up without a query. In-process copies expire after
+QUIZ_ANSWER_KEY_TTL seconds, which bounds staleness when the cache backend
+is per-process (the default local-memory cache).
+
+Only plain tuples of ids and values are cached, never model instances, so a
+cached key can't outlive a change to the models.
+"""
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Question, QuestionOption
+
+_local_keys = {}
+
+# Bump when the cached row layout changes
+ANSWER_KEY_FORMAT = 2
+
+# Read-only stand-ins for Question and QuestionOption in rendered quizzes
+QuizQuestion = namedtuple('QuizQuestion', 'id question_text question_type topic difficulty points options')
+QuizOption = namedtuple('QuizOption', 'id option_text')
+
+
+def _cache():
+    return caches[getattr(settings, 'QUIZ_ANSWER_KEY_CACHE', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'QUIZ_ANSWER_KEY_TTL', 300)
+
+
+def _bank(course_id=None, interactive_course_id=None):
+    if interactive_course_id:
+        return ('interactive', interactive_course_id)
+    return ('course', course_id)
+
+
+def _version_cache_key(bank):
+    return 'quizzes:answer_key_version:%s:%s' % bank
+
+
+def _get_version(bank):
+    cache = _cache()
+    version_key = _version_cache_key(bank)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    return version
+
+
+def load_answer_key_rows(questions):
+    """
+    Plain rows of a Question queryset, in its order:
+    (id, text, type, topic, difficulty, points, ((option_id, text, is_correct), ...))
+    """
+    questions = list(questions.values_list(
+        'id', 'question_text', 'question_type', 'topic', 'difficulty', 'points'
+    ))
+    options = {}
+    option_rows = QuestionOption.objects.filter(
+        question_id__in=[question[0] for question in questions]
+    ).order_by('order_index', 'id').values_list('question_id', 'id', 'option_text', 'is_correct')
+    for question_id, *option in option_rows:
+        options.setdefault(question_id, []).append(tuple(option))
+    return [question + (tuple(options.get(question[0], ())),) for question in questions]
+
+
+def build_answer_key_entries(rows):
+    """
+    Map question_id -> {'question', 'option_ids', 'correct_ids'} from
+    ``load_answer_key_rows`` rows. 'question' is a QuizQuestion whose
+    ``options`` are QuizOptions in display order.
+    """
+    entries = {}
+    for question_id, text, question_type, topic, difficulty, points, options in rows:
+        entries[question_id] = {
+            'question': QuizQuestion(
+                question_id, text, question_type, topic, difficulty, points,
+                tuple(QuizOption(option_id, option_text) for option_id, option_text, _ in options),
+            ),
+            'option_ids': frozenset(option_id for option_id, _, _ in options),
+            'correct_ids': frozenset(option_id for option_id, _, is_correct in options if is_correct),
+        }
+    return entries
+
+
+def _load_rows(bank):
+    kind, bank_id = bank
+    if kind == 'interactive':
+        questions = Question.objects.filter(interactive_course_id=bank_id)
+    else:
+        questions = Question.objects.filter(course_id=bank_id)
+    return load_answer_key_rows(questions)
+
+
+def get_answer_key(course_id=None, interactive_course_id=None):
+    """
+    Answer key of a question bank, in question bank order.
+
+    Returns the cached entries (see ``build_answer_key_entries``); treat
+    them as read-only, they are shared between requests.
+    """
+    bank = _bank(course_id, interactive_course_id)
+    if bank[1] is None:
+        return {}
+
+    version = _get_version(bank)
+    cached = _local_keys.get(bank)
+    if cached and cached[0] == version and time.monotonic() < cached[1]:
+        return cached[2]
+
+    shared = getattr(settings, 'QUIZ_ANSWER_KEY_SHARED', False)
+    data_key = 'quizzes:answer_key:%s:%s:%s:%s' % (bank + (version, ANSWER_KEY_FORMAT))
+    rows = _cache().get(data_key) if shared else None
+    if rows is None:
+        rows = _load_rows(bank)
+        if shared:
+            _cache().set(data_key, rows, _ttl())
+
+    answer_key = build_answer_key_entries(rows)
+    _local_keys[bank] = (version, time.monotonic() + _ttl(), answer_key)
+    return answer_key
+
+
+def invalidate_answer_key(course_id=None, interactive_course_id=None):
+    """Retire the cached answer key of a question bank"""
+    bank = _bank(course_id, interactive_course_id)
+    if bank[1] is None:
+        return
+    _cache().set(_version_cache_key(bank), uuid.uuid4().hex, None)
+    _local_keys.pop(bank, None)
+
+
+def invalidate_question(question):
+    """Retire the answer key of the bank(s) a question belongs to"""
+    if question.course_id:
+        invalidate_answer_key(course_id=question.course_id)
+    if question.interactive_course_id:
+        invalidate_answer_key(interactive_course_id=question.interactive_course_id)
+
+
+def get_attempt_answer_key(attempt):
+    """Answer key entries for the questions of a quiz attempt"""
+    question_ids = attempt.question_ids or []
+    bank_key = get_answer_key(course_id=attempt.course_id, interactive_course_id=attempt.interactive_course_id)
+
+    answer_key = {qid: bank_key[qid] for qid in question_ids if qid in bank_key}
+
+    # Questions that have moved out of the bank since the attempt started
+    missing = [qid for qid in question_ids if qid not in bank_key]
+    if missing:
+        answer_key.update(build_answer_key_entries(
+            load_answer_key_rows(Question.objects.filter(id__in=missing))
+        ))
+    return answer_key
+
+
+def get_attempt_questions(attempt):
+    """QuizQuestions of a quiz attempt in question bank order"""
+    answer_key = get_attempt_answer_key(attempt)
+    bank_key = get_answer_key(course_id=attempt.course_id, interactive_course_id=attempt.interactive_course_id)
+    ordered = [qid for qid in bank_key if qid in answer_key]
+    ordered += [qid for qid in answer_key if qid not in bank_key]
+    return [answer_key[qid]['question'] for qid in ordered]
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class QuizzesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quizzes'
+
+    def ready(self):
+        # Retire cached answer keys when questions or options change
+        from . import signals  # noqa: F401
@@ -0,0 +1,63 @@
+"""
+Quiz grading engine.
+
+Submissions are graded in memory against the correct-option sets of the
+cached answer key (see quizzes.answer_keys), and the answers and their
+selected options are written with bulk inserts.
+"""
+from .models import QuizAnswer
+
+
+def grade_submission(answer_key, data):
+    """
+    Grade the submitted form data against an answer key.
+
+    Returns a list of (question_id, selected_option_ids, is_correct) for every
+    answered question. Option ids that don't belong to the question are ignored.
+    """
+    graded = []
+    for question_id, key in answer_key.items():
+        submitted = data.getlist(f'question_{question_id}')
+        if not submitted:
+            continue
+
+        selected_ids = set()
+        for value in submitted:
+            try:
+                option_id = int(value)
+            except (TypeError, ValueError):
+                continue
+            if option_id in key['option_ids']:
+                selected_ids.add(option_id)
+
+        is_correct = bool(key['correct_ids']) and selected_ids == key['correct_ids']
+        graded.append((question_id, selected_ids, is_correct))
+    return graded
+
+
+def save_graded_answers(attempt, graded):
+    """
+    Persist graded answers with two bulk inserts (answers, then their
+    selected options). Call inside a transaction.
+    """
+    answers = QuizAnswer.objects.bulk_create([
+        QuizAnswer(attempt=attempt, question_id=question_id, is_correct=is_correct)
+        for question_id, _, is_correct in graded
+    ])
+
+    # Not every backend returns primary keys from a bulk insert
+    if any(answer.pk is None for answer in answers):
+        answer_ids = dict(
+            QuizAnswer.objects.filter(attempt=attempt).values_list('question_id', 'id')
+        )
+    else:
+        answer_ids = {answer.question_id: answer.pk for answer in answers}
+
+    SelectedOption = QuizAnswer.selected_options.through
+    SelectedOption.objects.bulk_create([
+        SelectedOption(quizanswer_id=answer_ids[question_id], questionoption_id=option_id)
+        for question_id, selected_ids, _ in graded
+        for option_id in selected_ids
+    ])
+
+    return sum(1 for _, _, is_correct in graded if is_correct)
@@ -0,0 +1,51 @@
+"""
+Retire cached answer keys when a question bank changes.
+
+Invalidation runs on commit so a request reading the bank mid-transaction
+can't cache the old questions under the new version.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .answer_keys import invalidate_answer_key
+from .models import Question, QuestionOption
+
+
+def _schedule_invalidation(course_id, interactive_course_id):
+    def invalidate():
+        if course_id:
+            invalidate_answer_key(course_id=course_id)
+        if interactive_course_id:
+            invalidate_answer_key(interactive_course_id=interactive_course_id)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_init, sender=Question)
+def remember_bank(sender, instance, **kwargs):
+    instance._answer_key_bank = (instance.__dict__.get('course_id'), instance.__dict__.get('interactive_course_id'))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _schedule_invalidation(instance.course_id, instance.interactive_course_id)
+    # A question moved to another bank leaves its old bank too
+    previous = instance._answer_key_bank
+    if previous != (instance.course_id, instance.interactive_course_id):
+        _schedule_invalidation(*previous)
+    instance._answer_key_bank = (instance.course_id, instance.interactive_course_id)
+
+
+@receiver(post_save, sender=QuestionOption)
+@receiver(post_delete, sender=QuestionOption)
+def option_changed(sender, instance, **kwargs):
+    if QuestionOption.question.is_cached(instance):
+        question = instance.question
+        bank = (question.course_id, question.interactive_course_id)
+    else:
+        bank = Question.objects.filter(pk=instance.question_id).values_list(
+            'course_id', 'interactive_course_id'
+        ).first()
+    if bank:
+        _schedule_invalidation(*bank)
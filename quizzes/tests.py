@@ -0,0 +1,147 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from courses.models import Course
+
+from . import answer_keys
+from .answer_keys import get_answer_key
+from .grading import grade_submission, save_graded_answers
+from .models import Question, QuestionOption, QuizAnswer, QuizAttempt
+
+
+def make_user(username, role='banker', **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **extra
+    )
+
+
+def make_question(text, correct, wrong, question_type='multiple_choice', **bank):
+    question = Question.objects.create(question_text=text, question_type=question_type, **bank)
+    options = [
+        QuestionOption.objects.create(question=question, option_text=option_text, is_correct=is_correct, order_index=i)
+        for i, (option_text, is_correct) in enumerate(
+            [(option_text, True) for option_text in correct] + [(option_text, False) for option_text in wrong]
+        )
+    ]
+    return question, options
+
+
+def submission(**answers):
+    data = QueryDict(mutable=True)
+    for name, values in answers.items():
+        data.setlist(name, [str(value) for value in values])
+    return data
+
+
+class AnswerKeyTestCase(TestCase):
+    def setUp(self):
+        # Test databases reuse ids, so start without cached keys
+        cache.clear()
+        answer_keys._local_keys.clear()
+
+
+class GradingTests(AnswerKeyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.single, cls.single_options = make_question('Single', ['Yes'], ['No'], course=cls.course)
+        cls.multiple, cls.multiple_options = make_question(
+            'Multiple', ['A', 'B'], ['C'], question_type='multiple_answer', course=cls.course
+        )
+        cls.other, cls.other_options = make_question('Other course', ['Yes'], ['No'])
+
+    def test_grades_against_correct_option_sets(self):
+        answer_key = get_answer_key(course_id=self.course.id)
+        data = submission(**{
+            f'question_{self.single.id}': [self.single_options[0].id],
+            # Only one of the two correct options: wrong
+            f'question_{self.multiple.id}': [self.multiple_options[0].id],
+        })
+        graded = {question_id: (selected, correct) for question_id, selected, correct in grade_submission(answer_key, data)}
+        self.assertEqual(graded[self.single.id], ({self.single_options[0].id}, True))
+        self.assertEqual(graded[self.multiple.id], ({self.multiple_options[0].id}, False))
+
+    def test_ignores_foreign_and_malformed_options(self):
+        answer_key = get_answer_key(course_id=self.course.id)
+        data = submission(**{
+            f'question_{self.single.id}': [self.other_options[0].id, 'x', self.single_options[0].id],
+        })
+        [(question_id, selected, is_correct)] = grade_submission(answer_key, data)
+        self.assertEqual((question_id, selected, is_correct), (self.single.id, {self.single_options[0].id}, True))
+
+    def test_saves_answers_in_bulk(self):
+        attempt = QuizAttempt.objects.create(user=self.banker, course=self.course, total_questions=2)
+        graded = [
+            (self.single.id, {self.single_options[0].id}, True),
+            (self.multiple.id, {self.multiple_options[0].id, self.multiple_options[2].id}, False),
+        ]
+        with self.assertNumQueries(2):
+            correct = save_graded_answers(attempt, graded)
+        self.assertEqual(correct, 1)
+        answer = QuizAnswer.objects.get(attempt=attempt, question=self.multiple)
+        self.assertFalse(answer.is_correct)
+        self.assertEqual(
+            set(answer.selected_options.values_list('id', flat=True)),
+            {self.multiple_options[0].id, self.multiple_options[2].id},
+        )
+
+
+class AnswerKeyTests(AnswerKeyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.other_course = Course.objects.create(title='KYC', description='', is_published=True)
+        cls.question, cls.options = make_question('Single', ['Yes'], ['No'], course=cls.course)
+
+    def test_warm_key_runs_no_queries(self):
+        get_answer_key(course_id=self.course.id)
+        with self.assertNumQueries(0):
+            answer_key = get_answer_key(course_id=self.course.id)
+        entry = answer_key[self.question.id]
+        self.assertEqual([option.option_text for option in entry['question'].options], ['Yes', 'No'])
+        self.assertEqual(entry['correct_ids'], {self.options[0].id})
+
+    def test_option_change_retires_key(self):
+        get_answer_key(course_id=self.course.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuestionOption.objects.filter(pk=self.options[1].pk).update(is_correct=True)
+            QuestionOption.objects.get(pk=self.options[1].pk).save()
+        entry = get_answer_key(course_id=self.course.id)[self.question.id]
+        self.assertEqual(entry['correct_ids'], {option.id for option in self.options})
+
+    def test_moved_question_leaves_old_bank(self):
+        self.assertIn(self.question.id, get_answer_key(course_id=self.course.id))
+        question = Question.objects.get(pk=self.question.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            question.course = self.other_course
+            question.save()
+        self.assertNotIn(self.question.id, get_answer_key(course_id=self.course.id))
+        self.assertIn(self.question.id, get_answer_key(course_id=self.other_course.id))
+
+    @override_settings(QUIZ_ANSWER_KEY_SHARED=True)
+    def test_shared_cache_holds_plain_values(self):
+        get_answer_key(course_id=self.course.id)
+        version = answer_keys._get_version(('course', self.course.id))
+        cached = cache.get(f'quizzes:answer_key:course:{self.course.id}:{version}:{answer_keys.ANSWER_KEY_FORMAT}')
+        self.assertEqual(len(cached), 1)
+
+        def plain(value):
+            if isinstance(value, (list, tuple)):
+                return type(value) in (list, tuple) and all(plain(item) for item in value)
+            return isinstance(value, (int, str, bool))
+
+        self.assertTrue(plain(cached))
+
+    def test_quiz_page_renders_cached_questions(self):
+        banker = make_user('banker')
+        attempt = QuizAttempt.objects.create(
+            user=banker, course=self.course, total_questions=1, question_ids=[self.question.id]
+        )
+        self.client.force_login(banker)
+        response = self.client.get(reverse('quizzes:take', args=[attempt.id]))
+        self.assertContains(response, f'name="question_{self.question.id}"', count=2)
+        self.assertContains(response, 'Yes')
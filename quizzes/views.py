@@ -3,10 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.http import JsonResponse
+from django.db import transaction
 from django.db.models import Count, Q
-from .models import Question, QuizAttempt, QuizAnswer, QuestionOption
+from .models import Question, QuizAttempt, QuestionOption
+from .answer_keys import get_answer_key, get_attempt_answer_key, get_attempt_questions, invalidate_question
+from .grading import grade_submission, save_graded_answers
 from courses.models import Course, Enrollment
 from certificates.models import Certificate
+from certificates.tasks import queue_certificate_render
 from videos.models import VideoProgress, InteractiveCourse, InteractiveCourseProgress
 import random
 import uuid
@@ -44,7 +48,7 @@ def start_quiz_view(request, course_id):
         return redirect('courses:course_detail', course_id=course.id)
     
     # Get all questions for this course grouped by topic
-    questions = list(Question.objects.filter(course=course))
+    questions = [entry['question'] for entry in get_answer_key(course_id=course.id).values()]
     
     # Randomly select questions (ensure different questions each time)
     if len(questions) > 20:
@@ -85,7 +89,7 @@ def take_quiz_view(request, attempt_id):
             return redirect('courses:course_detail', course_id=quiz_attempt.course.id)
         return redirect('courses:course_list')
     
-    questions = Question.objects.filter(id__in=question_ids).prefetch_related('options')
+    questions = get_attempt_questions(quiz_attempt)
     
     context = {
         'quiz_attempt': quiz_attempt,
@@ -102,58 +106,44 @@ def submit_quiz_view(request, attempt_id):
     if request.method != 'POST':
         return redirect('quizzes:take', attempt_id=attempt_id)
     
-    quiz_attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
+    quiz_attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('course', 'interactive_course'),
+        id=attempt_id, user=request.user
+    )
     
     # Check if quiz already completed
     if quiz_attempt.completed_at:
         messages.info(request, 'This quiz has already been submitted.')
         return redirect('quizzes:results', attempt_id=quiz_attempt.id)
     
-    # Get question IDs from database (persistent across sessions)
-    question_ids = quiz_attempt.question_ids or []
-    questions = Question.objects.filter(id__in=question_ids).prefetch_related('options')
-    
-    correct_answers = 0
-    
-    for question in questions:
-        # Get user's selected options
-        selected_option_ids = request.POST.getlist(f'question_{question.id}')
+    # Grade in memory against the cached answer key of the attempt's questions
+    answer_key = get_attempt_answer_key(quiz_attempt)
+    graded = grade_submission(answer_key, request.POST)
+    
+    with transaction.atomic():
+        # Lock the attempt so a double submit can't grade it twice
+        completed_at = QuizAttempt.objects.select_for_update().filter(
+            id=quiz_attempt.id
+        ).values_list('completed_at', flat=True).first()
+        if completed_at:
+            messages.info(request, 'This quiz has already been submitted.')
+            return redirect('quizzes:results', attempt_id=quiz_attempt.id)
         
-        if selected_option_ids:
-            # Create quiz answer
-            quiz_answer = QuizAnswer.objects.create(
-                attempt=quiz_attempt,
-                question=question
-            )
-            
-            # Get selected options
-            selected_options = QuestionOption.objects.filter(id__in=selected_option_ids)
-            quiz_answer.selected_options.set(selected_options)
-            
-            # Check if answer is correct
-            correct_options = question.options.filter(is_correct=True)
-            selected_correct = set(selected_options.filter(is_correct=True).values_list('id', flat=True))
-            all_correct = set(correct_options.values_list('id', flat=True))
-            
-            if selected_correct == all_correct and len(selected_option_ids) == len(all_correct):
-                quiz_answer.is_correct = True
-                correct_answers += 1
-            
-            quiz_answer.save()
-    
-    # Calculate score
-    score = (correct_answers / quiz_attempt.total_questions) * 100 if quiz_attempt.total_questions > 0 else 0
-    quiz_attempt.score = score
-    quiz_attempt.correct_answers = correct_answers
-    
-    # Determine passing (80% for both course and interactive course)
-    passing_score = 80
-    if quiz_attempt.course:
-        passing_score = quiz_attempt.course.passing_score
-    
-    quiz_attempt.passed = score >= passing_score
-    quiz_attempt.completed_at = timezone.now()
-    quiz_attempt.save()
+        correct_answers = save_graded_answers(quiz_attempt, graded)
+        
+        # Calculate score
+        score = (correct_answers / quiz_attempt.total_questions) * 100 if quiz_attempt.total_questions > 0 else 0
+        quiz_attempt.score = score
+        quiz_attempt.correct_answers = correct_answers
+        
+        # Determine passing (80% for both course and interactive course)
+        passing_score = 80
+        if quiz_attempt.course:
+            passing_score = quiz_attempt.course.passing_score
+        
+        quiz_attempt.passed = score >= passing_score
+        quiz_attempt.completed_at = timezone.now()
+        quiz_attempt.save()
     
     # Update interactive course progress if this is an interactive course quiz
     if quiz_attempt.interactive_course and quiz_attempt.passed:
@@ -255,14 +245,8 @@ def check_and_generate_certificate(user, course):
         verification_url=verification_url
     )
     
-    # Generate QR code and PDF
-    certificate.generate_qr_code()
-    
-    # Import here to avoid circular imports
-    from certificates.views import generate_certificate_pdf
-    generate_certificate_pdf(certificate)
-    
-    certificate.save()
+    # QR code and PDF are rendered in the background
+    queue_certificate_render(certificate)
     
     return certificate
 
@@ -295,13 +279,8 @@ def check_and_generate_interactive_certificate(user, interactive_course, score):
         verification_url=verification_url
     )
     
-    # Generate QR code and PDF
-    certificate.generate_qr_code()
-    
-    from certificates.views import generate_certificate_pdf
-    generate_certificate_pdf(certificate)
-    
-    certificate.save()
+    # QR code and PDF are rendered in the background
+    queue_certificate_render(certificate)
     
     return certificate
 
@@ -344,7 +323,7 @@ def start_interactive_quiz(request, interactive_id):
                        interactive_id=interactive_course.id)
     
     # Get all questions for this interactive course
-    questions = list(Question.objects.filter(interactive_course=interactive_course))
+    questions = [entry['question'] for entry in get_answer_key(interactive_course_id=interactive_course.id).values()]
     
     if not questions:
         messages.error(request, 'No questions available for this course yet.')
@@ -441,6 +420,7 @@ def add_interactive_question(request, interactive_id):
                     order_index=i
                 )
         
+        invalidate_question(question)
         messages.success(request, 'Question added successfully!')
         return redirect('quizzes:manage_interactive_questions', interactive_id=interactive_id)
     
@@ -487,6 +467,7 @@ def edit_interactive_question(request, question_id):
                     order_index=i
                 )
         
+        invalidate_question(question)
         messages.success(request, 'Question updated successfully!')
         
         if question.interactive_course:
@@ -517,6 +498,7 @@ def delete_interactive_question(request, question_id):
     
     interactive_id = question.interactive_course.id if question.interactive_course else None
     question.delete()
+    invalidate_question(question)
     
     messages.success(request, 'Question deleted successfully!')
     
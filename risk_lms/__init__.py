@@ -0,0 +1,8 @@
+# Load the Celery app when it is installed so shared tasks bind to it;
+# without Celery, background jobs run on the in-process thread pool.
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ('celery_app',)
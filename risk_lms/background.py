@@ -0,0 +1,85 @@
+"""
+Background task dispatch.
+
+Tasks run on a small thread pool inside the web process, so long-running
+work never blocks the request. With BACKGROUND_TASKS_USE_CELERY on they are
+queued on Celery instead; while the broker is unreachable they fall back to
+the thread pool, and the broker is only tried again after
+BACKGROUND_BROKER_RETRY_INTERVAL seconds, so requests don't each wait for
+the connection timeout.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# time.monotonic() until which the broker is assumed to be down
+_broker_down_until = 0
+
+
+def background_task(func):
+    """Register ``func`` as a Celery task when Celery is available"""
+    if shared_task is None:
+        return func
+    return shared_task(func)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+                thread_name_prefix='background-task',
+            )
+        return _executor
+
+
+def _run_in_thread(func, args):
+    @wraps(func)
+    def runner():
+        close_old_connections()
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Background task %s failed', func.__name__)
+        finally:
+            close_old_connections()
+
+    return _get_executor().submit(runner)
+
+
+def enqueue(task, *args):
+    """
+    Run ``task(*args)`` in the background.
+
+    Returns the Celery AsyncResult, or the Future of the thread-pool fallback.
+    """
+    global _broker_down_until
+    use_celery = hasattr(task, 'apply_async') and getattr(settings, 'BACKGROUND_TASKS_USE_CELERY', False)
+    if use_celery and time.monotonic() >= _broker_down_until:
+        try:
+            return task.apply_async(args=args, retry=False)
+        except Exception as e:
+            retry_interval = getattr(settings, 'BACKGROUND_BROKER_RETRY_INTERVAL', 60)
+            _broker_down_until = time.monotonic() + retry_interval
+            logger.warning(
+                'Celery unavailable for %s, running in-process for the next %ss: %s', task.name, retry_interval, e
+            )
+
+    # Celery tasks keep the plain function on .run
+    return _run_in_thread(getattr(task, 'run', task), args)
@@ -0,0 +1,14 @@
+"""
+Celery application for Risk LMS.
+
+Start a worker with: celery -A risk_lms worker -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'risk_lms.settings')
+
+app = Celery('risk_lms')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,79 @@
+"""
+Fixed-size thumbnail variants of course, video and module images.
+
+``make_variants`` crops a source image to each of THUMBNAIL_SIZES and
+saves it as WebP and JPEG under THUMBNAIL_FOLDER. File names start with a
+hash of the image, so the content at a URL never changes and is served as
+immutable; ``ThumbnailVariantsMixin`` gives the models the URLs of the
+variants recorded in their ``thumbnail_variants`` field.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+THUMBNAIL_FOLDER = 'thumbnails'
+
+# Sources are scaled down to this box before hashing and cropping
+MAX_SOURCE_SIZE = (1920, 1920)
+
+# format: (file extension, Pillow save options)
+VARIANT_FORMATS = {
+    'webp': ('webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def thumbnail_root():
+    return os.path.join(settings.MEDIA_ROOT, THUMBNAIL_FOLDER)
+
+
+def prepare_image(image):
+    """Upright RGB copy of an image, at most MAX_SOURCE_SIZE"""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(MAX_SOURCE_SIZE)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def make_variants(image, folder):
+    """
+    Save the variants of a PIL image under THUMBNAIL_FOLDER/``folder``, which
+    holds nothing else, and return the ``thumbnail_variants`` mapping.
+    """
+    image = prepare_image(image)
+    digest = hashlib.sha1(image.tobytes()).hexdigest()[:16]
+    directory = os.path.join(thumbnail_root(), *folder.split('/'))
+    os.makedirs(directory, exist_ok=True)
+
+    variants = {}
+    for size_name, (width, height) in settings.THUMBNAIL_SIZES.items():
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        entry = {'width': width, 'height': height}
+        for image_format, (extension, options) in VARIANT_FORMATS.items():
+            name = f'{digest}-{size_name}.{extension}'
+            resized.save(os.path.join(directory, name), image_format.upper(), **options)
+            entry[image_format] = f'{folder}/{name}'
+        variants[size_name] = entry
+
+    # Variants of an earlier image
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.startswith(digest + '-'):
+            os.unlink(entry.path)
+    return variants
+
+
+class ThumbnailVariantsMixin:
+    """URLs of the variants listed in a model's ``thumbnail_variants``"""
+
+    def get_thumbnail_url(self, size='small', image_format='jpeg'):
+        path = (self.thumbnail_variants or {}).get(size, {}).get(image_format)
+        if not path:
+            return None
+        return reverse('videos:thumbnail', args=[path])
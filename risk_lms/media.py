@@ -0,0 +1,216 @@
+"""
+Authenticated delivery of large media files (videos, interactive packages).
+
+``serve_file`` answers conditional requests from a strong ETag, serves
+single byte ranges (so players can seek without re-downloading) and marks
+files under immutable paths as cacheable for a year. With MEDIA_SENDFILE
+set to 'x-sendfile' or 'x-accel-redirect' the body is left to the front
+server; otherwise it is streamed from Python. Interactive packages, which
+load hundreds of small assets, are only routed through here when a sendfile
+backend is configured (see ``sendfile_enabled``).
+
+Access is checked per course with ``user_can_access_course`` (risk admins,
+enrolled users and the course's creator), cached briefly per process
+because a single interactive module loads hundreds of assets.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Read size of the pure-Python fallback
+STREAM_BLOCK_SIZE = 64 * 1024
+
+ACCESS_CACHE_TTL = 300
+
+# Served with nosniff, so these must not depend on the host's MIME registry
+CONTENT_TYPES = {
+    '.css': 'text/css',
+    '.html': 'text/html',
+    '.htm': 'text/html',
+    '.js': 'text/javascript',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.json': 'application/json',
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.mp3': 'audio/mpeg',
+    '.mp4': 'video/mp4',
+    '.png': 'image/png',
+    '.svg': 'image/svg+xml',
+    '.ts': 'video/mp2t',
+    '.vtt': 'text/vtt',
+    '.webm': 'video/webm',
+    '.webp': 'image/webp',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+}
+
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+
+def sendfile_enabled():
+    """Whether the front server sends file bodies for serve_file (MEDIA_SENDFILE)"""
+    return getattr(settings, 'MEDIA_SENDFILE', None) in ('x-sendfile', 'x-accel-redirect')
+
+
+def user_can_access_course(user, course_id):
+    """Whether ``user`` may view the content of a course"""
+    if not user.is_authenticated:
+        return False
+    if user.is_risk_admin():
+        return True
+
+    from courses.models import Course, Enrollment
+
+    key = f'media-access:{user.pk}:{course_id}'
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = (
+            Enrollment.objects.filter(user=user, course_id=course_id).exists()
+            or Course.objects.filter(pk=course_id, created_by=user).exists()
+        )
+        cache.set(key, allowed, ACCESS_CACHE_TTL)
+    return allowed
+
+
+def safe_join(root, relative_path):
+    """Absolute path of ``relative_path`` inside ``root``; Http404 if it escapes"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, *relative_path.replace('\\', '/').split('/')))
+    if path != root and not path.startswith(root + os.sep):
+        raise Http404('Invalid path')
+    return path
+
+
+class _RangeFile:
+    """Read at most ``length`` bytes of an open file, from ``start``"""
+
+    def __init__(self, file, start, length):
+        self._file = file
+        self._file.seek(start)
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _etag(stat_result):
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _parse_range(header, size):
+    """(start, end) of a single satisfiable byte range, None to send it all, or False"""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        # Multiple or malformed ranges: the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _is_fresh(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return modified_since is not None and int(last_modified) <= modified_since
+
+
+def _offload_headers(response, path):
+    mode = getattr(settings, 'MEDIA_SENDFILE', None)
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    elif mode == 'x-accel-redirect':
+        relative = os.path.relpath(path, os.path.realpath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(relative)
+    else:
+        return False
+    return True
+
+
+def serve_file(request, path, immutable=False, content_type=None):
+    """
+    Response for the file at ``path`` honouring Range, If-Range,
+    If-None-Match and If-Modified-Since.
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        raise Http404('File not found')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('File not found')
+
+    size = stat_result.st_size
+    etag = _etag(stat_result)
+    last_modified = stat_result.st_mtime
+    content_type = (
+        content_type
+        or CONTENT_TYPES.get(os.path.splitext(path)[1].lower())
+        or mimetypes.guess_type(path)[0]
+        or 'application/octet-stream'
+    )
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        return response
+
+    if _is_fresh(request, etag, last_modified):
+        return finish(HttpResponseNotModified())
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.META.get('HTTP_IF_RANGE', etag).strip() == etag:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finish(response)
+
+    # The front server reads the file and handles the range itself
+    offloaded = HttpResponse(content_type=content_type)
+    if _offload_headers(offloaded, os.path.realpath(path)):
+        return finish(offloaded)
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(_RangeFile(open(path, 'rb'), start, length), content_type=content_type, status=206)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = STREAM_BLOCK_SIZE
+    return finish(response)
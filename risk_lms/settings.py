@@ -216,20 +216,109 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 2147483648  # 2GB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 2147483648
+# Larger multipart files are spooled to a temporary file instead of memory;
+# big videos and packages go through the chunked upload API (videos.uploads)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+
+# Chunked uploads: partial files live under MEDIA_ROOT (same volume, so a
+# finished file is renamed into place) and are purged after
+# CHUNKED_UPLOAD_EXPIRY_HOURS without activity
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 5 * 1024 * 1024 * 1024
+CHUNKED_UPLOAD_FOLDER = 'chunked_uploads'
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
 
 # Celery Configuration (for video processing)
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_CONNECTION_TIMEOUT = 3
+CELERY_IMPORTS = ['content_management.reports', 'videos.packages', 'videos.transcoding', 'videos.thumbnails']
+
+# Background tasks run on an in-process thread pool of this size. Turn on
+# BACKGROUND_TASKS_USE_CELERY where a broker and worker are running; if the
+# broker stops answering, tasks run in-process and it is retried after
+# BACKGROUND_BROKER_RETRY_INTERVAL seconds
+BACKGROUND_TASKS_USE_CELERY = os.environ.get('BACKGROUND_TASKS_USE_CELERY', 'False').lower() in ('true', '1', 'yes')
+BACKGROUND_BROKER_RETRY_INTERVAL = 60
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', '2'))
+
+# Generated Excel reports are cached under MEDIA_ROOT/reports/ and reused
+# until the underlying data changes
+REPORT_JOB_TIMEOUT = 30 * 60  # seconds before an unfinished job is considered abandoned
+# A replaced report file is kept this long, for downloads still in progress
+REPORT_SUPERSEDED_GRACE = 60 * 60
+
+# Interactive packages are extracted into a content-addressed store under
+# MEDIA_ROOT/interactive_courses/blobs/ and hard-linked into each package's
+# folder; the uploaded ZIP is only kept when INTERACTIVE_PACKAGE_KEEP_ZIP is on
+INTERACTIVE_PACKAGE_KEEP_ZIP = os.environ.get('INTERACTIVE_PACKAGE_KEEP_ZIP', 'True').lower() in ('true', '1', 'yes')
+# Stored package files written or reused within this many seconds are never
+# deleted, as a running ingestion may not have saved its manifest yet
+INTERACTIVE_BLOB_GRACE = 6 * 60 * 60
+
+# Videos are served by risk_lms.media behind the enrollment checks. Set
+# MEDIA_SENDFILE to 'x-sendfile' or 'x-accel-redirect' to let the front server
+# send the bytes (nginx: an internal location at MEDIA_ACCEL_REDIRECT_PREFIX
+# aliased to MEDIA_ROOT); interactive package files then go through the same
+# checks. Without it (e.g. IIS) packages are served statically from /media/.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
 
 # Video processing settings
 VIDEO_ALLOWED_EXTENSIONS = ['mp4', 'mov', 'avi', 'mkv']
 SUBTITLE_ALLOWED_EXTENSIONS = ['vtt', 'srt']
 
+# Uploaded videos are transcoded in the background into the HLS renditions
+# below (those taller than the source are skipped) with a local ffmpeg.
+# Without a Celery worker, ffmpeg runs as a child of the web process (the
+# IIS worker): it competes with requests for CPU and dies when the app pool
+# recycles. Set VIDEO_TRANSCODE_ENABLED off there and schedule
+# `manage.py transcode_videos --untranscoded` instead.
+FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+FFPROBE_PATH = os.environ.get('FFPROBE_PATH', 'ffprobe')
+VIDEO_TRANSCODE_ENABLED = os.environ.get('VIDEO_TRANSCODE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+# A transcode still 'processing' this many seconds after it started has lost
+# its worker; the next upload or transcode_videos run queues it again
+VIDEO_TRANSCODE_STALE_AFTER = 6 * 60 * 60
+VIDEO_HLS_SEGMENT_SECONDS = 6
+VIDEO_HLS_RENDITIONS = [
+    # name, height, video kbit/s, audio kbit/s
+    ('360p', 360, 700, 64),
+    ('540p', 540, 1400, 96),
+    ('720p', 720, 2500, 128),
+    ('1080p', 1080, 4500, 128),
+]
+# Poster frames and list images are cropped to these sizes (WebP and JPEG)
+THUMBNAIL_SIZES = {
+    'small': (320, 180),
+    'medium': (640, 360),
+}
+
+# Browsers without native HLS (Chrome, Firefox) need hls.js; set this to its
+# URL (e.g. a copy under static/) or they keep playing the original file
+VIDEO_HLS_PLAYER_JS = os.environ.get('VIDEO_HLS_PLAYER_JS', '')
+
+# Quiz answer keys (questions, options and correct answers per course) are
+# cached in process for QUIZ_ANSWER_KEY_TTL seconds; set QUIZ_ANSWER_KEY_SHARED
+# when CACHES points at a shared backend (e.g. Redis) to share them too
+QUIZ_ANSWER_KEY_CACHE = 'default'
+QUIZ_ANSWER_KEY_TTL = 300
+QUIZ_ANSWER_KEY_SHARED = os.environ.get('QUIZ_ANSWER_KEY_SHARED', 'False').lower() in ('true', '1', 'yes')
+
+# Video progress pings are buffered per process and written in batches every
+# VIDEO_HEARTBEAT_FLUSH_INTERVAL seconds (0 writes each ping straight away)
+VIDEO_HEARTBEAT_FLUSH_INTERVAL = int(os.environ.get('VIDEO_HEARTBEAT_FLUSH_INTERVAL', '30'))
+# Interactive (SCORM) slide position, time spent and SCORM data updates are
+# buffered the same way; slide completions and quiz results are saved at once
+INTERACTIVE_PROGRESS_FLUSH_INTERVAL = int(os.environ.get('INTERACTIVE_PROGRESS_FLUSH_INTERVAL', '30'))
+
 # Certificate settings
 CERTIFICATE_QR_SIZE = 200
 CERTIFICATE_BASE_URL = os.environ.get('CERTIFICATE_BASE_URL', 'http://localhost:8000')
+# What certificate QR codes encode: 'full' (readable details, large symbol) or
+# 'compact' (verification link with a signed token, small and fast to scan)
+CERTIFICATE_QR_PAYLOAD = os.environ.get('CERTIFICATE_QR_PAYLOAD', 'full')
 
 # Email settings (for certificate delivery)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import background
+from .media import serve_file
+
+
+class FakeCeleryTask:
+    """Stands in for a Celery task whose broker refuses connections"""
+    name = 'fake'
+
+    def __init__(self):
+        self.attempts = 0
+
+    def apply_async(self, args, retry):
+        self.attempts += 1
+        raise ConnectionError('broker down')
+
+    def run(self, value):
+        return value * 2
+
+
+class BackgroundTests(SimpleTestCase):
+    def setUp(self):
+        background._broker_down_until = 0
+
+    def test_runs_on_thread_pool_by_default(self):
+        task = FakeCeleryTask()
+        future = background.enqueue(task, 21)
+        future.result(timeout=10)
+        self.assertEqual(task.attempts, 0)
+
+    @override_settings(BACKGROUND_TASKS_USE_CELERY=True, BACKGROUND_BROKER_RETRY_INTERVAL=60)
+    def test_unreachable_broker_is_not_retried_at_once(self):
+        task = FakeCeleryTask()
+        background.enqueue(task, 1).result(timeout=10)
+        background.enqueue(task, 2).result(timeout=10)
+        self.assertEqual(task.attempts, 1)
+
+    @override_settings(BACKGROUND_TASKS_USE_CELERY=True, BACKGROUND_BROKER_RETRY_INTERVAL=0)
+    def test_broker_is_retried_after_interval(self):
+        task = FakeCeleryTask()
+        background.enqueue(task, 1).result(timeout=10)
+        background.enqueue(task, 2).result(timeout=10)
+        self.assertEqual(task.attempts, 2)
+
+    def test_one_executor_for_concurrent_callers(self):
+        background._executor = None
+        executors = []
+        barrier = threading.Barrier(8)
+
+        def get():
+            barrier.wait()
+            executors.append(background._get_executor())
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(executor) for executor in executors}), 1)
+
+
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.path = os.path.join(media_root, 'clip.mp4')
+        with open(self.path, 'wb') as clip:
+            clip.write(bytes(range(100)))
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        return serve_file(self.factory.get('/clip.mp4', **headers), self.path)
+
+    def test_whole_file(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertEqual((response['Content-Type'], response['Accept-Ranges']), ('video/mp4', 'bytes'))
+
+    def test_byte_ranges(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.serve(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+
+        response = self.serve(HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_conditional_requests(self):
+        etag = self.serve()['ETag']
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A range for an older version of the file gets the whole file
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_body_left_to_front_server(self):
+        response = self.serve(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/clip.mp4')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,91 @@
+"""
+Per-process write-behind buffers.
+
+High-frequency progress pings are merged in memory per key and written in
+batches by a flush callback, at most ``interval()`` seconds after the first
+pending update. A timer thread triggers the flush, and anything still
+pending is written when the process exits. An interval of 0 or less writes
+every update straight away.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Pending entries (dicts) keyed by e.g. (user_id, object_id).
+
+    ``write(batch)`` receives a {key: entry} dict and stores it.
+    """
+
+    def __init__(self, name, write, interval):
+        self.name = name
+        self._write = write
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        atexit.register(self._flush_on_exit)
+
+    def update(self, key, merge):
+        """
+        Apply ``merge(entry)`` to the pending entry of ``key`` (an empty dict
+        if there is none) and return a copy of the result.
+        """
+        with self._lock:
+            entry = self._pending.setdefault(key, {})
+            merge(entry)
+            snapshot = dict(entry)
+            write_through = self._interval() <= 0
+            if not write_through and self._timer is None:
+                self._timer = threading.Timer(self._interval(), self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if write_through:
+            self.flush([key])
+        return snapshot
+
+    def get(self, key):
+        """Copy of the pending entry of ``key``, or None"""
+        with self._lock:
+            entry = self._pending.get(key)
+            return dict(entry) if entry is not None else None
+
+    def pop(self, key):
+        """Remove and return the pending entry of ``key`` (None if there is none)"""
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def flush(self, keys=None):
+        """Write pending entries (only those of ``keys`` if given); returns how many"""
+        with self._lock:
+            if keys is None:
+                batch, self._pending = self._pending, {}
+            else:
+                batch = {key: self._pending.pop(key) for key in keys if key in self._pending}
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush %s', self.name)
+        finally:
+            close_old_connections()
+
+    def _flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush %s on exit', self.name)
@@ -0,0 +1,235 @@
+/**
+ * Chunked, resumable uploads for Risk LMS (server side: videos/uploads.py)
+ *
+ * Files are sent in fixed-size chunks, each with its offset and CRC-32.
+ * Failed chunks are retried, and after a dropped connection (or a page
+ * reload, via localStorage) the upload resumes from the offset the server
+ * has verified.
+ *
+ * Forms opt in with data-chunked-upload="<start url>"; their file inputs
+ * with data-chunked-purpose="video|package" are uploaded first and replaced
+ * by a hidden "<name>_upload" token field before the form is submitted.
+ * The form receives "chunked-upload-progress" events ({loaded, total}).
+ */
+
+(function() {
+    'use strict';
+
+    var MAX_RETRIES = 5;
+    var STORAGE_PREFIX = 'chunked-upload:';
+
+    var crcTable = null;
+
+    function crc32(buffer) {
+        if (!crcTable) {
+            crcTable = new Uint32Array(256);
+            for (var n = 0; n < 256; n++) {
+                var c = n;
+                for (var k = 0; k < 8; k++) {
+                    c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+                }
+                crcTable[n] = c >>> 0;
+            }
+        }
+        var bytes = new Uint8Array(buffer);
+        var crc = 0xFFFFFFFF;
+        for (var i = 0; i < bytes.length; i++) {
+            crc = crcTable[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+        }
+        return ((crc ^ 0xFFFFFFFF) >>> 0).toString(16);
+    }
+
+    function csrfToken(form) {
+        var input = form && form.querySelector('input[name="csrfmiddlewaretoken"]');
+        if (input) {
+            return input.value;
+        }
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    function sleep(ms) {
+        return new Promise(function(resolve) { setTimeout(resolve, ms); });
+    }
+
+    function readChunk(blob) {
+        if (blob.arrayBuffer) {
+            return blob.arrayBuffer();
+        }
+        return new Promise(function(resolve, reject) {
+            var reader = new FileReader();
+            reader.onload = function() { resolve(reader.result); };
+            reader.onerror = function() { reject(reader.error); };
+            reader.readAsArrayBuffer(blob);
+        });
+    }
+
+    function request(url, options) {
+        options.credentials = 'same-origin';
+        return fetch(url, options).then(function(response) {
+            return response.json().catch(function() { return {}; }).then(function(data) {
+                data.status = response.status;
+                return data;
+            });
+        });
+    }
+
+    function storageKey(file, purpose) {
+        return STORAGE_PREFIX + [purpose, file.name, file.size, file.lastModified || 0].join(':');
+    }
+
+    function resumeState(key) {
+        var url = null;
+        try {
+            url = window.localStorage.getItem(key);
+        } catch (e) {}
+        if (!url) {
+            return Promise.resolve(null);
+        }
+        return request(url, {method: 'GET'}).then(function(state) {
+            return state.status === 200 ? state : null;
+        }, function() { return null; });
+    }
+
+    /**
+     * Upload ``file``; resolves to the upload token to post with the form.
+     * options: startUrl, purpose, csrfToken, onProgress(loaded, total)
+     */
+    function upload(file, options) {
+        var key = storageKey(file, options.purpose);
+        var onProgress = options.onProgress || function() {};
+
+        return resumeState(key).then(function(state) {
+            if (state) {
+                return state;
+            }
+            return request(options.startUrl, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json', 'X-CSRFToken': options.csrfToken},
+                body: JSON.stringify({purpose: options.purpose, filename: file.name, size: file.size})
+            }).then(function(started) {
+                if (started.status !== 201) {
+                    throw new Error(started.error || 'Could not start the upload');
+                }
+                try {
+                    window.localStorage.setItem(key, started.url);
+                } catch (e) {}
+                return started;
+            });
+        }).then(function(state) {
+            var retries = 0;
+
+            function next() {
+                onProgress(state.offset, state.size);
+                if (state.offset >= state.size) {
+                    try {
+                        window.localStorage.removeItem(key);
+                    } catch (e) {}
+                    return state.token;
+                }
+                var chunk = file.slice(state.offset, Math.min(state.offset + state.chunk_size, state.size));
+                return readChunk(chunk).then(function(buffer) {
+                    return request(state.url, {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/octet-stream',
+                            'X-CSRFToken': options.csrfToken,
+                            'X-Upload-Offset': String(state.offset),
+                            'X-Chunk-CRC32': crc32(buffer)
+                        },
+                        body: buffer
+                    });
+                }).then(function(result) {
+                    if (result.status === 200 || result.status === 409) {
+                        // 409: the server is elsewhere (e.g. an earlier try did arrive)
+                        retries = 0;
+                        state = result;
+                        return next();
+                    }
+                    if (result.status === 400 && retries < MAX_RETRIES) {
+                        retries++;
+                        return next();
+                    }
+                    throw new Error(result.error || 'Upload failed (HTTP ' + result.status + ')');
+                }, function(error) {
+                    // Network error: wait, ask the server where it stands and carry on
+                    if (retries >= MAX_RETRIES) {
+                        throw error;
+                    }
+                    retries++;
+                    return sleep(1000 * Math.pow(2, retries)).then(function() {
+                        return request(state.url, {method: 'GET'}).then(function(current) {
+                            if (current.status === 200) {
+                                state = current;
+                            }
+                        }, function() {});
+                    }).then(next);
+                });
+            }
+
+            return next();
+        });
+    }
+
+    function attach(form) {
+        form.addEventListener('submit', function(e) {
+            if (e.defaultPrevented || form.dataset.chunkedDone) {
+                return;
+            }
+            var inputs = Array.prototype.filter.call(
+                form.querySelectorAll('input[type="file"][data-chunked-purpose]'),
+                function(input) { return input.files && input.files.length; }
+            );
+            if (!inputs.length || !window.fetch || !window.Blob || !Blob.prototype.slice) {
+                return;
+            }
+            e.preventDefault();
+
+            var buttons = form.querySelectorAll('button[type="submit"], input[type="submit"]');
+            Array.prototype.forEach.call(buttons, function(button) { button.disabled = true; });
+            var total = inputs.reduce(function(sum, input) { return sum + input.files[0].size; }, 0);
+            var done = 0;
+
+            inputs.reduce(function(previous, input) {
+                return previous.then(function() {
+                    var file = input.files[0];
+                    return upload(file, {
+                        startUrl: form.dataset.chunkedUpload,
+                        purpose: input.dataset.chunkedPurpose,
+                        csrfToken: csrfToken(form),
+                        onProgress: function(loaded) {
+                            form.dispatchEvent(new CustomEvent('chunked-upload-progress', {
+                                detail: {loaded: done + loaded, total: total}
+                            }));
+                        }
+                    }).then(function(token) {
+                        done += file.size;
+                        var hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = input.name + '_upload';
+                        hidden.value = token;
+                        form.appendChild(hidden);
+                        // The file itself is not posted again
+                        input.disabled = true;
+                    });
+                });
+            }, Promise.resolve()).then(function() {
+                form.dataset.chunkedDone = '1';
+                form.submit();
+            }, function(error) {
+                Array.prototype.forEach.call(buttons, function(button) { button.disabled = false; });
+                form.dispatchEvent(new CustomEvent('chunked-upload-error', {detail: {error: error}}));
+                alert('Upload error: ' + error.message + '\nSubmit again to resume the upload.');
+            });
+        });
+    }
+
+    window.ChunkedUpload = {
+        upload: upload,
+        csrfToken: csrfToken
+    };
+
+    document.addEventListener('DOMContentLoaded', function() {
+        Array.prototype.forEach.call(document.querySelectorAll('form[data-chunked-upload]'), attach);
+    });
+})();
@@ -60,22 +60,182 @@
         }
     }
     
-    // Send progress update to server
-    function sendProgressUpdate(slideNumber, additionalData) {
-        if (!window.SCORM_CONFIG.progressUrl) {
-            log('No progress URL configured');
-            return;
+    // ============================================
+    // Batched commit queue
+    // ============================================
+    // Progress events and changed CMI values are queued and posted together
+    // as {"events": [...]} on LMSCommit, after commitDelay ms, or with
+    // navigator.sendBeacon when the page is hidden or unloaded. Completion
+    // and score events are committed straight away.
+    //
+    // Callers pass time_spent as the minutes of the whole page session. The
+    // server adds up what it is sent, so a batch carries only the minutes not
+    // reported yet, once, in an event of its own (first, so it is applied
+    // even if a later event is rejected).
+    var POSITION_KEYS = ['current_slide', 'highest_slide_reached', 'completion_percentage', 'total_slides', 'time_spent'];
+
+    function isPositionEvent(event) {
+        return Object.keys(event).every(function(key) {
+            return POSITION_KEYS.indexOf(key) !== -1;
+        });
+    }
+
+    function isBatchApplied(result) {
+        var code = result.data && result.data.code;
+        return result.ok || (!!code && code !== 'invalid_json');
+    }
+
+    var ProgressQueue = {
+        events: [],
+        cmiChanges: {},
+        timer: null,
+        reportedMinutes: 0,
+
+        // Queue an event; consecutive position updates collapse into the latest
+        add: function(event, immediate) {
+            var last = this.events[this.events.length - 1];
+            if (last && isPositionEvent(last) && isPositionEvent(event)) {
+                this.events[this.events.length - 1] = event;
+            } else {
+                this.events.push(event);
+            }
+            if (immediate) {
+                return this.commit();
+            }
+            this.schedule();
+            return Promise.resolve({ ok: true, data: null, queued: true });
+        },
+
+        // Remember a changed CMI value for the next commit
+        setValue: function(element, value) {
+            this.cmiChanges[element] = value;
+            this.schedule();
+        },
+
+        schedule: function() {
+            if (this.timer) return;
+            var self = this;
+            this.timer = setTimeout(function() {
+                self.timer = null;
+                self.commit();
+            }, window.SCORM_CONFIG.commitDelay || 10000);
+        },
+
+        take: function(extraEvent) {
+            if (this.timer) {
+                clearTimeout(this.timer);
+                this.timer = null;
+            }
+            var events = this.events;
+            this.events = [];
+            if (Object.keys(this.cmiChanges).length) {
+                var event = { scorm_data: this.cmiChanges };
+                if (this.cmiChanges.hasOwnProperty('cmi.suspend_data')) {
+                    event.scorm_suspend_data = this.cmiChanges['cmi.suspend_data'];
+                }
+                events.push(event);
+                this.cmiChanges = {};
+            }
+            if (extraEvent) {
+                events.push(extraEvent);
+            }
+
+            var sessionMinutes = 0;
+            events = events.map(function(event) {
+                if (!event.hasOwnProperty('time_spent')) return event;
+                sessionMinutes = Math.max(sessionMinutes, parseInt(event.time_spent, 10) || 0);
+                var rest = Object.assign({}, event);
+                delete rest.time_spent;
+                return rest;
+            }).filter(function(event) {
+                return Object.keys(event).length > 0;
+            });
+            var minutes = Math.max(0, sessionMinutes - this.reportedMinutes);
+            if (minutes) {
+                events.unshift({ time_spent: minutes });
+                this.reportedMinutes += minutes;
+            }
+            return { events: events, minutes: minutes };
+        },
+
+        // Report the minutes of a batch the server did not apply with the next one
+        giveBack: function(minutes) {
+            this.reportedMinutes = Math.max(0, this.reportedMinutes - minutes);
+        },
+
+        // Send everything queued (plus extraEvent, applied last); resolves to {ok, data}
+        commit: function(extraEvent) {
+            var self = this;
+            var config = window.SCORM_CONFIG;
+            var batch = this.take(extraEvent);
+            var events = batch.events;
+            if (!events.length || !config.progressUrl) {
+                this.giveBack(batch.minutes);
+                return Promise.resolve({ ok: true, data: null });
+            }
+
+            return fetch(config.progressUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': config.csrfToken
+                },
+                body: JSON.stringify({ events: events }),
+                keepalive: true
+            })
+            .then(function(response) {
+                return response.json()
+                    .catch(function() { return {}; })
+                    .then(function(data) { return { ok: response.ok, data: data }; });
+            })
+            .then(function(result) {
+                // A rejected last event still applied the rest of the batch
+                if (!isBatchApplied(result)) {
+                    self.giveBack(batch.minutes);
+                }
+                log('Progress saved', result.data);
+                if (typeof config.onCommit === 'function') {
+                    config.onCommit(result);
+                }
+                return result;
+            })
+            .catch(function(error) {
+                self.giveBack(batch.minutes);
+                log('Progress save failed', error);
+                return { ok: false, data: { success: false, error: 'Network error while saving progress.' } };
+            });
+        },
+
+        // Flush with a beacon (survives page unload; CSRF token goes in the form)
+        beacon: function(extraEvent) {
+            var config = window.SCORM_CONFIG;
+            var batch = this.take(extraEvent);
+            var events = batch.events;
+            if (!events.length || !config.progressUrl) {
+                this.giveBack(batch.minutes);
+                return;
+            }
+
+            var form = new FormData();
+            form.append('csrfmiddlewaretoken', config.csrfToken);
+            form.append('payload', JSON.stringify({ events: events }));
+            if (navigator.sendBeacon && navigator.sendBeacon(config.progressUrl, form)) {
+                return;
+            }
+            fetch(config.progressUrl, { method: 'POST', body: form, keepalive: true });
         }
-        
+    };
+
+    // Queue a progress update (committed now when immediate)
+    function sendProgressUpdate(slideNumber, additionalData, immediate) {
         var data = Object.assign({
             current_slide: slideNumber,
             highest_slide_reached: highestSlideReached,
             completion_percentage: Math.round((highestSlideReached / window.SCORM_CONFIG.totalSlides) * 100),
-            total_slides: window.SCORM_CONFIG.totalSlides,
-            scorm_data: scormData
+            total_slides: window.SCORM_CONFIG.totalSlides
         }, additionalData || {});
         
-        // Send to parent window first (real-time UI update)
+        // Tell the parent window right away (real-time UI update)
         if (window.parent && window.parent !== window) {
             window.parent.postMessage({
                 type: 'slideChange',
@@ -85,22 +245,7 @@
             }, '*');
         }
         
-        // Then send to server
-        fetch(window.SCORM_CONFIG.progressUrl, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': window.SCORM_CONFIG.csrfToken
-            },
-            body: JSON.stringify(data)
-        })
-        .then(function(response) { return response.json(); })
-        .then(function(result) {
-            log('Progress saved', result);
-        })
-        .catch(function(error) {
-            log('Progress save failed', error);
-        });
+        return ProgressQueue.add(data, immediate);
     }
     
     // Parse lesson_location to extract slide number
@@ -156,7 +301,7 @@
             // Send final progress
             sendProgressUpdate(currentSlide, {
                 finished: true
-            });
+            }, true);
             
             // Notify parent
             if (window.parent && window.parent !== window) {
@@ -184,6 +329,7 @@
             lastError = 0;
             
             scormData[element] = value;
+            ProgressQueue.setValue(element, value);
             
             // Handle lesson_location (slide tracking)
             if (element === 'cmi.core.lesson_location' || element === 'cmi.location') {
@@ -202,7 +348,7 @@
                 if (value === 'completed' || value === 'passed') {
                     sendProgressUpdate(currentSlide, {
                         content_completed: true
-                    });
+                    }, true);
                     
                     // Notify parent
                     if (window.parent && window.parent !== window) {
@@ -223,7 +369,7 @@
                 
                 sendProgressUpdate(currentSlide, {
                     quiz_score: score
-                });
+                }, true);
                 
                 // Notify parent
                 if (window.parent && window.parent !== window) {
@@ -239,8 +385,8 @@
         
         LMSCommit: function(param) {
             log('LMSCommit', param);
-            // Save current state
-            sendProgressUpdate(currentSlide);
+            // Send everything queued since the last commit
+            ProgressQueue.commit();
             return 'true';
         },
         
@@ -320,6 +466,17 @@
     // ============================================
     window.API = API;
     window.API_1484_11 = API_1484_11;
+    window.SCORMProgressQueue = ProgressQueue;
+    
+    // Don't lose queued progress when the learner leaves or hides the page
+    window.addEventListener('pagehide', function() {
+        ProgressQueue.beacon();
+    });
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            ProgressQueue.beacon();
+        }
+    });
     
     // Also expose for frames
     if (window.parent && window.parent !== window) {
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Video, VideoSubtitle, VideoProgress
+from .models import Video, VideoRendition, VideoSubtitle, VideoProgress
+from .thumbnails import queue_thumbnail
 from risk_lms.admin import risk_admin_site
 
 class VideoSubtitleInline(admin.TabularInline):
@@ -7,14 +8,21 @@ class VideoSubtitleInline(admin.TabularInline):
     extra = 1
     fields = ['language_code', 'language_name', 'subtitle_file']
 
+class VideoRenditionInline(admin.TabularInline):
+    model = VideoRendition
+    extra = 0
+    can_delete = False
+    fields = ['name', 'width', 'height', 'video_bitrate', 'audio_bitrate', 'segment_count', 'size']
+    readonly_fields = fields
+
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
-    list_display = ['title', 'course', 'duration_display', 'order_index', 'subtitle_count', 'created_at']
-    list_filter = ['course', 'created_at']
+    list_display = ['title', 'course', 'duration_display', 'order_index', 'subtitle_count', 'transcode_status', 'created_at']
+    list_filter = ['course', 'transcode_status', 'created_at']
     search_fields = ['title', 'description', 'course__title']
     list_editable = ['order_index']
-    readonly_fields = ['created_at', 'thumbnail_preview']
-    inlines = [VideoSubtitleInline]
+    readonly_fields = ['created_at', 'thumbnail_preview', 'transcode_status', 'transcode_progress', 'transcode_error', 'hls_path']
+    inlines = [VideoSubtitleInline, VideoRenditionInline]
     
     fieldsets = (
         ('Video Information', {
@@ -26,6 +34,10 @@ class VideoAdmin(admin.ModelAdmin):
         ('Display Settings', {
             'fields': ('order_index',)
         }),
+        ('Streaming', {
+            'fields': ('transcode_status', 'transcode_progress', 'transcode_error', 'hls_path'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('created_at',),
             'classes': ('collapse',)
@@ -48,6 +60,11 @@ class VideoAdmin(admin.ModelAdmin):
         return "No thumbnail"
     thumbnail_preview.short_description = 'Thumbnail Preview'
     thumbnail_preview.allow_tags = True
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'thumbnail' in form.changed_data or not change:
+            queue_thumbnail(obj)
 
 @admin.register(VideoSubtitle)
 class VideoSubtitleAdmin(admin.ModelAdmin):
@@ -0,0 +1,150 @@
+"""
+Write-behind buffer for video progress heartbeats.
+
+The course player pings update_progress_view every few seconds while a video
+plays. Pings are merged in process memory per (user, video) and written
+every VIDEO_HEARTBEAT_FLUSH_INTERVAL seconds with one UPDATE per chunk of
+rows. A ping that completes the video is saved straight away through the
+model, so quiz and certificate gates and the progress summary see the
+completion at once.
+
+Each web process buffers its own pings. Progress reads in a process include
+its pending pings; those held by other processes land within one interval.
+"""
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from risk_lms.write_behind import WriteBehindBuffer
+from .models import Video, VideoProgress
+
+# Rows per UPDATE; each row adds about ten parameters (MSSQL allows 2100)
+FLUSH_CHUNK_SIZE = 100
+
+
+def _flush_interval():
+    return getattr(settings, 'VIDEO_HEARTBEAT_FLUSH_INTERVAL', 30)
+
+
+def _reached_completion(watched_duration, duration):
+    # 95% of the video, or a minute when the duration is unknown
+    if duration > 0:
+        return watched_duration >= duration * 0.95
+    return watched_duration >= 60
+
+
+def _load_entry(user_id, video_id):
+    video = Video.objects.filter(pk=video_id).values('duration', 'course_id').first()
+    if video is None:
+        return None
+    progress, _ = VideoProgress.objects.get_or_create(user_id=user_id, video_id=video_id)
+    return {
+        'duration': video['duration'],
+        'course_id': video['course_id'],
+        'watched_duration': progress.watched_duration,
+        'last_position': progress.last_position,
+        'is_completed': progress.is_completed,
+    }
+
+
+def _write_heartbeats(batch):
+    entries = list(batch.items())
+    now = timezone.now()
+    for start in range(0, len(entries), FLUSH_CHUNK_SIZE):
+        chunk = entries[start:start + FLUSH_CHUNK_SIZE]
+        matches = [Q(user_id=user_id, video_id=video_id) for (user_id, video_id), _ in chunk]
+        VideoProgress.objects.filter(reduce(or_, matches)).update(
+            watched_duration=Case(
+                *[
+                    When(match & Q(watched_duration__lt=entry['watched_duration']),
+                         then=Value(entry['watched_duration']))
+                    for match, (_, entry) in zip(matches, chunk)
+                ],
+                default=F('watched_duration'),
+            ),
+            last_position=Case(
+                *[When(match, then=Value(entry['last_position'])) for match, (_, entry) in zip(matches, chunk)],
+                default=F('last_position'),
+            ),
+            updated_at=now,
+        )
+
+    from progress.summary import touch_course_summaries
+    touch_course_summaries([(user_id, entry['course_id']) for (user_id, _), entry in entries], now)
+
+
+_buffer = WriteBehindBuffer('video heartbeats', _write_heartbeats, _flush_interval)
+
+
+def _save_completion(user_id, video_id, state):
+    with transaction.atomic():
+        progress = VideoProgress.objects.select_for_update().get(user_id=user_id, video_id=video_id)
+        # The video as loaded with the entry, so the progress summary signal needs no query
+        progress.video = Video(pk=video_id, course_id=state['course_id'], duration=state['duration'])
+        progress.watched_duration = max(progress.watched_duration, state['watched_duration'])
+        progress.last_position = state['last_position']
+        progress.is_completed = True
+        if not progress.completed_at:
+            progress.completed_at = timezone.now()
+        progress.save()
+    state.update(watched_duration=progress.watched_duration, is_completed=True)
+    return state
+
+
+def _progress_state(state):
+    progress = VideoProgress(
+        watched_duration=state['watched_duration'],
+        video=Video(duration=state['duration']),
+    )
+    return {
+        'is_completed': state['is_completed'],
+        'completion_percentage': progress.completion_percentage(),
+        'watched_duration': state['watched_duration'],
+        'last_position': state['last_position'],
+    }
+
+
+def record_heartbeat(user_id, video_id, watched_duration, last_position):
+    """
+    Buffer a progress ping, or save it at once if it completes the video.
+
+    Returns the resulting progress as a dict (is_completed,
+    completion_percentage, watched_duration, last_position), or None if the
+    video doesn't exist.
+    """
+    key = (user_id, video_id)
+    baseline = _buffer.get(key) or _load_entry(user_id, video_id)
+    if baseline is None:
+        return None
+
+    def merge(entry):
+        if not entry:
+            entry.update(baseline)
+        entry['watched_duration'] = max(entry['watched_duration'], watched_duration)
+        entry['last_position'] = last_position
+
+    state = _buffer.update(key, merge)
+    if not state['is_completed'] and _reached_completion(state['watched_duration'], state['duration']):
+        _buffer.pop(key)
+        state = _save_completion(user_id, video_id, state)
+    return _progress_state(state)
+
+
+def get_pending_heartbeat(user_id, video_id):
+    """Buffered (watched_duration, last_position) of a user/video, or None"""
+    entry = _buffer.get((user_id, video_id))
+    if entry is None:
+        return None
+    return entry['watched_duration'], entry['last_position']
+
+
+def flush_heartbeats(keys=None):
+    """
+    Write buffered pings to the database (only those of ``keys``, a list
+    of (user_id, video_id), if given). Returns the number of rows written.
+    """
+    return _buffer.flush(keys)
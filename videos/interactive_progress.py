@@ -0,0 +1,179 @@
+"""
+Progress ingestion for interactive (SCORM) courses.
+
+The SCORM wrapper and the player's slide polling post to
+update_interactive_progress many times a minute. Most of those posts only
+move the current slide (to one already started), add time spent or merge
+SCORM values. Those changes are merged per progress row in a per-process
+write-behind buffer and flushed every INTERACTIVE_PROGRESS_FLUSH_INTERVAL
+seconds with one bulk UPDATE per chunk of rows.
+
+Anything that affects sequencing (slide starts and completions, skip
+attempts, quiz results, content or course completion) is saved
+synchronously, with ``update_fields`` limited to the fields that changed
+plus any pending buffered ones.
+
+Both paths add time spent to the stored total with an F() expression, so
+requests handled by other processes never overwrite each other's time.
+"""
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from risk_lms.write_behind import WriteBehindBuffer
+from .models import InteractiveCourseProgress
+
+# Fields whose changes can wait for the next flush
+BUFFERED_FIELDS = {'current_slide', 'total_time_spent', 'scorm_data', 'scorm_suspend_data'}
+
+TRACKED_FIELDS = [
+    'completion_percentage', 'current_slide', 'highest_slide_reached', 'total_time_spent',
+    'completed_slides', 'slides_completed_count', 'skip_attempts',
+    'quiz_score', 'quiz_passed', 'quiz_attempts', 'content_completed', 'content_completed_at',
+    'is_completed', 'completed_at', 'scorm_data', 'scorm_suspend_data',
+]
+
+# Rows per SELECT ... FOR UPDATE / bulk UPDATE
+FLUSH_CHUNK_SIZE = 100
+
+
+def _flush_interval():
+    return getattr(settings, 'INTERACTIVE_PROGRESS_FLUSH_INTERVAL', 30)
+
+
+def _apply_entry(progress, entry):
+    # Time spent is a delta, applied by the callers
+    if 'current_slide' in entry:
+        progress.current_slide = entry['current_slide']
+    if entry.get('scorm_data'):
+        progress.scorm_data.update(entry['scorm_data'])
+    if 'scorm_suspend_data' in entry:
+        progress.scorm_suspend_data = entry['scorm_suspend_data']
+
+
+def _take_snapshot(progress):
+    progress._ingest_snapshot = {field: copy.deepcopy(getattr(progress, field)) for field in TRACKED_FIELDS}
+
+
+def _write_progress(batch):
+    now = timezone.now()
+    progress_ids = sorted(batch)
+    for start in range(0, len(progress_ids), FLUSH_CHUNK_SIZE):
+        chunk = progress_ids[start:start + FLUSH_CHUNK_SIZE]
+        fields = set()
+        added_time = False
+        for progress_id in chunk:
+            entry = batch[progress_id]
+            fields.update(field for field in BUFFERED_FIELDS if field in entry)
+            added_time = added_time or bool(entry.get('time_spent'))
+
+        with transaction.atomic():
+            rows = list(
+                InteractiveCourseProgress.objects.select_for_update()
+                .filter(pk__in=chunk)
+                .only('id', *fields)
+            )
+            for progress in rows:
+                entry = batch[progress.pk]
+                _apply_entry(progress, entry)
+                progress.total_time_spent = F('total_time_spent') + entry.get('time_spent', 0)
+                progress.updated_at = now
+            update_fields = sorted(fields) + ['updated_at']
+            if added_time:
+                update_fields.append('total_time_spent')
+            InteractiveCourseProgress.objects.bulk_update(rows, update_fields)
+
+    from progress.summary import touch_course_summaries
+    touch_course_summaries([(entry['user_id'], entry['course_id']) for entry in batch.values()], now)
+
+
+_buffer = WriteBehindBuffer('interactive progress', _write_progress, _flush_interval)
+
+
+def get_interactive_progress(user, interactive_course, create=True):
+    """
+    get_or_create the progress row of a user, with the updates this process
+    still has buffered for it applied. With ``create=False`` a missing row
+    is not inserted; an unsaved one is returned instead.
+    """
+    if create:
+        progress, _ = InteractiveCourseProgress.objects.get_or_create(
+            user=user,
+            interactive_course=interactive_course
+        )
+    else:
+        progress = (
+            InteractiveCourseProgress.objects.filter(user=user, interactive_course=interactive_course).first()
+            or InteractiveCourseProgress(user=user, interactive_course=interactive_course)
+        )
+    progress.interactive_course = interactive_course
+    entry = _buffer.get(progress.pk)
+    if entry:
+        _apply_entry(progress, entry)
+        progress.total_time_spent += entry.get('time_spent', 0)
+    _take_snapshot(progress)
+    return progress
+
+
+def changed_fields(progress):
+    """Tracked fields changed since ``get_interactive_progress`` returned ``progress``"""
+    snapshot = progress._ingest_snapshot
+    return {field for field in TRACKED_FIELDS if getattr(progress, field) != snapshot[field]}
+
+
+def save_interactive_progress(progress):
+    """
+    Persist the changes made to ``progress``: buffered when they are all
+    non-critical, otherwise saved now. Returns True if they were saved now.
+    """
+    changed = changed_fields(progress)
+    if not changed:
+        return False
+
+    snapshot = progress._ingest_snapshot
+    if changed <= BUFFERED_FIELDS:
+        scorm_changes = {
+            key: value for key, value in progress.scorm_data.items()
+            if snapshot['scorm_data'].get(key, object()) != value
+        }
+
+        def merge(entry):
+            entry.setdefault('user_id', progress.user_id)
+            entry.setdefault('course_id', progress.interactive_course.course_id)
+            if 'current_slide' in changed:
+                entry['current_slide'] = progress.current_slide
+            if 'total_time_spent' in changed:
+                entry['time_spent'] = entry.get('time_spent', 0) + progress.total_time_spent - snapshot['total_time_spent']
+            if scorm_changes:
+                entry.setdefault('scorm_data', {}).update(scorm_changes)
+            if 'scorm_suspend_data' in changed:
+                entry['scorm_suspend_data'] = progress.scorm_suspend_data
+
+        _buffer.update(progress.pk, merge)
+        _take_snapshot(progress)
+        return False
+
+    # Fold in whatever is buffered; it is already applied to ``progress``,
+    # apart from time spent, which is added to the stored total
+    pending = _buffer.pop(progress.pk)
+    time_spent = progress.total_time_spent - snapshot['total_time_spent']
+    if pending:
+        changed.update(field for field in BUFFERED_FIELDS if field in pending)
+        time_spent += pending.get('time_spent', 0)
+    changed.discard('total_time_spent')
+    total_time_spent = progress.total_time_spent
+    if time_spent:
+        progress.total_time_spent = F('total_time_spent') + time_spent
+        changed.add('total_time_spent')
+    progress.save(update_fields=sorted(changed) + ['updated_at'])
+    progress.total_time_spent = total_time_spent
+    _take_snapshot(progress)
+    return True
+
+
+def flush_interactive_progress(progress_ids=None):
+    """Write buffered updates (only those of ``progress_ids`` if given)"""
+    return _buffer.flush(progress_ids)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from videos.models import InteractiveCourse, Video
+from videos.thumbnails import generate_course_thumbnail, generate_interactive_thumbnail, generate_video_thumbnail
+
+
+class Command(BaseCommand):
+    help = (
+        'Make the thumbnail variants of videos, interactive modules and courses that have none '
+        '(e.g. uploaded before thumbnails were resized), optionally of all of them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Remake every thumbnail (e.g. after changing THUMBNAIL_SIZES)',
+        )
+
+    def handle(self, *args, **options):
+        # Courses last, as they may take the thumbnail of their first video or module
+        for model, task in (
+            (Video, generate_video_thumbnail),
+            (InteractiveCourse, generate_interactive_thumbnail),
+            (Course, generate_course_thumbnail),
+        ):
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.filter(thumbnail_variants={})
+            made = 0
+            for pk in queryset.order_by('pk').values_list('pk', flat=True):
+                task(pk)
+                made += model.objects.filter(pk=pk).exclude(thumbnail_variants={}).exists()
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.verbose_name_plural}: {made} with thumbnails'))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from videos.models import InteractiveCourse
+from videos.packages import ingest_package, prune_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Extract interactive course packages that are still queued (e.g. lost with a '
+        'recycled worker process), optionally re-running failed or stuck ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--id', type=int, action='append', dest='ids',
+            help='Only this interactive course id (repeatable)',
+        )
+        parser.add_argument(
+            '--failed', action='store_true',
+            help='Also retry packages whose ingestion failed',
+        )
+        parser.add_argument(
+            '--stuck', action='store_true',
+            help='Also restart packages left in processing',
+        )
+        parser.add_argument(
+            '--prune-blobs', action='store_true',
+            help='Afterwards delete stored package files no package uses (except recently stored ones)',
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['pending']
+        if options['failed']:
+            statuses.append('failed')
+        if options['stuck']:
+            statuses.append('processing')
+
+        queryset = InteractiveCourse.objects.filter(package_status__in=statuses)
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+
+        for interactive_course_id in queryset.order_by('pk').values_list('pk', flat=True):
+            started = time.monotonic()
+            ingest_package(interactive_course_id, statuses)
+            interactive_course = InteractiveCourse.objects.get(pk=interactive_course_id)
+            elapsed = time.monotonic() - started
+            if interactive_course.package_status == 'ready':
+                self.stdout.write(self.style.SUCCESS(
+                    f'{interactive_course_id}: {interactive_course.title} '
+                    f'({interactive_course.package_files.count()} files, {elapsed:.1f}s)'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'{interactive_course_id}: {interactive_course.package_status} {interactive_course.package_error}'
+                ))
+
+        if options['prune_blobs']:
+            deleted = prune_blobs()
+            self.stdout.write(f'Deleted {deleted} stored package file(s) no package uses')
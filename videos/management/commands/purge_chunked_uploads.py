@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from videos.uploads import purge_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that were abandoned or never used, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help='Idle time after which an upload is abandoned (default: CHUNKED_UPLOAD_EXPIRY_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {purged} abandoned upload(s)'))
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from videos.models import Video
+from videos.transcoding import reclaim_stale_transcodes, transcode_video
+
+
+class Command(BaseCommand):
+    help = (
+        'Make the HLS renditions of videos that are still queued (e.g. lost with a '
+        'recycled worker process), optionally of failed, stuck or never transcoded ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--id', type=int, action='append', dest='ids',
+            help='Only this video id (repeatable)',
+        )
+        parser.add_argument(
+            '--failed', action='store_true',
+            help='Also retry videos whose transcoding failed',
+        )
+        parser.add_argument(
+            '--stuck', action='store_true',
+            help='Also restart videos in processing that are not stale yet (see VIDEO_TRANSCODE_STALE_AFTER)',
+        )
+        parser.add_argument(
+            '--untranscoded', action='store_true',
+            help='Also transcode videos uploaded before transcoding was enabled',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-transcode ready videos too (e.g. after changing VIDEO_HLS_RENDITIONS)',
+        )
+
+    def handle(self, *args, **options):
+        # Stale transcodes lost their worker and are queued again
+        reclaim_stale_transcodes()
+
+        statuses = ['pending']
+        if options['failed']:
+            statuses.append('failed')
+        if options['stuck']:
+            statuses.append('processing')
+        if options['untranscoded']:
+            statuses.append('none')
+        if options['force']:
+            statuses.append('ready')
+
+        queryset = Video.objects.filter(transcode_status__in=statuses).exclude(video_file='')
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+
+        for video_id in queryset.order_by('pk').values_list('pk', flat=True):
+            started = time.monotonic()
+            transcode_video(video_id, statuses)
+            video = Video.objects.get(pk=video_id)
+            elapsed = time.monotonic() - started
+            if video.transcode_status == 'ready':
+                renditions = ', '.join(video.renditions.values_list('name', flat=True))
+                self.stdout.write(self.style.SUCCESS(f'{video_id}: {video.title} ({renditions}, {elapsed:.1f}s)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'{video_id}: {video.transcode_status} {video.transcode_error}'))
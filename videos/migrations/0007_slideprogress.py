@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_interactivecourseprogress_slide_timestamps_and_skip_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlideProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slide_number', models.IntegerField()),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('progress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slide_records', to='videos.interactivecourseprogress')),
+            ],
+            options={
+                'db_table': 'interactive_slide_progress',
+                'indexes': [models.Index(fields=['progress', 'completed_at'], name='slide_progress_completed_idx')],
+                'unique_together': {('progress', 'slide_number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='interactivecourseprogress',
+            name='slides_completed_count',
+            field=models.IntegerField(default=0, help_text='Number of completed slides'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2 on 2026-10-18 00:00
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+BATCH_SIZE = 500
+
+
+def _parse_ts(value):
+    if not value:
+        return None
+    dt = parse_datetime(str(value))
+    if dt and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_default_timezone())
+    return dt
+
+
+def _slide_numbers(*blobs):
+    numbers = set()
+    for blob in blobs:
+        for key in (blob or {}):
+            try:
+                numbers.add(int(key))
+            except (TypeError, ValueError):
+                pass
+    return sorted(numbers)
+
+
+def copy_json_to_rows(apps, schema_editor):
+    InteractiveCourseProgress = apps.get_model('videos', 'InteractiveCourseProgress')
+    SlideProgress = apps.get_model('videos', 'SlideProgress')
+
+    rows = []
+    counted = []
+    progress_qs = InteractiveCourseProgress.objects.only(
+        'id', 'slides_completed', 'slide_started_at', 'slide_completed_at', 'updated_at'
+    ).order_by('pk')
+    for progress in progress_qs.iterator(chunk_size=BATCH_SIZE):
+        completed = progress.slides_completed or {}
+        started_at = progress.slide_started_at or {}
+        completed_at = progress.slide_completed_at or {}
+        count = 0
+        for number in _slide_numbers(completed, started_at, completed_at):
+            key = str(number)
+            finished = _parse_ts(completed_at.get(key))
+            if completed.get(key) and finished is None:
+                # Completed before completion times were recorded
+                finished = _parse_ts(started_at.get(key)) or progress.updated_at
+            if finished is not None:
+                count += 1
+            rows.append(SlideProgress(
+                progress_id=progress.pk,
+                slide_number=number,
+                started_at=_parse_ts(started_at.get(key)),
+                completed_at=finished,
+            ))
+        if count:
+            counted.append(InteractiveCourseProgress(pk=progress.pk, slides_completed_count=count))
+
+        if len(rows) >= BATCH_SIZE:
+            SlideProgress.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            rows = []
+        if len(counted) >= BATCH_SIZE:
+            InteractiveCourseProgress.objects.bulk_update(counted, ['slides_completed_count'], batch_size=BATCH_SIZE)
+            counted = []
+
+    SlideProgress.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    InteractiveCourseProgress.objects.bulk_update(counted, ['slides_completed_count'], batch_size=BATCH_SIZE)
+
+
+def copy_rows_to_json(apps, schema_editor):
+    InteractiveCourseProgress = apps.get_model('videos', 'InteractiveCourseProgress')
+    SlideProgress = apps.get_model('videos', 'SlideProgress')
+
+    blobs = {}
+    for progress_id, number, started_at, completed_at in SlideProgress.objects.order_by(
+        'progress_id', 'slide_number'
+    ).values_list('progress_id', 'slide_number', 'started_at', 'completed_at').iterator(chunk_size=BATCH_SIZE):
+        blob = blobs.setdefault(progress_id, ({}, {}, {}))
+        key = str(number)
+        if started_at:
+            blob[1][key] = started_at.isoformat()
+        if completed_at:
+            blob[0][key] = True
+            blob[2][key] = completed_at.isoformat()
+
+    InteractiveCourseProgress.objects.bulk_update(
+        [
+            InteractiveCourseProgress(
+                pk=progress_id, slides_completed=completed, slide_started_at=started, slide_completed_at=finished
+            )
+            for progress_id, (completed, started, finished) in blobs.items()
+        ],
+        ['slides_completed', 'slide_started_at', 'slide_completed_at'],
+        batch_size=BATCH_SIZE,
+    )
+    SlideProgress.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_slideprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_json_to_rows, copy_rows_to_json),
+    ]
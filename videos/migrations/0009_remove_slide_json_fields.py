@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 00:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_copy_slide_json_to_slideprogress'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='interactivecourseprogress',
+            name='slides_completed',
+        ),
+        migrations.RemoveField(
+            model_name='interactivecourseprogress',
+            name='slide_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='interactivecourseprogress',
+            name='slide_completed_at',
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2 on 2026-10-18 00:00
+
+from django.db import migrations
+import videos.models
+
+BATCH_SIZE = 500
+
+
+# Copies of the bitset helpers in videos.models, frozen as of this migration
+def slide_bitset_add(bitset, slide_number):
+    index = slide_number - 1
+    data = bytearray(bitset)
+    if len(data) <= index // 8:
+        data.extend(bytes(index // 8 + 1 - len(data)))
+    data[index // 8] |= 1 << (index % 8)
+    return bytes(data)
+
+
+def slide_bitset_count(bitset):
+    return int.from_bytes(bitset, 'little').bit_count()
+
+
+def fill_completed_slides(apps, schema_editor):
+    InteractiveCourseProgress = apps.get_model('videos', 'InteractiveCourseProgress')
+    SlideProgress = apps.get_model('videos', 'SlideProgress')
+
+    def flush(progress_id, bitset):
+        return InteractiveCourseProgress(
+            pk=progress_id,
+            completed_slides=bitset,
+            slides_completed_count=slide_bitset_count(bitset),
+        )
+
+    rows = []
+    current_id, bitset = None, b''
+    completed = SlideProgress.objects.filter(
+        completed_at__isnull=False, slide_number__gt=0
+    ).order_by('progress_id').values_list('progress_id', 'slide_number')
+    for progress_id, slide_number in completed.iterator(chunk_size=BATCH_SIZE):
+        if progress_id != current_id:
+            if current_id is not None:
+                rows.append(flush(current_id, bitset))
+            current_id, bitset = progress_id, b''
+        bitset = slide_bitset_add(bitset, slide_number)
+        if len(rows) >= BATCH_SIZE:
+            InteractiveCourseProgress.objects.bulk_update(rows, ['completed_slides', 'slides_completed_count'])
+            rows = []
+    if current_id is not None:
+        rows.append(flush(current_id, bitset))
+    InteractiveCourseProgress.objects.bulk_update(rows, ['completed_slides', 'slides_completed_count'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_remove_slide_json_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interactivecourseprogress',
+            name='completed_slides',
+            field=videos.models.SlideBitsetField(blank=True, default=bytes, help_text='Bitset of completed slides (bit n-1 = slide n)'),
+        ),
+        migrations.RunPython(fill_completed_slides, migrations.RunPython.noop),
+    ]
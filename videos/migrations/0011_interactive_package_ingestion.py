@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_interactivecourseprogress_completed_slides'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interactivecourse',
+            name='package_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='interactivecourse',
+            name='package_progress',
+            field=models.IntegerField(default=0, help_text='Percentage of the package extracted'),
+        ),
+        migrations.AddField(
+            model_name='interactivecourse',
+            name='package_status',
+            field=models.CharField(choices=[('pending', 'Queued'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='InteractivePackageFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Path relative to the extracted folder', max_length=500)),
+                ('size', models.BigIntegerField(default=0)),
+                ('crc32', models.BigIntegerField(default=0, help_text='CRC-32 from the ZIP directory')),
+                ('interactive_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='package_files', to='videos.interactivecourse')),
+            ],
+            options={
+                'db_table': 'interactive_package_files',
+                'ordering': ['path'],
+            },
+        ),
+    ]
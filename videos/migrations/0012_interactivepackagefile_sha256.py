@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_interactive_package_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interactivepackagefile',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='Blob in the package store', max_length=64),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_interactivepackagefile_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='hls_path',
+            field=models.CharField(blank=True, help_text='Folder holding master.m3u8, relative to MEDIA_ROOT', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_progress',
+            field=models.IntegerField(default=0, help_text='Percentage of the video transcoded'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_status',
+            field=models.CharField(choices=[('none', 'Original only'), ('pending', 'Queued'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='VideoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g. 720p', max_length=20)),
+                ('width', models.IntegerField(default=0)),
+                ('height', models.IntegerField(default=0)),
+                ('video_bitrate', models.IntegerField(default=0, help_text='kbit/s')),
+                ('audio_bitrate', models.IntegerField(default=0, help_text='kbit/s (0 = no audio)')),
+                ('playlist', models.CharField(help_text="Media playlist, relative to the video's hls_path", max_length=255)),
+                ('segment_count', models.IntegerField(default=0)),
+                ('size', models.BigIntegerField(default=0, help_text='Bytes of all segments')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='videos.video')),
+            ],
+            options={
+                'db_table': 'video_renditions',
+                'ordering': ['video', 'height'],
+                'unique_together': {('video', 'name')},
+            },
+        ),
+    ]
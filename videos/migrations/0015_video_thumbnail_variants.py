@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interactivecourse',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized thumbnails (see videos.thumbnails)'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized thumbnails (see videos.thumbnails)'),
+        ),
+    ]
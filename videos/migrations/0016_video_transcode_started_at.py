@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0015_video_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='transcode_started_at',
+            field=models.DateTimeField(blank=True, help_text='When the current transcode was claimed', null=True),
+        ),
+    ]
@@ -1,12 +1,16 @@
 from django.db import models
 from django.conf import settings
 from courses.models import Course
+from risk_lms.images import ThumbnailVariantsMixin
+from risk_lms.media import sendfile_enabled
 import os
 import json
+import uuid
+from django.urls import reverse
 from django.utils import timezone
 
 
-class InteractiveCourse(models.Model):
+class InteractiveCourse(ThumbnailVariantsMixin, models.Model):
     """Interactive SCORM/Captivate course package"""
     CONTENT_TYPES = [
         ('captivate', 'Adobe Captivate'),
@@ -14,6 +18,12 @@ class InteractiveCourse(models.Model):
         ('html5', 'HTML5 Course'),
         ('articulate', 'Articulate Storyline'),
     ]
+    PACKAGE_STATUS_CHOICES = [
+        ('pending', 'Queued'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
     
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='interactive_courses')
     title = models.CharField(max_length=255)
@@ -25,6 +35,11 @@ class InteractiveCourse(models.Model):
     extracted_path = models.CharField(max_length=500, blank=True, help_text='Path to extracted content')
     entry_file = models.CharField(max_length=255, default='index.html', help_text='Main HTML file to launch')
     
+    # Background extraction of the package (see videos.packages)
+    package_status = models.CharField(max_length=20, choices=PACKAGE_STATUS_CHOICES, default='ready')
+    package_progress = models.IntegerField(default=0, help_text='Percentage of the package extracted')
+    package_error = models.TextField(blank=True)
+    
     # Metadata from package
     duration_minutes = models.IntegerField(default=0, help_text='Estimated duration in minutes')
     total_slides = models.IntegerField(default=0)
@@ -33,6 +48,7 @@ class InteractiveCourse(models.Model):
     
     # Thumbnail
     thumbnail = models.ImageField(upload_to='interactive_courses/thumbnails/', blank=True, null=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, help_text='Resized thumbnails (see videos.thumbnails)')
     
     order_index = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -50,9 +66,17 @@ class InteractiveCourse(models.Model):
     def get_launch_url(self):
         """Get the URL to launch this interactive course"""
         if self.extracted_path:
-            return f'/media/{self.extracted_path}/{self.entry_file}'
+            # Without a sendfile backend the web server serves the package
+            # from /media/, so its assets don't each go through Django
+            if not sendfile_enabled():
+                return f'{settings.MEDIA_URL}{self.extracted_path}/{self.entry_file}'
+            return reverse('content:interactive_file', args=[self.id, self.entry_file])
         return None
     
+    @property
+    def is_ready(self):
+        return self.package_status == 'ready'
+    
     def get_duration_display(self):
         """Return formatted duration"""
         if self.duration_minutes:
@@ -64,6 +88,48 @@ class InteractiveCourse(models.Model):
         return "Unknown"
 
 
+class SlideBitsetField(models.BinaryField):
+    """Set of slide numbers stored as a little-endian bitset (bit n-1 = slide n)"""
+
+    def from_db_value(self, value, expression, connection):
+        # Some backends hand back memoryview
+        return bytes(value) if value is not None else value
+
+
+def slide_bitset_contains(bitset, slide_number):
+    index = slide_number - 1
+    return 0 <= index < len(bitset) * 8 and bool(bitset[index // 8] & (1 << (index % 8)))
+
+
+def slide_bitset_add(bitset, slide_number):
+    index = slide_number - 1
+    data = bytearray(bitset)
+    if len(data) <= index // 8:
+        data.extend(bytes(index // 8 + 1 - len(data)))
+    data[index // 8] |= 1 << (index % 8)
+    return bytes(data)
+
+
+def slide_bitset_count(bitset):
+    return int.from_bytes(bitset, 'little').bit_count()
+
+
+class InteractivePackageFile(models.Model):
+    """Manifest entry: a path in an interactive course package and the blob holding its content"""
+    interactive_course = models.ForeignKey(InteractiveCourse, on_delete=models.CASCADE, related_name='package_files')
+    path = models.CharField(max_length=500, help_text='Path relative to the extracted folder')
+    size = models.BigIntegerField(default=0)
+    crc32 = models.BigIntegerField(default=0, help_text='CRC-32 from the ZIP directory')
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, help_text='Blob in the package store')
+    
+    class Meta:
+        db_table = 'interactive_package_files'
+        ordering = ['path']
+    
+    def __str__(self):
+        return f"{self.interactive_course_id}: {self.path}"
+
+
 class InteractiveCourseProgress(models.Model):
     """Track user's progress in interactive courses"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interactive_progress')
@@ -75,12 +141,10 @@ class InteractiveCourseProgress(models.Model):
     highest_slide_reached = models.IntegerField(default=0, help_text='Highest slide number user has reached (no skipping)')
     total_time_spent = models.IntegerField(default=0, help_text='Total time in minutes')
     
-    # Slide completion tracking (JSON: {"1": true, "2": true, "3": false, ...})
-    slides_completed = models.JSONField(default=dict, blank=True, help_text='Track which slides are completed')
-
-    # Per-slide timestamps for anti-skip enforcement
-    slide_started_at = models.JSONField(default=dict, blank=True, help_text='ISO timestamps keyed by slide number for when user started a slide')
-    slide_completed_at = models.JSONField(default=dict, blank=True, help_text='ISO timestamps keyed by slide number for when user completed a slide')
+    # Per-slide start/completion times live in SlideProgress; the bitset and
+    # counter mirror which slides are completed there
+    completed_slides = SlideBitsetField(default=bytes, blank=True, help_text='Bitset of completed slides (bit n-1 = slide n)')
+    slides_completed_count = models.IntegerField(default=0, help_text='Number of completed slides')
     skip_attempts = models.IntegerField(default=0, help_text='Count invalid slide jump attempts')
 
     # Quiz/assessment scores from the interactive course
@@ -110,7 +174,11 @@ class InteractiveCourseProgress(models.Model):
     
     def get_slides_completed_count(self):
         """Count how many slides are marked as completed"""
-        return sum(1 for v in self.slides_completed.values() if v)
+        return self.slides_completed_count
+    
+    def is_slide_completed(self, slide_number):
+        """Whether a slide is completed (no query)"""
+        return slide_bitset_contains(self.completed_slides or b'', int(slide_number))
     
     def calculate_completion_percentage(self):
         """Calculate completion percentage based on slides completed"""
@@ -143,22 +211,40 @@ class InteractiveCourseProgress(models.Model):
         duration_minutes = int(self.interactive_course.duration_minutes or 0)
         return max(20, (duration_minutes * 60) // total_slides) if duration_minutes > 0 else 20
 
+    def get_slide_progress(self, slide_number):
+        """SlideProgress row of a slide, or None if it was never started"""
+        cache = self.__dict__.setdefault('_slide_progress_cache', {})
+        slide_number = int(slide_number)
+        if slide_number not in cache:
+            cache[slide_number] = self.slide_records.filter(slide_number=slide_number).first()
+        return cache[slide_number]
+
     def start_slide(self, slide_number):
-        """Persist a slide start timestamp (idempotent)."""
+        """Record when a slide was first started (idempotent); returns its SlideProgress"""
         slide_number = int(slide_number)
-        key = str(slide_number)
-        if not self.slide_started_at.get(key):
-            self.slide_started_at[key] = timezone.now().isoformat()
+        record = self.get_slide_progress(slide_number)
+        now = timezone.now()
+        if record is None:
+            record, _ = SlideProgress.objects.get_or_create(
+                progress=self, slide_number=slide_number, defaults={'started_at': now}
+            )
+        if record.started_at is None:
+            # Rows migrated from completions that predate start tracking
+            SlideProgress.objects.filter(pk=record.pk, started_at__isnull=True).update(started_at=now)
+            record.started_at = now
+        self._slide_progress_cache[slide_number] = record
+        return record
 
     def mark_slide_completed(self, slide_number):
         """Mark a slide as completed and update progress"""
         slide_number = int(slide_number)
-        key = str(slide_number)
-
-        self.slides_completed[key] = True
-        self.start_slide(slide_number)
-        if not self.slide_completed_at.get(key):
-            self.slide_completed_at[key] = timezone.now().isoformat()
+        if not self.is_slide_completed(slide_number):
+            record = self.start_slide(slide_number)
+            if record.completed_at is None:
+                record.completed_at = timezone.now()
+                SlideProgress.objects.filter(pk=record.pk, completed_at__isnull=True).update(completed_at=record.completed_at)
+            self.completed_slides = slide_bitset_add(self.completed_slides or b'', slide_number)
+            self.slides_completed_count = slide_bitset_count(self.completed_slides)
 
         if slide_number > self.highest_slide_reached:
             self.highest_slide_reached = slide_number
@@ -173,8 +259,34 @@ class InteractiveCourseProgress(models.Model):
                 self.content_completed_at = timezone.now()
 
 
-class Video(models.Model):
+class SlideProgress(models.Model):
+    """Start and completion time of one slide of an interactive course for a user"""
+    progress = models.ForeignKey(InteractiveCourseProgress, on_delete=models.CASCADE, related_name='slide_records')
+    slide_number = models.IntegerField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'interactive_slide_progress'
+        unique_together = ['progress', 'slide_number']
+        indexes = [
+            models.Index(fields=['progress', 'completed_at'], name='slide_progress_completed_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.progress_id} - slide {self.slide_number}"
+
+
+class Video(ThumbnailVariantsMixin, models.Model):
     """Video model for course content"""
+    TRANSCODE_STATUS_CHOICES = [
+        ('none', 'Original only'),
+        ('pending', 'Queued'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='videos')
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -182,16 +294,52 @@ class Video(models.Model):
     duration = models.IntegerField(help_text='Duration in seconds', default=0)
     file_size = models.BigIntegerField(default=0)
     thumbnail = models.ImageField(upload_to='video_thumbnails/', blank=True, null=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, help_text='Resized thumbnails (see videos.thumbnails)')
     order_index = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # HLS renditions made in the background (see videos.transcoding)
+    transcode_status = models.CharField(max_length=20, choices=TRANSCODE_STATUS_CHOICES, default='none')
+    transcode_progress = models.IntegerField(default=0, help_text='Percentage of the video transcoded')
+    transcode_error = models.TextField(blank=True)
+    transcode_started_at = models.DateTimeField(null=True, blank=True, help_text='When the current transcode was claimed')
+    hls_path = models.CharField(max_length=500, blank=True, help_text='Folder holding master.m3u8, relative to MEDIA_ROOT')
+    
     class Meta:
         db_table = 'videos'
         ordering = ['order_index', 'created_at']
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
+    
+    def get_hls_url(self):
+        """URL of the master playlist, or None while only the original can be played"""
+        if self.transcode_status == 'ready' and self.hls_path:
+            return reverse('videos:video_hls', args=[self.id, os.path.basename(self.hls_path), 'master.m3u8'])
+        return None
+
+
+class VideoRendition(models.Model):
+    """One bitrate variant of a video's HLS stream"""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='renditions')
+    name = models.CharField(max_length=20, help_text='e.g. 720p')
+    width = models.IntegerField(default=0)
+    height = models.IntegerField(default=0)
+    video_bitrate = models.IntegerField(default=0, help_text='kbit/s')
+    audio_bitrate = models.IntegerField(default=0, help_text='kbit/s (0 = no audio)')
+    playlist = models.CharField(max_length=255, help_text='Media playlist, relative to the video\'s hls_path')
+    segment_count = models.IntegerField(default=0)
+    size = models.BigIntegerField(default=0, help_text='Bytes of all segments')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'video_renditions'
+        ordering = ['video', 'height']
+        unique_together = ['video', 'name']
+    
+    def __str__(self):
+        return f"{self.video_id}: {self.name}"
 
 class VideoSubtitle(models.Model):
     """Subtitles/translations for videos"""
@@ -237,3 +385,32 @@ class VideoProgress(models.Model):
         elif self.watched_duration > 0:
             return min((self.watched_duration / 60) * 100, 99)  # Cap at 99% until manually marked complete
         return 0
+
+
+class ChunkedUpload(models.Model):
+    """A large file being uploaded in fixed-size chunks (see videos.uploads)"""
+    PURPOSE_CHOICES = [
+        ('video', 'Video'),
+        ('package', 'Interactive package'),
+    ]
+    
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text='Total size in bytes')
+    chunk_size = models.IntegerField()
+    received = models.BigIntegerField(default=0, help_text='Bytes received and verified')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chunked_uploads'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+    
+    @property
+    def is_complete(self):
+        return self.received == self.size
@@ -0,0 +1,558 @@
+"""
+Background ingestion of SCORM/Captivate packages.
+
+An upload request only stores the ZIP as ``package_file`` (a large upload's
+temporary file is moved into MEDIA_ROOT, not copied) and creates the
+InteractiveCourse with package_status 'pending'. ``ingest_package`` then
+extracts it straight from the stored file into its final folder: a single
+top-level folder in the ZIP is stripped while extracting, so nothing is
+moved afterwards. Metadata is read beforehand from the package's config
+files, opened by name from the ZIP directory.
+
+Extracted files are stored once by SHA-256 under BLOB_FOLDER and hard-linked
+into the package folder, so /media/ keeps serving them by path while a
+revised upload only adds the files that changed. InteractivePackageFile
+maps each path of a package to its blob; a member whose path, size and CRC
+match a manifest entry reuses that blob without being hashed again. Blobs
+written or reused within INTERACTIVE_BLOB_GRACE are never deleted, so a
+running ingestion keeps them until its manifest is saved. Progress is
+reported on the InteractiveCourse for the upload page to poll.
+"""
+import codecs
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from posixpath import normpath
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from risk_lms.background import background_task, enqueue
+from .models import InteractiveCourse, InteractivePackageFile
+from .thumbnails import queue_thumbnail
+
+logger = logging.getLogger(__name__)
+
+ENTRY_FILES = ['index.html', 'index.htm', 'default.html', 'story.html']
+
+# Bytes per read when copying a member out of the ZIP
+COPY_CHUNK_SIZE = 1024 * 1024
+
+MANIFEST_BATCH_SIZE = 500
+
+# Content-addressed store of extracted files, under MEDIA_ROOT
+BLOB_FOLDER = 'interactive_courses/blobs'
+
+
+class PackageError(Exception):
+    """The uploaded file is not a usable package"""
+
+
+def blob_root():
+    return os.path.join(settings.MEDIA_ROOT, *BLOB_FOLDER.split('/'))
+
+
+def blob_path(sha256):
+    return os.path.join(blob_root(), sha256[:2], sha256)
+
+
+def store_blob(source):
+    """Store the content of a binary stream once; returns its SHA-256"""
+    os.makedirs(blob_root(), exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=blob_root(), prefix='.incoming-')
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                destination.write(chunk)
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if _touch_blob(sha256):
+            os.unlink(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic; a concurrent ingestion of the same content writes the same bytes
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return sha256
+
+
+def _touch_blob(sha256):
+    """Mark a stored blob as just used (see release_blobs); False if it isn't stored"""
+    try:
+        os.utime(blob_path(sha256))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _link_blob(blob, target):
+    try:
+        os.link(blob, target)
+    except OSError:
+        # File systems without hard links get a copy
+        shutil.copyfile(blob, target)
+
+
+def release_blobs(hashes):
+    """
+    Delete the blobs of ``hashes`` that no package manifest refers to any
+    more; returns how many were deleted. Blobs written or reused within
+    INTERACTIVE_BLOB_GRACE seconds are kept, for prune_blobs to pick up later.
+    """
+    hashes = sorted(set(hashes))
+    cutoff = time.time() - getattr(settings, 'INTERACTIVE_BLOB_GRACE', 6 * 60 * 60)
+    deleted = 0
+    for start in range(0, len(hashes), 1000):
+        chunk = hashes[start:start + 1000]
+        referenced = set(
+            InteractivePackageFile.objects.filter(sha256__in=chunk).values_list('sha256', flat=True)
+        )
+        for sha256 in chunk:
+            if sha256 not in referenced:
+                path = blob_path(sha256)
+                try:
+                    # An ingestion may be using it before its manifest is saved
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    os.unlink(path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+    return deleted
+
+
+def prune_blobs():
+    """Delete every blob no manifest refers to (e.g. left by failed ingestions)"""
+    hashes = []
+    for directory, _, files in os.walk(blob_root()):
+        hashes.extend(name for name in files if not name.startswith('.'))
+    return release_blobs(hashes)
+
+
+def _known_blobs(members):
+    """{(path, size, crc32): sha256} of manifest entries matching ``members``"""
+    known = {}
+    paths = sorted({path for _, path in members})
+    for start in range(0, len(paths), MANIFEST_BATCH_SIZE):
+        entries = InteractivePackageFile.objects.filter(
+            path__in=paths[start:start + MANIFEST_BATCH_SIZE]
+        ).exclude(sha256='').values_list('path', 'size', 'crc32', 'sha256')
+        for path, size, crc32, sha256 in entries:
+            known[path, size, crc32] = sha256
+    return known
+
+
+def _member_path(name, root):
+    """Path of a ZIP member inside the extracted folder, or None to skip it"""
+    name = name.replace('\\', '/')
+    if root:
+        name = name[len(root):]
+    path = normpath(name) if name else ''
+    if not path or path == '.' or path.endswith('/'):
+        return None
+    if path.startswith('/') or path == '..' or path.startswith('../') or ':' in path.split('/')[0]:
+        raise PackageError(f'Unsafe path in package: {name}')
+    return path
+
+
+def _package_root(infos):
+    """The single top-level folder every member sits in ('' if there is none)"""
+    tops = {info.filename.replace('\\', '/').split('/', 1)[0] for info in infos}
+    if len(tops) != 1:
+        return ''
+    top = tops.pop()
+    # A lone file at the top level is content, not a wrapper folder
+    if any(info.filename.replace('\\', '/') == top for info in infos if not info.is_dir()):
+        return ''
+    return f'{top}/'
+
+
+def extract_package(archive, extract_path, on_progress=None):
+    """
+    Extract an open ZipFile into ``extract_path``.
+
+    Each member is streamed into the blob store and linked to its path in
+    the folder; members already stored (same path, size and CRC as a
+    manifest entry) are linked without being read. Returns the manifest as a list of (path, size, crc32,
+    sha256); ``on_progress(percent)`` is called whenever the extracted share
+    of bytes goes up a percent.
+    """
+    manifest = []
+    infos = [info for info in archive.infolist() if not info.is_dir()]
+    root = _package_root(infos)
+    # Check every path before writing anything
+    members = [(info, _member_path(info.filename, root)) for info in infos]
+    members = [(info, path) for info, path in members if path is not None]
+    total = sum(info.file_size for info, _ in members) or 1
+    known = _known_blobs(members)
+    done = 0
+    reported = -1
+    created = set()
+
+    for info, path in members:
+        target = os.path.join(extract_path, *path.split('/'))
+        directory = os.path.dirname(target)
+        if directory not in created:
+            os.makedirs(directory, exist_ok=True)
+            created.add(directory)
+
+        sha256 = known.get((path, info.file_size, info.CRC))
+        if sha256 is None or not _touch_blob(sha256):
+            with archive.open(info) as source:
+                sha256 = store_blob(source)
+        _link_blob(blob_path(sha256), target)
+        manifest.append((path, info.file_size, info.CRC, sha256))
+
+        done += info.file_size
+        percent = done * 100 // total
+        if on_progress and percent > reported:
+            on_progress(percent)
+            reported = percent
+
+    return manifest
+
+
+def find_entry_file(paths):
+    """First of ENTRY_FILES at the top of the package (index.html if none)"""
+    paths = set(paths)
+    for candidate in ENTRY_FILES:
+        if candidate in paths:
+            return candidate
+    return 'index.html'
+
+
+# Bytes of CPM.js held in memory at a time, and the tail kept between reads
+# so a setting split across two reads is still matched
+CPM_CHUNK_SIZE = 256 * 1024
+CPM_OVERLAP = 512
+
+# Only the <head> of the launch page is needed for its title
+HTML_HEAD_BYTES = 64 * 1024
+
+CPM_SETTINGS = re.compile(
+    r'(?P<key>projectTitle|projectDuration|totalSlides|stageWidth|stageHeight)'
+    r'\s*[=:]\s*(?:["\'](?P<text>[^"\']+)["\']|(?P<number>\d+))'
+)
+
+ISO_DURATION = re.compile(r'^P(?:T)?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?$', re.IGNORECASE)
+
+
+def _empty_metadata():
+    return {
+        'title': '',
+        'duration_minutes': 0,
+        'total_slides': 0,
+        'resolution_width': 1280,
+        'resolution_height': 720,
+        'entry_file': '',
+        'content_type': 'captivate',
+    }
+
+
+def _find_member(names, filename):
+    """Shallowest member called ``filename`` (any case), or None"""
+    filename = filename.lower()
+    matches = [name for name in names if name.rsplit('/', 1)[-1].lower() == filename]
+    return min(matches, key=lambda name: (name.count('/'), len(name))) if matches else None
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def _scan_cpm(stream):
+    """First value of each CPM_SETTINGS key, reading the file in bounded chunks"""
+    found = {}
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    tail = ''
+    while len(found) < 5:
+        chunk = stream.read(CPM_CHUNK_SIZE)
+        text = tail + decoder.decode(chunk, final=not chunk)
+        for match in CPM_SETTINGS.finditer(text):
+            # A value running to the end of the read may be cut short; it is
+            # matched again from the overlap
+            if chunk and match.end() == len(text):
+                continue
+            found.setdefault(match.group('key'), match.group('text') or match.group('number'))
+        if not chunk:
+            break
+        tail = text[-CPM_OVERLAP:]
+    return found
+
+
+def _apply_cpm(metadata, found):
+    if found.get('projectTitle') and not metadata['title']:
+        metadata['title'] = found['projectTitle']
+    if (found.get('projectDuration') or '').isdigit():
+        # Duration is usually in milliseconds or seconds
+        duration = int(found['projectDuration'])
+        metadata['duration_minutes'] = duration // 60000 if duration > 10000 else duration // 60
+    for key, field in (('totalSlides', 'total_slides'), ('stageWidth', 'resolution_width'),
+                       ('stageHeight', 'resolution_height')):
+        if (found.get(key) or '').isdigit():
+            metadata[field] = int(found[key])
+
+
+def _apply_project_txt(metadata, content):
+    # Captivate 11+ writes JSON; older versions a name = value list
+    try:
+        project_data = json.loads(content)
+    except json.JSONDecodeError:
+        if not metadata['title']:
+            title_match = re.search(r'name\s*[=:]\s*(.+)', content)
+            if title_match:
+                metadata['title'] = title_match.group(1).strip()
+        if not metadata['duration_minutes']:
+            duration_match = re.search(r'duration\s*[=:]\s*(\d+)', content)
+            if duration_match:
+                metadata['duration_minutes'] = int(duration_match.group(1))
+        return
+
+    if not isinstance(project_data, dict):
+        return
+    meta = project_data.get('metadata') or {}
+    if meta.get('title') and not metadata['title']:
+        metadata['title'] = meta['title']
+    if meta.get('totalSlides'):
+        metadata['total_slides'] = int(meta['totalSlides'])
+    if meta.get('durationInFrames') and meta.get('frameRate'):
+        metadata['duration_minutes'] = int(meta['durationInFrames'] / meta['frameRate'] / 60)
+    if meta.get('width'):
+        metadata['resolution_width'] = int(meta['width'])
+    if meta.get('height'):
+        metadata['resolution_height'] = int(meta['height'])
+    if meta.get('launchFile'):
+        metadata['entry_file'] = meta['launchFile']
+
+    for item in project_data.get('contentStructure') or []:
+        if item.get('class') == 'project' and item.get('title'):
+            if not metadata['title']:
+                metadata['title'] = item['title']
+            break
+
+
+def _apply_imsmanifest(metadata, root_element, base):
+    """Title and launch file of a SCORM manifest (any SCORM/IMS namespace)"""
+    elements = list(root_element.iter())
+    organizations = [e for e in elements if _local_name(e.tag) == 'organization']
+    resources = {
+        e.get('identifier'): e for e in elements
+        if _local_name(e.tag) == 'resource' and e.get('href')
+    }
+
+    if organizations and not metadata['title']:
+        title = next((child for child in organizations[0] if _local_name(child.tag) == 'title'), None)
+        if title is not None and (title.text or '').strip():
+            metadata['title'] = title.text.strip()
+
+    # The first item's resource is the one to launch; fall back to the first SCO
+    launch = None
+    for element in (organizations[0].iter() if organizations else []):
+        if _local_name(element.tag) == 'item' and element.get('identifierref') in resources:
+            launch = resources[element.get('identifierref')]
+            break
+    if launch is None:
+        launch = next(
+            (r for r in resources.values()
+             if any(_local_name(k) == 'scormtype' and v.lower() == 'sco' for k, v in r.attrib.items())),
+            next(iter(resources.values()), None),
+        )
+    if launch is not None and not metadata['entry_file']:
+        metadata['entry_file'] = normpath(base + launch.get('href').split('?', 1)[0])
+    metadata['content_type'] = 'scorm'
+
+
+def _parse_duration_minutes(value):
+    value = (value or '').strip()
+    iso = ISO_DURATION.match(value)
+    if iso and any(iso.groups()):
+        hours, minutes, seconds = iso.groups()
+        return int(hours or 0) * 60 + int(minutes or 0) + int(float(seconds or 0)) // 60
+    if value.isdigit():
+        duration = int(value)
+        return duration // 60000 if duration > 10000 else duration // 60
+    return 0
+
+
+def _apply_meta_xml(metadata, root_element):
+    """Articulate meta.xml: project title, duration, slide count and size attributes"""
+    for element in root_element.iter():
+        attributes = {key.lower(): value for key, value in element.attrib.items()}
+        if _local_name(element.tag) == 'title' and (element.text or '').strip() and not metadata['title']:
+            metadata['title'] = element.text.strip()
+        if attributes.get('title') and not metadata['title']:
+            metadata['title'] = attributes['title']
+        if attributes.get('duration') and not metadata['duration_minutes']:
+            metadata['duration_minutes'] = _parse_duration_minutes(attributes['duration'])
+        for key in ('slidecount', 'totalslides', 'slides'):
+            if (attributes.get(key) or '').isdigit() and not metadata['total_slides']:
+                metadata['total_slides'] = int(attributes[key])
+        if (attributes.get('width') or '').isdigit():
+            metadata['resolution_width'] = int(attributes['width'])
+        if (attributes.get('height') or '').isdigit():
+            metadata['resolution_height'] = int(attributes['height'])
+    metadata['content_type'] = 'articulate'
+
+
+def read_package_metadata(archive):
+    """
+    Metadata of a package, read from the ZIP without extracting it.
+
+    Only the known manifest/config files are opened, found by name in the
+    ZIP directory: CPM.js (scanned in bounded chunks), project.txt
+    (Captivate), imsmanifest.xml (SCORM), meta.xml (Articulate) and the
+    launch page's title. ``entry_file`` is relative to the package root
+    ('' if the package doesn't name one).
+    """
+    metadata = _empty_metadata()
+    infos = [info for info in archive.infolist() if not info.is_dir()]
+    root = _package_root(infos)
+    names = [info.filename.replace('\\', '/')[len(root):] for info in infos]
+
+    def scan_cpm(name):
+        with archive.open(root + name) as member:
+            return _scan_cpm(member)
+
+    def read_text(name, limit=-1):
+        with archive.open(root + name) as member:
+            return member.read(limit).decode('utf-8', errors='ignore')
+
+    readers = [
+        ('CPM.js', lambda name: _apply_cpm(metadata, scan_cpm(name))),
+        ('project.txt', lambda name: _apply_project_txt(metadata, read_text(name))),
+        ('imsmanifest.xml', lambda name: _apply_imsmanifest(
+            metadata, ElementTree.fromstring(read_text(name)), name[:-len('imsmanifest.xml')]
+        )),
+        ('meta.xml', lambda name: _apply_meta_xml(metadata, ElementTree.fromstring(read_text(name)))),
+    ]
+    for filename, reader in readers:
+        name = _find_member(names, filename)
+        if name is None:
+            continue
+        try:
+            reader(name)
+        except Exception as e:
+            logger.warning('Could not read %s from package: %s', name, e)
+
+    if not metadata['title']:
+        launch_page = metadata['entry_file'] if metadata['entry_file'] in names else find_entry_file(names)
+        if launch_page in names:
+            try:
+                title_match = re.search(r'<title>([^<]+)</title>', read_text(launch_page, HTML_HEAD_BYTES), re.IGNORECASE)
+                if title_match:
+                    metadata['title'] = title_match.group(1).strip()
+            except Exception as e:
+                logger.warning('Could not read %s from package: %s', launch_page, e)
+
+    return metadata
+
+
+def _apply_metadata(interactive_course, metadata, entry_file):
+    # Values entered on the upload form win over the package's, except for
+    # duration and slides where the package is authoritative when it has them
+    if not interactive_course.title:
+        interactive_course.title = metadata['title'] or 'Untitled Interactive Course'
+    if metadata['duration_minutes']:
+        interactive_course.duration_minutes = metadata['duration_minutes']
+    if metadata['total_slides']:
+        interactive_course.total_slides = metadata['total_slides']
+    interactive_course.resolution_width = metadata['resolution_width']
+    interactive_course.resolution_height = metadata['resolution_height']
+    interactive_course.entry_file = entry_file
+
+
+@background_task
+def ingest_package(interactive_course_id, statuses=('pending',)):
+    """Extract and register the package of an InteractiveCourse"""
+    # Only one worker may pick up a package
+    claimed = InteractiveCourse.objects.filter(
+        pk=interactive_course_id, package_status__in=list(statuses)
+    ).update(package_status='processing', package_progress=0, package_error='')
+    if not claimed:
+        return
+
+    interactive_course = InteractiveCourse.objects.get(pk=interactive_course_id)
+    extract_path = os.path.join(settings.MEDIA_ROOT, interactive_course.extracted_path)
+
+    def update_progress(percent):
+        InteractiveCourse.objects.filter(pk=interactive_course_id).update(package_progress=percent)
+
+    try:
+        # Start from an empty folder when re-running a failed ingestion
+        shutil.rmtree(extract_path, ignore_errors=True)
+        os.makedirs(extract_path, exist_ok=True)
+        with interactive_course.package_file.open('rb') as package, zipfile.ZipFile(package) as archive:
+            metadata = read_package_metadata(archive)
+            manifest = extract_package(archive, extract_path, update_progress)
+    except (zipfile.BadZipFile, PackageError) as e:
+        _fail(interactive_course_id, extract_path, f'Invalid package: {e}')
+        return
+    except Exception as e:
+        logger.exception('Ingestion of interactive course %s failed', interactive_course_id)
+        _fail(interactive_course_id, extract_path, str(e))
+        return
+
+    paths = {path for path, _, _, _ in manifest}
+    entry_file = metadata['entry_file'] if metadata['entry_file'] in paths else find_entry_file(paths)
+    _apply_metadata(interactive_course, metadata, entry_file)
+    interactive_course.package_status = 'ready'
+    interactive_course.package_progress = 100
+    if not getattr(settings, 'INTERACTIVE_PACKAGE_KEEP_ZIP', True):
+        interactive_course.package_file.delete(save=False)
+
+    previous = interactive_course.package_files.all()
+    replaced = set(previous.values_list('sha256', flat=True)) - {sha256 for _, _, _, sha256 in manifest}
+    with transaction.atomic():
+        previous.delete()
+        InteractivePackageFile.objects.bulk_create(
+            [
+                InteractivePackageFile(
+                    interactive_course=interactive_course, path=path, size=size, crc32=crc, sha256=sha256
+                )
+                for path, size, crc, sha256 in manifest
+            ],
+            batch_size=MANIFEST_BATCH_SIZE,
+        )
+        interactive_course.save(update_fields=[
+            'title', 'duration_minutes', 'total_slides', 'resolution_width', 'resolution_height',
+            'entry_file', 'package_file', 'package_status', 'package_progress', 'updated_at',
+        ])
+    release_blobs(replaced)
+    # An uploaded thumbnail, or else an image from the package
+    queue_thumbnail(interactive_course)
+
+
+def _fail(interactive_course_id, extract_path, error):
+    shutil.rmtree(extract_path, ignore_errors=True)
+    InteractiveCourse.objects.filter(pk=interactive_course_id).update(
+        package_status='failed', package_error=error, updated_at=timezone.now()
+    )
+
+
+def package_folder(title):
+    """New MEDIA_ROOT-relative folder for a package's extracted files"""
+    timestamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+    safe_title = re.sub(r'[^\w\-]', '_', title or 'course')[:50]
+    return f'interactive_courses/{timestamp}_{safe_title}'
+
+
+def queue_package_ingest(interactive_course):
+    """Ingest a newly uploaded package once its transaction has committed"""
+    interactive_course_id = interactive_course.id
+    transaction.on_commit(lambda: enqueue(ingest_package, interactive_course_id))
@@ -0,0 +1,311 @@
+"""
+Video duration read straight from the container headers.
+
+MP4/MOV: the top-level boxes are walked by their sizes (seeking over
+``mdat``, which may come before ``moov``) to ``moov/mvhd``, which holds the
+timescale and duration. Matroska/WebM: the EBML elements are walked to
+Segment > Info for TimecodeScale and Duration. Browser MediaRecorder WebM
+is written without a Duration, so then the last Cluster in the tail of the
+file gives the timestamp of the last frame.
+
+Only a few KB are read from the file object (an upload's temporary file,
+an in-memory upload or a stored file), so a multi-GB upload is neither
+copied nor decoded. ffprobe is run only for other containers or headers
+that cannot be parsed.
+"""
+import logging
+import os
+import struct
+import subprocess
+import tempfile
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Boxes an MP4/QuickTime file may start with
+MP4_FIRST_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot'}
+
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_CLUSTER = 0x1F43B675
+MKV_CLUSTER_TIMECODE = 0xE7
+MKV_SIMPLE_BLOCK = 0xA3
+MKV_BLOCK_GROUP = 0xA0
+MKV_BLOCK = 0xA1
+# Elements allowed before a Cluster's Timecode
+MKV_CRC32 = 0xBF
+MKV_VOID = 0xEC
+
+# Elements read before giving up on finding Segment > Info
+MKV_MAX_ELEMENTS = 64
+
+# Bytes from the end of a WebM searched for its last Cluster
+MKV_TAIL_BYTES = 1024 * 1024
+
+# Chunk size when an in-memory upload has to be written out for ffprobe
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ProbeError(Exception):
+    """The headers are not those of a supported container"""
+
+
+def probe_duration(file):
+    """
+    Duration in seconds (float) of a video file object, or None if it cannot
+    be found. The file position is restored.
+    """
+    position = file.tell()
+    try:
+        try:
+            duration = read_header_duration(file)
+        except (ProbeError, struct.error) as e:
+            logger.debug('No duration in the headers of %s: %s', getattr(file, 'name', file), e)
+            duration = None
+        if duration is None:
+            duration = ffprobe_duration(file)
+        return duration
+    finally:
+        file.seek(position)
+
+
+def read_header_duration(file):
+    """Duration from MP4 or Matroska headers; ProbeError for other containers"""
+    file.seek(0)
+    head = file.read(8)
+    if len(head) == 8 and head[4:8] in MP4_FIRST_BOXES:
+        return _mp4_duration(file)
+    if len(head) >= 4 and struct.unpack('>I', head[:4])[0] == EBML_HEADER:
+        return _matroska_duration(file)
+    raise ProbeError('Unknown container')
+
+
+def _file_size(file):
+    file.seek(0, os.SEEK_END)
+    return file.tell()
+
+
+def _read(file, size):
+    data = file.read(size)
+    if len(data) < size:
+        raise ProbeError('Truncated header')
+    return data
+
+
+def _boxes(file, start, end):
+    """(type, payload start, box end) of the MP4 boxes between two offsets"""
+    offset = start
+    while offset + 8 <= end:
+        file.seek(offset)
+        box_size, box_type = struct.unpack('>I4s', _read(file, 8))
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack('>Q', _read(file, 8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size:
+            raise ProbeError(f'Invalid size of box {box_type!r}')
+        yield box_type, offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _mp4_duration(file):
+    size = _file_size(file)
+    for box_type, payload, box_end in _boxes(file, 0, size):
+        if box_type != b'moov':
+            continue
+        for child_type, child_payload, _ in _boxes(file, payload, min(box_end, size)):
+            if child_type != b'mvhd':
+                continue
+            file.seek(child_payload)
+            version = _read(file, 4)[0]
+            if version == 1:
+                timescale, duration = struct.unpack('>16xIQ', _read(file, 28))
+                unknown = 0xFFFFFFFFFFFFFFFF
+            else:
+                timescale, duration = struct.unpack('>8xII', _read(file, 16))
+                unknown = 0xFFFFFFFF
+            if not timescale or duration == unknown:
+                return None
+            return duration / timescale
+        raise ProbeError('moov has no mvhd')
+    raise ProbeError('No moov box')
+
+
+def _vint(data, offset, keep_marker):
+    """EBML variable-length integer at ``offset``: (value, length), value None if unknown"""
+    first = data[offset]
+    if not first:
+        raise ProbeError('Invalid EBML length')
+    length = 8 - first.bit_length() + 1
+    if offset + length > len(data):
+        raise ProbeError('Truncated EBML element')
+    value = int.from_bytes(data[offset:offset + length], 'big')
+    if keep_marker:
+        return value, length
+    value &= (1 << (7 * length)) - 1
+    if value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+def _element_header(file):
+    """(id, size or None if unknown, header length) of the element at the file position"""
+    data = file.read(12)
+    if len(data) < 2:
+        raise ProbeError('Truncated EBML element')
+    element_id, id_length = _vint(data, 0, keep_marker=True)
+    size, size_length = _vint(data, id_length, keep_marker=False)
+    return element_id, size, id_length + size_length
+
+
+def _matroska_duration(file):
+    file_size = _file_size(file)
+    file.seek(0)
+    element_id, size, header_length = _element_header(file)
+    offset = header_length + size
+
+    file.seek(offset)
+    element_id, size, header_length = _element_header(file)
+    if element_id != MKV_SEGMENT:
+        raise ProbeError('No Segment element')
+    offset += header_length
+    segment_end = file_size if size is None else min(file_size, offset + size)
+
+    timecode_scale = 1000000
+    for _ in range(MKV_MAX_ELEMENTS):
+        if offset >= segment_end:
+            break
+        file.seek(offset)
+        element_id, size, header_length = _element_header(file)
+        if element_id == MKV_CLUSTER or size is None:
+            break
+        if element_id == MKV_INFO:
+            file.seek(offset + header_length)
+            info = _read(file, size)
+            timecode_scale, duration = _matroska_info(info)
+            if duration:
+                return duration * timecode_scale / 1e9
+            break
+        offset += header_length + size
+
+    return _matroska_tail_duration(file, file_size, timecode_scale)
+
+
+def _matroska_info(info):
+    timecode_scale, duration = 1000000, None
+    offset = 0
+    while offset < len(info):
+        element_id, id_length = _vint(info, offset, keep_marker=True)
+        size, size_length = _vint(info, offset + id_length, keep_marker=False)
+        start = offset + id_length + size_length
+        value = info[start:start + size]
+        if element_id == MKV_TIMECODE_SCALE:
+            timecode_scale = int.from_bytes(value, 'big') or timecode_scale
+        elif element_id == MKV_DURATION and size in (4, 8):
+            duration = struct.unpack('>f' if size == 4 else '>d', value)[0]
+        offset = start + size
+    return timecode_scale, duration
+
+
+def _cluster_end_timecode(data):
+    """Highest block timestamp of the Cluster at the start of ``data``, or None"""
+    element_id, id_length = _vint(data, 0, keep_marker=True)
+    _, size_length = _vint(data, id_length, keep_marker=False)
+    offset = id_length + size_length
+
+    cluster_timecode, last_block = None, 0
+    while offset < len(data):
+        try:
+            element_id, id_length = _vint(data, offset, keep_marker=True)
+            size, size_length = _vint(data, offset + id_length, keep_marker=False)
+        except ProbeError:
+            break
+        start = offset + id_length + size_length
+        if size is None or start + size > len(data):
+            break
+        if element_id == MKV_CLUSTER_TIMECODE:
+            cluster_timecode = int.from_bytes(data[start:start + size], 'big')
+        elif element_id == MKV_SIMPLE_BLOCK:
+            last_block = max(last_block, _block_timecode(data, start))
+        elif element_id == MKV_BLOCK_GROUP:
+            child_id, child_id_length = _vint(data, start, keep_marker=True)
+            if child_id == MKV_BLOCK:
+                _, child_size_length = _vint(data, start + child_id_length, keep_marker=False)
+                last_block = max(last_block, _block_timecode(data, start + child_id_length + child_size_length))
+        elif cluster_timecode is None and element_id not in (MKV_CRC32, MKV_VOID):
+            # The Timecode comes first in a real Cluster
+            return None
+        offset = start + size
+
+    if cluster_timecode is None:
+        return None
+    return cluster_timecode + last_block
+
+
+def _block_timecode(data, offset):
+    _, track_length = _vint(data, offset, keep_marker=False)
+    return struct.unpack('>h', data[offset + track_length:offset + track_length + 2])[0]
+
+
+def _matroska_tail_duration(file, file_size, timecode_scale):
+    start = max(0, file_size - MKV_TAIL_BYTES)
+    file.seek(start)
+    tail = file.read(file_size - start)
+    marker = struct.pack('>I', MKV_CLUSTER)
+    position = tail.rfind(marker)
+    while position != -1:
+        # The marker bytes may also occur inside frame data
+        end_timecode = _cluster_end_timecode(tail[position:])
+        if end_timecode is not None:
+            return end_timecode * timecode_scale / 1e9
+        position = tail.rfind(marker, 0, position)
+    return None
+
+
+def ffprobe_duration(file):
+    """Duration reported by ffprobe, or None"""
+    path = getattr(file, 'temporary_file_path', None)
+    if path:
+        return _run_ffprobe(path())
+    try:
+        return _run_ffprobe(file.path)
+    except (AttributeError, NotImplementedError, ValueError):
+        pass
+
+    # In-memory upload: small enough to write out. Closed before ffprobe
+    # opens it, which Windows requires
+    suffix = os.path.splitext(getattr(file, 'name', '') or '')[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        file.seek(0)
+        while True:
+            chunk = file.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            temp_file.write(chunk)
+    try:
+        return _run_ffprobe(temp_file.name)
+    finally:
+        os.unlink(temp_file.name)
+
+
+def _run_ffprobe(path):
+    command = [
+        getattr(settings, 'FFPROBE_PATH', 'ffprobe'), '-v', 'error',
+        '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', path,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning('ffprobe failed for %s: %s', path, e)
+        return None
+    try:
+        duration = float(result.stdout.strip())
+    except ValueError:
+        return None
+    return duration if duration > 0 else None
@@ -1,4 +1,6 @@
 from django import template
+from django.conf import settings
+from django.utils.html import format_html
 
 register = template.Library()
 
@@ -30,4 +32,29 @@ def file_size_format(bytes):
             bytes /= 1024.0
         return f"{bytes:.1f} TB"
     except (ValueError, TypeError):
-        return "0 B"
\ No newline at end of file
+        return "0 B"
+@register.simple_tag
+def hls_player_script():
+    """Script tag loading hls.js, if VIDEO_HLS_PLAYER_JS is set"""
+    url = getattr(settings, 'VIDEO_HLS_PLAYER_JS', '')
+    if not url:
+        return ''
+    return format_html('<script src="{}"></script>', url)
+
+@register.simple_tag
+def thumbnail_picture(obj, size='small', css_class='', alt=''):
+    """
+    <picture> of an object's WebP/JPEG thumbnail variant, falling back to the
+    original thumbnail; empty if it has neither
+    """
+    variant = (getattr(obj, 'thumbnail_variants', None) or {}).get(size)
+    if variant:
+        return format_html(
+            '<picture><source srcset="{}" type="image/webp">'
+            '<img src="{}" width="{}" height="{}" class="{}" alt="{}" loading="lazy" decoding="async"></picture>',
+            obj.get_thumbnail_url(size, 'webp'), obj.get_thumbnail_url(size, 'jpeg'),
+            variant['width'], variant['height'], css_class, alt,
+        )
+    if getattr(obj, 'thumbnail', None):
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', obj.thumbnail.url, css_class, alt)
+    return ''
@@ -0,0 +1,608 @@
+import importlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import User
+from courses.models import Course
+
+from .heartbeat import flush_heartbeats, get_pending_heartbeat, record_heartbeat
+from .interactive_progress import flush_interactive_progress, get_interactive_progress, save_interactive_progress
+from .models import (
+    ChunkedUpload, InteractiveCourse, InteractiveCourseProgress, InteractivePackageFile, SlideProgress, Video, VideoProgress,
+    slide_bitset_add, slide_bitset_contains, slide_bitset_count,
+)
+from .packages import blob_path, ingest_package, prune_blobs, read_package_metadata, release_blobs, store_blob
+from .probe import probe_duration
+from .thumbnails import (
+    find_package_image, generate_course_thumbnail, generate_interactive_thumbnail, generate_video_thumbnail, queue_thumbnail,
+)
+from .transcoding import TranscodeError, queue_video_transcode, reclaim_stale_transcodes, transcode_video
+from .uploads import complete_upload, partial_path, start_upload, take_upload, write_chunk
+
+
+def make_user(username, role='banker', **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **extra
+    )
+
+
+@override_settings(VIDEO_HEARTBEAT_FLUSH_INTERVAL=3600)
+class HeartbeatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.video = Video.objects.create(course=cls.course, title='Intro', video_file='videos/intro.mp4', duration=100)
+
+    def setUp(self):
+        self.addCleanup(flush_heartbeats)
+
+    def progress(self):
+        return VideoProgress.objects.get(user=self.banker, video=self.video)
+
+    def test_pings_are_buffered_until_flushed(self):
+        record_heartbeat(self.banker.id, self.video.id, 10, 10)
+        with self.assertNumQueries(0):
+            state = record_heartbeat(self.banker.id, self.video.id, 20, 20)
+        self.assertEqual(state['completion_percentage'], 20)
+        self.assertEqual(self.progress().watched_duration, 0)
+        self.assertEqual(get_pending_heartbeat(self.banker.id, self.video.id), (20, 20))
+
+        self.assertEqual(flush_heartbeats(), 1)
+        progress = self.progress()
+        self.assertEqual((progress.watched_duration, progress.last_position), (20, 20))
+        self.assertIsNone(get_pending_heartbeat(self.banker.id, self.video.id))
+
+    def test_watched_duration_never_goes_down(self):
+        VideoProgress.objects.create(user=self.banker, video=self.video, watched_duration=50)
+        record_heartbeat(self.banker.id, self.video.id, 30, 5)
+        flush_heartbeats()
+        progress = self.progress()
+        self.assertEqual((progress.watched_duration, progress.last_position), (50, 5))
+
+    def test_completing_ping_is_saved_at_once(self):
+        record_heartbeat(self.banker.id, self.video.id, 50, 50)
+        state = record_heartbeat(self.banker.id, self.video.id, 96, 96)
+        self.assertTrue(state['is_completed'])
+        self.assertIsNone(get_pending_heartbeat(self.banker.id, self.video.id))
+        progress = self.progress()
+        self.assertTrue(progress.is_completed)
+        self.assertIsNotNone(progress.completed_at)
+        self.assertEqual(progress.watched_duration, 96)
+
+    def test_progress_view_includes_buffered_pings(self):
+        self.client.force_login(self.banker)
+        response = self.client.post(
+            reverse('videos:update_progress', args=[self.video.id]),
+            {'watched_duration': 40, 'last_position': 40},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.progress().watched_duration, 0)
+        response = self.client.get(reverse('videos:get_progress', args=[self.video.id]))
+        self.assertEqual(response.json()['watched_duration'], 40)
+
+
+@override_settings(INTERACTIVE_PROGRESS_FLUSH_INTERVAL=3600)
+class InteractiveProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+
+    def setUp(self):
+        self.addCleanup(flush_interactive_progress)
+        self.row = InteractiveCourseProgress.objects.create(
+            user=self.banker, interactive_course=self.module, total_time_spent=10
+        )
+
+    def stored_time(self):
+        self.row.refresh_from_db()
+        return self.row.total_time_spent
+
+    def add_time_elsewhere(self, minutes):
+        InteractiveCourseProgress.objects.filter(pk=self.row.pk).update(total_time_spent=F('total_time_spent') + minutes)
+
+    def test_buffered_time_is_added_to_stored_total(self):
+        progress = get_interactive_progress(self.banker, self.module)
+        progress.total_time_spent += 3
+        self.assertFalse(save_interactive_progress(progress))
+        self.assertEqual(self.stored_time(), 10)
+        self.add_time_elsewhere(7)
+        flush_interactive_progress()
+        self.assertEqual(self.stored_time(), 20)
+
+    def test_saved_time_is_added_to_stored_total(self):
+        progress = get_interactive_progress(self.banker, self.module)
+        self.add_time_elsewhere(7)
+        progress.total_time_spent += 5
+        progress.skip_attempts += 1
+        self.assertTrue(save_interactive_progress(progress))
+        self.assertEqual(progress.total_time_spent, 15)
+        self.assertEqual(self.stored_time(), 22)
+
+    def test_saving_folds_in_buffered_time(self):
+        progress = get_interactive_progress(self.banker, self.module)
+        progress.total_time_spent += 3
+        save_interactive_progress(progress)
+
+        progress = get_interactive_progress(self.banker, self.module)
+        self.assertEqual(progress.total_time_spent, 13)
+        progress.total_time_spent += 2
+        progress.skip_attempts += 1
+        self.assertTrue(save_interactive_progress(progress))
+        self.assertEqual(self.stored_time(), 15)
+        self.assertEqual(flush_interactive_progress(), 0)
+
+
+class SlideProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.banker = make_user('banker')
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        cls.module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=2
+        )
+
+    def setUp(self):
+        self.progress = InteractiveCourseProgress.objects.create(user=self.banker, interactive_course=self.module)
+
+    def test_start_slide_is_recorded_once(self):
+        record = self.progress.start_slide(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.progress.start_slide(1), record)
+        progress = InteractiveCourseProgress.objects.get(pk=self.progress.pk)
+        self.assertEqual(progress.start_slide(1).started_at, record.started_at)
+        self.assertEqual(SlideProgress.objects.filter(progress=self.progress).count(), 1)
+
+    def test_completing_slides(self):
+        self.progress.start_slide(1)
+        self.progress.mark_slide_completed(1)
+        record = SlideProgress.objects.get(progress=self.progress, slide_number=1)
+        self.assertIsNotNone(record.completed_at)
+        self.assertEqual((self.progress.slides_completed_count, self.progress.completion_percentage), (1, 50))
+        self.assertFalse(self.progress.content_completed)
+
+        # Slides completed without a recorded start get one
+        self.progress.mark_slide_completed(2)
+        self.assertIsNotNone(SlideProgress.objects.get(progress=self.progress, slide_number=2).started_at)
+        self.assertTrue(self.progress.content_completed)
+        self.assertEqual(self.progress.highest_slide_reached, 2)
+
+    def test_completed_slide_is_not_looked_up_again(self):
+        self.progress.mark_slide_completed(1)
+        self.progress.save()
+        progress = InteractiveCourseProgress.objects.select_related('interactive_course').get(pk=self.progress.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(progress.is_slide_completed(1))
+            progress.mark_slide_completed(1)
+        self.assertEqual(progress.slides_completed_count, 1)
+
+
+class SlideBitsetTests(TestCase):
+    def test_bitset_helpers(self):
+        bitset = b''
+        for slide_number in (1, 9, 200):
+            bitset = slide_bitset_add(bitset, slide_number)
+        self.assertEqual(len(bitset), 25)
+        self.assertEqual(bitset[:2], bytes([0b1, 0b1]))
+        self.assertEqual(slide_bitset_count(bitset), 3)
+        self.assertEqual(slide_bitset_add(bitset, 9), bitset)
+        self.assertEqual(
+            [n for n in (0, 1, 2, 9, 200, 201) if slide_bitset_contains(bitset, n)],
+            [1, 9, 200],
+        )
+
+    def test_migration_fills_bitsets_from_slide_records(self):
+        migration = importlib.import_module('videos.migrations.0010_interactivecourseprogress_completed_slides')
+        banker = make_user('banker')
+        course = Course.objects.create(title='AML', description='', is_published=True)
+        module = InteractiveCourse.objects.create(
+            course=course, title='Module 1', package_file='interactive_courses/packages/m1.zip', total_slides=10
+        )
+        progress = InteractiveCourseProgress.objects.create(user=banker, interactive_course=module)
+        now = timezone.now()
+        SlideProgress.objects.bulk_create([
+            SlideProgress(progress=progress, slide_number=1, started_at=now, completed_at=now),
+            SlideProgress(progress=progress, slide_number=3, started_at=now, completed_at=now),
+            SlideProgress(progress=progress, slide_number=4, started_at=now),
+        ])
+
+        migration.fill_completed_slides(apps, None)
+        progress.refresh_from_db()
+        self.assertEqual(progress.completed_slides, bytes([0b101]))
+        self.assertEqual(progress.slides_completed_count, 2)
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class PackageTestCase(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+
+    def make_module(self, files, name='m1', **extra):
+        package_name = f'interactive_courses/packages/{name}.zip'
+        os.makedirs(os.path.join(self.media_root, 'interactive_courses', 'packages'), exist_ok=True)
+        with open(os.path.join(self.media_root, package_name), 'wb') as package:
+            package.write(make_zip(files))
+        return InteractiveCourse.objects.create(
+            course=self.course, title='', package_file=package_name, package_status='pending',
+            extracted_path=f'interactive_courses/{name}', **extra
+        )
+
+    def ingest(self, module):
+        ingest_package(module.id)
+        module.refresh_from_db()
+        return module
+
+
+class PackageIngestionTests(PackageTestCase):
+    def test_extracts_package_without_wrapper_folder(self):
+        module = self.ingest(self.make_module({
+            'Module/index.html': '<html><head><title>Know your customer</title></head></html>',
+            'Module/assets/app.js': 'run()',
+        }))
+        self.assertEqual(module.package_status, 'ready')
+        self.assertEqual((module.package_progress, module.entry_file), (100, 'index.html'))
+        self.assertEqual(module.title, 'Know your customer')
+        with open(os.path.join(self.media_root, 'interactive_courses', 'm1', 'assets', 'app.js')) as extracted:
+            self.assertEqual(extracted.read(), 'run()')
+        self.assertEqual(
+            list(InteractivePackageFile.objects.filter(interactive_course=module).values_list('path', 'size')),
+            [('assets/app.js', 5), ('index.html', 59)],
+        )
+
+    def test_unsafe_path_fails_the_package(self):
+        module = self.ingest(self.make_module({'index.html': '', '../outside.html': ''}))
+        self.assertEqual(module.package_status, 'failed')
+        self.assertIn('Unsafe path', module.package_error)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'interactive_courses', 'm1')))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'interactive_courses', 'outside.html')))
+
+    def test_only_pending_packages_are_claimed(self):
+        module = self.make_module({'index.html': ''})
+        InteractiveCourse.objects.filter(pk=module.pk).update(package_status='processing')
+        module = self.ingest(module)
+        self.assertEqual(module.package_status, 'processing')
+        self.assertFalse(module.package_files.exists())
+
+
+class PackageMetadataTests(TestCase):
+    def read(self, files):
+        with zipfile.ZipFile(io.BytesIO(make_zip(files))) as archive:
+            return read_package_metadata(archive)
+
+    def test_captivate_settings_split_across_reads(self):
+        # The first read ends in the middle of the slide count
+        cpm = 'x' * 18 + 'totalSlides: 24; projectTitle = "AML Basics"; projectDuration=600000; stageWidth=1024'
+        with mock.patch('videos.packages.CPM_CHUNK_SIZE', 32), mock.patch('videos.packages.CPM_OVERLAP', 24):
+            metadata = self.read({'Course/assets/js/CPM.js': cpm, 'Course/index.html': ''})
+        self.assertEqual(metadata['title'], 'AML Basics')
+        self.assertEqual(
+            (metadata['total_slides'], metadata['duration_minutes'], metadata['resolution_width']),
+            (24, 10, 1024),
+        )
+
+    def test_scorm_manifest(self):
+        metadata = self.read({'imsmanifest.xml': """<?xml version="1.0"?>
+            <manifest xmlns="http://www.imsglobal.org/xsd/imscp_v1p1"
+                      xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_v1p3">
+              <organizations><organization><title>Fraud Awareness</title>
+                <item identifierref="res1"><title>Start</title></item>
+              </organization></organizations>
+              <resources><resource identifier="res1" adlcp:scormType="sco" href="content/launch.html?x=1"/></resources>
+            </manifest>"""})
+        self.assertEqual(metadata['title'], 'Fraud Awareness')
+        self.assertEqual((metadata['entry_file'], metadata['content_type']), ('content/launch.html', 'scorm'))
+
+    def test_articulate_meta(self):
+        metadata = self.read({
+            'meta.xml': '<meta><project title="Sanctions" duration="PT1H5M" slidecount="40" width="960" height="540"/></meta>',
+            'story.html': '',
+        })
+        self.assertEqual(metadata['title'], 'Sanctions')
+        self.assertEqual((metadata['duration_minutes'], metadata['total_slides']), (65, 40))
+        self.assertEqual((metadata['resolution_width'], metadata['resolution_height']), (960, 540))
+        self.assertEqual(metadata['content_type'], 'articulate')
+
+    def test_title_from_launch_page(self):
+        metadata = self.read({'index.html': '<html><head><title> Credit Risk </title></head></html>'})
+        self.assertEqual(metadata['title'], 'Credit Risk')
+
+
+class PackageBlobTests(PackageTestCase):
+    def manifest(self, module):
+        return dict(module.package_files.values_list('path', 'sha256'))
+
+    def test_unchanged_members_reuse_stored_blobs(self):
+        first = self.ingest(self.make_module({'index.html': 'v1', 'lib.js': 'library'}))
+        with mock.patch('videos.packages.store_blob', wraps=store_blob) as store:
+            second = self.ingest(self.make_module({'index.html': 'v2', 'lib.js': 'library'}, name='m2'))
+        self.assertEqual(store.call_count, 1)
+        self.assertEqual(self.manifest(second)['lib.js'], self.manifest(first)['lib.js'])
+        self.assertNotEqual(self.manifest(second)['index.html'], self.manifest(first)['index.html'])
+        with open(os.path.join(self.media_root, 'interactive_courses', 'm2', 'lib.js')) as extracted:
+            self.assertEqual(extracted.read(), 'library')
+
+    def test_recent_blobs_are_kept(self):
+        module = self.ingest(self.make_module({'index.html': 'v1'}))
+        sha256 = self.manifest(module)['index.html']
+        module.delete()
+        self.assertEqual(release_blobs([sha256]), 0)
+        self.assertEqual(prune_blobs(), 0)
+        self.assertTrue(os.path.exists(blob_path(sha256)))
+
+        with override_settings(INTERACTIVE_BLOB_GRACE=0):
+            self.assertEqual(prune_blobs(), 1)
+        self.assertFalse(os.path.exists(blob_path(sha256)))
+
+    @override_settings(INTERACTIVE_BLOB_GRACE=0)
+    def test_referenced_blobs_are_kept(self):
+        module = self.ingest(self.make_module({'index.html': 'v1'}))
+        self.assertEqual(prune_blobs(), 0)
+        self.assertTrue(os.path.exists(blob_path(self.manifest(module)['index.html'])))
+
+
+def make_png(size, color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ThumbnailTests(PackageTestCase):
+    def assertVariantsSaved(self, obj):
+        self.assertEqual(set(obj.thumbnail_variants), {'small', 'medium'})
+        for entry in obj.thumbnail_variants.values():
+            for image_format in ('webp', 'jpeg'):
+                with Image.open(os.path.join(self.media_root, 'thumbnails', entry[image_format])) as variant:
+                    self.assertEqual(variant.size, (entry['width'], entry['height']))
+
+    def test_video_poster_frame_becomes_thumbnail_of_video_and_course(self):
+        video = Video.objects.create(course=self.course, title='Intro', video_file='videos/intro.mp4', duration=60)
+        with mock.patch('videos.thumbnails.grab_poster_frame', return_value=Image.new('RGB', (1280, 720))) as grab:
+            generate_video_thumbnail(video.id)
+        grab.assert_called_once_with(video.video_file.path, 60)
+
+        video.refresh_from_db()
+        self.assertEqual(video.thumbnail.name, f'video_thumbnails/video_{video.id}.jpg')
+        self.assertVariantsSaved(video)
+        self.assertEqual(
+            video.get_thumbnail_url('medium', 'webp'),
+            reverse('videos:thumbnail', args=[video.thumbnail_variants['medium']['webp']]),
+        )
+        # The course has no thumbnail of its own, so it shows the video's
+        self.course.refresh_from_db()
+        self.assertFalse(self.course.thumbnail)
+        self.assertVariantsSaved(self.course)
+
+    def test_new_image_replaces_variants(self):
+        video = Video.objects.create(course=self.course, title='Intro', video_file='videos/intro.mp4')
+        with mock.patch('videos.thumbnails.grab_poster_frame', return_value=Image.new('RGB', (640, 360), 'red')):
+            generate_video_thumbnail(video.id)
+        video.refresh_from_db()
+        first = video.thumbnail_variants['small']['jpeg']
+        video.thumbnail.save('new.png', io.BytesIO(make_png((640, 360), 'blue')))
+        generate_video_thumbnail(video.id)
+
+        video.refresh_from_db()
+        self.assertNotEqual(video.thumbnail_variants['small']['jpeg'], first)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'thumbnails', first)))
+        self.assertVariantsSaved(video)
+
+    def test_package_poster_preferred_to_larger_images(self):
+        module = self.ingest(self.make_module({
+            'index.html': '',
+            'images/slide1.png': make_png((800, 600)),
+            'images/poster.png': make_png((40, 30)),
+        }))
+        self.assertEqual(
+            find_package_image(module),
+            os.path.join(self.media_root, 'interactive_courses', 'm1', 'images', 'poster.png'),
+        )
+
+        generate_interactive_thumbnail(module.id)
+        module.refresh_from_db()
+        self.assertEqual(module.thumbnail.name, f'interactive_courses/thumbnails/interactive_{module.id}.jpg')
+        self.assertVariantsSaved(module)
+
+    def test_largest_shallow_package_image_otherwise(self):
+        module = self.ingest(self.make_module({
+            'index.html': '',
+            'images/small.png': make_png((40, 30)),
+            'images/large.jpg': make_png((800, 600)),
+            'a/b/c/huge.png': make_png((1600, 1200)),
+        }))
+        self.assertEqual(
+            find_package_image(module),
+            os.path.join(self.media_root, 'interactive_courses', 'm1', 'images', 'large.jpg'),
+        )
+
+    def test_queued_after_commit(self):
+        video = Video.objects.create(course=self.course, title='Intro', video_file='videos/intro.mp4')
+        with mock.patch('videos.thumbnails.enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            queue_thumbnail(video)
+            queue_thumbnail(self.course)
+            enqueue.assert_not_called()
+        self.assertEqual(
+            [call.args for call in enqueue.call_args_list],
+            [(generate_video_thumbnail, video.id), (generate_course_thumbnail, self.course.id)],
+        )
+
+
+@override_settings(VIDEO_TRANSCODE_STALE_AFTER=3600)
+class TranscodeQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+
+    def make_video(self, **extra):
+        return Video.objects.create(course=self.course, title='Intro', video_file='videos/intro.mp4', **extra)
+
+    def test_claim_records_start_time(self):
+        video = self.make_video(transcode_status='pending')
+        with mock.patch('videos.transcoding.probe_source', side_effect=TranscodeError('bad file')):
+            transcode_video(video.id)
+        video.refresh_from_db()
+        self.assertEqual((video.transcode_status, video.transcode_error), ('failed', 'bad file'))
+        self.assertIsNotNone(video.transcode_started_at)
+
+    def test_stale_transcodes_are_reclaimed(self):
+        now = timezone.now()
+        stale = self.make_video(transcode_status='processing', transcode_started_at=now - timedelta(hours=2))
+        unknown = self.make_video(transcode_status='processing')
+        running = self.make_video(transcode_status='processing', transcode_started_at=now - timedelta(minutes=5))
+        self.assertEqual(sorted(reclaim_stale_transcodes()), [stale.id, unknown.id])
+        self.assertEqual(
+            dict(Video.objects.values_list('pk', 'transcode_status')),
+            {stale.id: 'pending', unknown.id: 'pending', running.id: 'processing'},
+        )
+
+    def test_upload_queues_stale_transcodes(self):
+        stale = self.make_video(transcode_status='processing', transcode_started_at=timezone.now() - timedelta(hours=2))
+        video = self.make_video()
+        with mock.patch('videos.transcoding.enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            queue_video_transcode(video)
+        self.assertEqual(
+            [call.args for call in enqueue.call_args_list],
+            [(transcode_video, video.id), (transcode_video, stale.id)],
+        )
+
+
+def mp4_box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def ebml_element(element_id, payload):
+    return element_id + bytes([0x80 | len(payload)]) + payload
+
+
+def make_webm(info, clusters=b''):
+    header = ebml_element(b'\x1a\x45\xdf\xa3', b'\x42\x82\x84webm')
+    # Segment of unknown size, as written by MediaRecorder
+    segment = b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff'
+    return header + segment + ebml_element(b'\x15\x49\xa9\x66', info) + clusters
+
+
+class ProbeDurationTests(SimpleTestCase):
+    timecode_scale = ebml_element(b'\x2a\xd7\xb1', (1000000).to_bytes(3, 'big'))
+
+    def probe(self, data):
+        file = io.BytesIO(data)
+        file.seek(5)
+        duration = probe_duration(file)
+        self.assertEqual(file.tell(), 5)
+        return duration
+
+    def test_mp4_with_moov_after_mdat(self):
+        mvhd = mp4_box(b'mvhd', bytes(12) + struct.pack('>II', 1000, 12500) + bytes(80))
+        data = mp4_box(b'ftyp', b'isom' + bytes(4)) + mp4_box(b'mdat', bytes(4096)) + mp4_box(b'moov', mvhd)
+        self.assertEqual(self.probe(data), 12.5)
+
+    def test_matroska_duration(self):
+        info = self.timecode_scale + ebml_element(b'\x44\x89', struct.pack('>d', 2500.0))
+        self.assertEqual(self.probe(make_webm(info)), 2.5)
+
+    def test_recorded_webm_uses_last_cluster(self):
+        def cluster(timecode, block_timecode):
+            block = b'\x81' + struct.pack('>h', block_timecode) + b'\x80' + b'frame'
+            return ebml_element(
+                b'\x1f\x43\xb6\x75',
+                ebml_element(b'\xe7', struct.pack('>H', timecode)) + ebml_element(b'\xa3', block),
+            )
+
+        self.assertEqual(self.probe(make_webm(self.timecode_scale, cluster(0, 40) + cluster(3000, 500))), 3.5)
+
+    @override_settings(FFPROBE_PATH='/nonexistent/ffprobe')
+    def test_unknown_container_falls_back_to_ffprobe(self):
+        self.assertIsNone(self.probe(b'not a video at all'))
+
+
+class UploadTests(MediaTestCase):
+    content = b'chunked video bytes'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', role='admin')
+        cls.course = Course.objects.create(title='AML', description='', is_published=True)
+
+    def finished_upload(self, purpose='video'):
+        upload = start_upload(self.admin, purpose, 'intro.mp4', len(self.content))
+        write_chunk(upload, 0, io.BytesIO(self.content), len(self.content), zlib.crc32(self.content))
+        return upload
+
+    def take(self, upload, purpose='video'):
+        request = RequestFactory().post('/', {'video_file_upload': upload.token.hex})
+        request.user = self.admin
+        return take_upload(request, 'video_file', purpose)
+
+    def test_take_upload_checks_purpose_and_completion(self):
+        upload = self.finished_upload()
+        self.assertIsNone(self.take(upload, 'package'))
+        self.assertIsNotNone(self.take(upload))
+
+        partial = start_upload(self.admin, 'video', 'intro.mp4', 100)
+        self.assertIsNone(self.take(partial))
+
+    def test_upload_kept_until_completed(self):
+        upload = self.finished_upload()
+        file = self.take(upload)
+        self.assertTrue(ChunkedUpload.objects.filter(pk=upload.pk).exists())
+        # A rejected form can take it again
+        self.assertIsNotNone(self.take(upload))
+
+        complete_upload(file)
+        self.assertFalse(ChunkedUpload.objects.filter(pk=upload.pk).exists())
+
+    def test_partial_file_opened_only_when_read(self):
+        file = self.take(self.finished_upload())
+        self.assertTrue(file.closed)
+        self.assertEqual(file.size, len(self.content))
+        self.assertEqual(file.read(), self.content)
+        self.assertFalse(file.closed)
+        file.close()
+        self.assertTrue(file.closed)
+
+    def test_saved_upload_is_moved_into_place(self):
+        upload = self.finished_upload()
+        file = self.take(upload)
+        video = Video(course=self.course, title='Intro')
+        video.video_file.save(file.name, file, save=False)
+        video.save()
+        complete_upload(file)
+
+        self.assertTrue(file.closed)
+        self.assertFalse(os.path.exists(partial_path(upload)))
+        with open(video.video_file.path, 'rb') as saved:
+            self.assertEqual(saved.read(), self.content)
@@ -0,0 +1,211 @@
+"""
+Thumbnails of videos, interactive modules and courses.
+
+Course lists and pages show the fixed-size WebP/JPEG variants made by
+risk_lms.images instead of the uploaded originals, which are often several
+MB. Variants are made by background jobs queued on upload.
+
+When nothing was uploaded, a source image is found and stored as the
+thumbnail. For a video, ffmpeg grabs a poster frame. For an interactive
+module, the package's own poster image is used, or else its largest image
+near the top of the package. A course without a thumbnail shows the
+thumbnail of its first video or module.
+"""
+import io
+import logging
+import os
+import subprocess
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image
+
+from courses.models import Course
+from risk_lms.background import background_task, enqueue
+from risk_lms.images import make_variants, prepare_image
+from .models import InteractiveCourse, Video
+
+logger = logging.getLogger(__name__)
+
+# The poster frame is taken 10% into the video, but no later than this
+POSTER_FRAME_MAX_SECONDS = 10
+POSTER_FRAME_MAX_WIDTH = 1280
+
+NO_THUMBNAIL = Q(thumbnail='') | Q(thumbnail=None)
+
+# Package images whose names start with one of these are used first
+PACKAGE_POSTER_NAMES = ('thumbnail', 'poster', 'preview', 'cover', 'splash')
+PACKAGE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Otherwise the largest image at most this many folders deep is used
+PACKAGE_IMAGE_MAX_DEPTH = 2
+
+STORED_THUMBNAIL_QUALITY = 85
+
+
+def grab_poster_frame(path, duration):
+    """A PIL image of a frame near the start of a video, or None"""
+    offset = min((duration or 0) * 0.1, POSTER_FRAME_MAX_SECONDS)
+    # A wrong duration may put the offset past the end
+    for seek in dict.fromkeys([offset, 0]):
+        command = [
+            settings.FFMPEG_PATH, '-hide_banner', '-nostdin', '-loglevel', 'error',
+            '-ss', f'{seek:.2f}', '-i', path,
+            '-frames:v', '1', '-vf', f"scale='min({POSTER_FRAME_MAX_WIDTH},iw)':-2",
+            '-f', 'image2pipe', '-vcodec', 'png', 'pipe:1',
+        ]
+        try:
+            result = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning('Could not grab a poster frame of %s: %s', path, e)
+            return None
+        if not result.returncode and result.stdout:
+            return Image.open(io.BytesIO(result.stdout))
+    logger.warning(
+        'Could not grab a poster frame of %s: %s', path, result.stderr.decode('utf-8', 'replace').strip()[-500:]
+    )
+    return None
+
+
+def find_package_image(interactive_course):
+    """Absolute path of the image in a package that best shows it, or None"""
+    images = [
+        (path, size)
+        for path, size in interactive_course.package_files.values_list('path', 'size')
+        if path.lower().endswith(PACKAGE_IMAGE_EXTENSIONS)
+    ]
+
+    def depth(path):
+        return path.count('/')
+
+    posters = [
+        (path, size) for path, size in images
+        if os.path.basename(path).lower().startswith(PACKAGE_POSTER_NAMES)
+    ]
+    if posters:
+        path, _ = min(posters, key=lambda image: (depth(image[0]), -image[1]))
+    else:
+        images = [(path, size) for path, size in images if depth(path) <= PACKAGE_IMAGE_MAX_DEPTH]
+        if not images:
+            return None
+        path, _ = max(images, key=lambda image: image[1])
+    return os.path.join(settings.MEDIA_ROOT, interactive_course.extracted_path, *path.split('/'))
+
+
+def _open_image(file):
+    try:
+        image = Image.open(file)
+        image.load()
+        return image
+    except (OSError, ValueError) as e:
+        logger.warning('Could not read image %s: %s', getattr(file, 'name', file), e)
+        return None
+
+
+def _open_thumbnail(obj):
+    try:
+        with obj.thumbnail.open('rb') as file:
+            return _open_image(file)
+    except OSError as e:
+        logger.warning('Could not open thumbnail %s: %s', obj.thumbnail.name, e)
+        return None
+
+
+def _save_thumbnails(obj, folder, image, store_as=None):
+    """
+    Record the variants of ``image`` on ``obj``. With ``store_as``, the image
+    is also saved as its (previously empty) thumbnail under that name.
+    """
+    fields = {'thumbnail_variants': make_variants(image, folder)}
+    if store_as:
+        buffer = io.BytesIO()
+        prepare_image(image).save(buffer, 'JPEG', quality=STORED_THUMBNAIL_QUALITY)
+        obj.thumbnail.save(store_as, ContentFile(buffer.getvalue()), save=False)
+        fields['thumbnail'] = obj.thumbnail.name
+    # Only these columns: an upload or transcode job may be saving the row too
+    type(obj).objects.filter(pk=obj.pk).update(**fields)
+    obj.thumbnail_variants = fields['thumbnail_variants']
+
+
+def _update_course(course_id):
+    if not Course.objects.filter(NO_THUMBNAIL, pk=course_id).exists():
+        return
+    generate_course_thumbnail(course_id)
+
+
+@background_task
+def generate_video_thumbnail(video_id):
+    """Make the thumbnail variants of a Video, grabbing a poster frame if it has no thumbnail"""
+    video = Video.objects.filter(pk=video_id).first()
+    if video is None:
+        return
+    store_as = None
+    if video.thumbnail:
+        image = _open_thumbnail(video)
+    elif video.video_file:
+        image = grab_poster_frame(video.video_file.path, video.duration)
+        store_as = f'video_{video_id}.jpg'
+    else:
+        return
+    if image is None:
+        return
+    _save_thumbnails(video, f'video/{video_id}', image, store_as)
+    _update_course(video.course_id)
+
+
+@background_task
+def generate_interactive_thumbnail(interactive_course_id):
+    """Make the thumbnail variants of an InteractiveCourse, using a package image if it has no thumbnail"""
+    interactive_course = InteractiveCourse.objects.filter(pk=interactive_course_id).first()
+    if interactive_course is None:
+        return
+    store_as = None
+    if interactive_course.thumbnail:
+        image = _open_thumbnail(interactive_course)
+    else:
+        path = find_package_image(interactive_course) if interactive_course.is_ready else None
+        if not path:
+            return
+        with open(path, 'rb') as file:
+            image = _open_image(file)
+        store_as = f'interactive_{interactive_course_id}.jpg'
+    if image is None:
+        return
+    _save_thumbnails(interactive_course, f'interactive/{interactive_course_id}', image, store_as)
+    _update_course(interactive_course.course_id)
+
+
+@background_task
+def generate_course_thumbnail(course_id):
+    """Make the thumbnail variants of a Course, from its first video or module if it has no thumbnail"""
+    course = Course.objects.filter(pk=course_id).first()
+    if course is None:
+        return
+    source = course
+    if not course.thumbnail:
+        # Not stored on the course, so a later upload still replaces it
+        source = (
+            course.videos.exclude(NO_THUMBNAIL).order_by('order_index', 'id').first()
+            or course.interactive_courses.exclude(NO_THUMBNAIL).order_by('order_index', 'id').first()
+        )
+        if source is None:
+            return
+    image = _open_thumbnail(source)
+    if image is None:
+        return
+    _save_thumbnails(course, f'course/{course_id}', image)
+
+
+THUMBNAIL_TASKS = {
+    Course: generate_course_thumbnail,
+    InteractiveCourse: generate_interactive_thumbnail,
+    Video: generate_video_thumbnail,
+}
+
+
+def queue_thumbnail(obj):
+    """Make the thumbnail variants of a Course, Video or InteractiveCourse once its transaction has committed"""
+    task = THUMBNAIL_TASKS[type(obj)]
+    pk = obj.pk
+    transaction.on_commit(lambda: enqueue(task, pk))
@@ -0,0 +1,285 @@
+"""
+Background transcoding of uploaded videos into HLS renditions.
+
+The upload request only stores the original and sets transcode_status
+'pending'; ``transcode_video`` then runs a single ffmpeg pass that decodes
+the source once and encodes every rendition of VIDEO_HLS_RENDITIONS no
+taller than it into VIDEO_HLS_SEGMENT_SECONDS segments. Keyframes are
+forced at the same timestamps in every rendition so players can switch
+bitrate at any segment boundary. ffmpeg writes the master playlist.
+
+Each run writes to a new folder under HLS_FOLDER/<video id>/, so the files
+at a URL never change and are served as immutable; the previous folder is
+removed once the new renditions are recorded. The original file is kept
+for browsers that cannot play HLS.
+
+A claimed video records transcode_started_at. One still 'processing' after
+VIDEO_TRANSCODE_STALE_AFTER seconds lost its worker (e.g. ffmpeg running on
+the thread pool of a recycled IIS app pool) and is queued again by the next
+``queue_video_transcode`` or ``transcode_videos`` run.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from risk_lms.background import background_task, enqueue
+from .models import Video, VideoRendition
+
+logger = logging.getLogger(__name__)
+
+# Renditions live under MEDIA_ROOT/HLS_FOLDER/<video id>/<version>/
+HLS_FOLDER = 'videos/hls'
+MASTER_PLAYLIST = 'master.m3u8'
+
+# Characters of ffmpeg's error output kept in transcode_error
+ERROR_TAIL = 2000
+
+
+class TranscodeError(Exception):
+    """ffmpeg could not transcode the video"""
+
+
+def hls_root(video_id):
+    return os.path.join(settings.MEDIA_ROOT, *HLS_FOLDER.split('/'), str(video_id))
+
+
+def probe_source(path):
+    """Width, height, duration (seconds) and whether there is audio, via ffprobe"""
+    command = [
+        settings.FFPROBE_PATH, '-v', 'error',
+        '-show_entries', 'stream=codec_type,width,height:format=duration',
+        '-of', 'json', path,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+    except FileNotFoundError:
+        raise TranscodeError(f'ffprobe not found ({settings.FFPROBE_PATH})')
+    if result.returncode:
+        raise TranscodeError(result.stderr.strip()[-ERROR_TAIL:] or 'ffprobe failed')
+
+    info = json.loads(result.stdout or '{}')
+    streams = info.get('streams', [])
+    video_stream = next((stream for stream in streams if stream.get('codec_type') == 'video'), None)
+    if not video_stream or not video_stream.get('height'):
+        raise TranscodeError('No video stream found')
+    return {
+        'width': int(video_stream['width']),
+        'height': int(video_stream['height']),
+        'duration': float(info.get('format', {}).get('duration') or 0),
+        'has_audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+    }
+
+
+def select_renditions(source_width, source_height):
+    """(name, width, height, video kbit/s, audio kbit/s) of the renditions to make"""
+    ladder = sorted(settings.VIDEO_HLS_RENDITIONS, key=lambda rendition: rendition[1])
+    selected = [rendition for rendition in ladder if rendition[1] <= source_height]
+    if not selected:
+        # Smaller than every rendition: one at the source's own height
+        name, _, video_kbps, audio_kbps = ladder[0]
+        selected = [(name, source_height - source_height % 2, video_kbps, audio_kbps)]
+
+    renditions = []
+    for name, height, video_kbps, audio_kbps in selected:
+        width = round(source_width * height / source_height / 2) * 2
+        renditions.append((name, width, height, video_kbps, audio_kbps))
+    return renditions
+
+
+def build_command(source, output_dir, renditions, has_audio):
+    """ffmpeg arguments encoding all ``renditions`` of ``source`` in one pass"""
+    segment_seconds = settings.VIDEO_HLS_SEGMENT_SECONDS
+    count = len(renditions)
+    filters = [f'[0:v]split={count}' + ''.join(f'[v{index}]' for index in range(count))]
+    filters += [
+        f'[v{index}]scale={width}:{height}[v{index}out]'
+        for index, (_, width, height, _, _) in enumerate(renditions)
+    ]
+
+    command = [
+        settings.FFMPEG_PATH, '-hide_banner', '-nostdin', '-y', '-loglevel', 'error',
+        '-progress', 'pipe:1', '-nostats',
+        '-i', source,
+        '-filter_complex', ';'.join(filters),
+    ]
+    stream_map = []
+    for index, (name, _, _, video_kbps, audio_kbps) in enumerate(renditions):
+        command += [
+            '-map', f'[v{index}out]',
+            f'-b:v:{index}', f'{video_kbps}k',
+            f'-maxrate:v:{index}', f'{video_kbps * 107 // 100}k',
+            f'-bufsize:v:{index}', f'{video_kbps * 2}k',
+        ]
+        if has_audio:
+            command += ['-map', '0:a:0', f'-b:a:{index}', f'{audio_kbps}k']
+            stream_map.append(f'v:{index},a:{index},name:{name}')
+        else:
+            stream_map.append(f'v:{index},name:{name}')
+
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        '-sc_threshold', '0', '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+    ]
+    if has_audio:
+        command += ['-c:a', 'aac', '-ac', '2']
+    command += [
+        '-f', 'hls',
+        '-hls_time', str(segment_seconds),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(output_dir, '%v', 'seg_%05d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(output_dir, '%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def run_ffmpeg(command, duration, on_progress):
+    """Run ffmpeg, reporting the percentage done from its -progress output"""
+    with tempfile.TemporaryFile() as errors:
+        try:
+            process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=errors, text=True
+            )
+        except FileNotFoundError:
+            raise TranscodeError(f'ffmpeg not found ({settings.FFMPEG_PATH})')
+
+        reported = 0
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'out_time_us' and duration and value.isdigit():
+                percent = min(99, int(int(value) / 1e6 * 100 / duration))
+                if percent > reported:
+                    reported = percent
+                    on_progress(percent)
+        process.wait()
+
+        if process.returncode:
+            errors.seek(0)
+            message = errors.read().decode('utf-8', 'replace').strip()
+            raise TranscodeError(message[-ERROR_TAIL:] or f'ffmpeg exited with status {process.returncode}')
+
+
+def _rendition_stats(output_dir, name):
+    folder = os.path.join(output_dir, name)
+    segments = [entry for entry in os.scandir(folder) if entry.name.endswith('.ts')]
+    return len(segments), sum(entry.stat().st_size for entry in segments)
+
+
+@background_task
+def transcode_video(video_id, statuses=('pending',)):
+    """Make the HLS renditions of a Video"""
+    # Only one worker may pick up a video
+    claimed = Video.objects.filter(
+        pk=video_id, transcode_status__in=list(statuses)
+    ).update(
+        transcode_status='processing', transcode_progress=0, transcode_error='', transcode_started_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    video = Video.objects.get(pk=video_id)
+    version = timezone.localtime().strftime('%Y%m%d%H%M%S%f')
+    folder = f'{HLS_FOLDER}/{video_id}/{version}'
+    output_dir = os.path.join(settings.MEDIA_ROOT, *folder.split('/'))
+
+    def update_progress(percent):
+        Video.objects.filter(pk=video_id).update(transcode_progress=percent)
+
+    try:
+        if not video.video_file:
+            raise TranscodeError('The video has no file')
+        source = video.video_file.path
+        info = probe_source(source)
+        renditions = select_renditions(info['width'], info['height'])
+        for name, _, _, _, _ in renditions:
+            os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+        # Browser recordings carry no duration in their headers
+        duration = info['duration'] or video.duration
+        run_ffmpeg(build_command(source, output_dir, renditions, info['has_audio']), duration, update_progress)
+    except TranscodeError as e:
+        _fail(video_id, output_dir, str(e))
+        return
+    except Exception as e:
+        logger.exception('Transcoding of video %s failed', video_id)
+        _fail(video_id, output_dir, str(e))
+        return
+
+    records = []
+    for name, width, height, video_kbps, audio_kbps in renditions:
+        segment_count, size = _rendition_stats(output_dir, name)
+        records.append(VideoRendition(
+            video=video, name=name, width=width, height=height,
+            video_bitrate=video_kbps, audio_bitrate=audio_kbps if info['has_audio'] else 0,
+            playlist=f'{name}/index.m3u8', segment_count=segment_count, size=size,
+        ))
+
+    previous_folder = video.hls_path
+    video.hls_path = folder
+    video.transcode_status = 'ready'
+    video.transcode_progress = 100
+    with transaction.atomic():
+        video.renditions.all().delete()
+        VideoRendition.objects.bulk_create(records)
+        video.save(update_fields=['hls_path', 'transcode_status', 'transcode_progress', 'updated_at'])
+
+    if previous_folder and previous_folder != folder:
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, *previous_folder.split('/')), ignore_errors=True)
+
+
+def _fail(video_id, output_dir, error):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    Video.objects.filter(pk=video_id).update(
+        transcode_status='failed', transcode_error=error, updated_at=timezone.now()
+    )
+
+
+def reclaim_stale_transcodes():
+    """
+    Put videos whose transcode started more than VIDEO_TRANSCODE_STALE_AFTER
+    seconds ago back in the queue; returns their ids.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'VIDEO_TRANSCODE_STALE_AFTER', 6 * 60 * 60))
+    stale = Video.objects.filter(
+        Q(transcode_started_at__lt=cutoff) | Q(transcode_started_at__isnull=True),
+        transcode_status='processing',
+    )
+    video_ids = list(stale.values_list('pk', flat=True))
+    if video_ids:
+        stale.filter(pk__in=video_ids).update(transcode_status='pending', transcode_progress=0)
+    return video_ids
+
+
+def queue_video_transcode(video):
+    """
+    Transcode a newly stored video once its transaction has committed, and
+    restart any transcode that lost its worker.
+    """
+    if not getattr(settings, 'VIDEO_TRANSCODE_ENABLED', True) or not video.video_file:
+        return
+    video.transcode_status = 'pending'
+    video.transcode_progress = 0
+    video.transcode_error = ''
+    Video.objects.filter(pk=video.pk).update(transcode_status='pending', transcode_progress=0, transcode_error='')
+    video_id = video.pk
+
+    def queue():
+        for queued_id in [video_id] + reclaim_stale_transcodes():
+            enqueue(transcode_video, queued_id)
+
+    transaction.on_commit(queue)
+
+
+def delete_hls_files(video_id):
+    """Remove every rendition folder of a video (after deleting it)"""
+    shutil.rmtree(hls_root(video_id), ignore_errors=True)
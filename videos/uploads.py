@@ -0,0 +1,216 @@
+"""
+Chunked, resumable uploads of videos and interactive packages.
+
+The browser (static/js/chunked_upload.js) starts an upload with the file's
+name and size, then posts it in CHUNKED_UPLOAD_CHUNK_SIZE chunks, each with
+its offset and CRC-32. A chunk is streamed from the request straight into
+the partial file at its offset, so a worker never holds more than one read
+block of it, and only counts once its checksum matches. After a dropped
+connection the browser asks for the received offset and carries on from
+there.
+
+The upload views then receive the finished file from ``take_upload`` as an
+AssembledUpload, which FileSystemStorage moves into place instead of
+copying it, and call ``complete_upload`` once it is saved.
+"""
+import logging
+import os
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ChunkedUpload
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the request at a time while writing a chunk
+READ_BLOCK_SIZE = 64 * 1024
+
+PARTIAL_SUFFIX = '.part'
+
+
+class UploadError(Exception):
+    """The upload or chunk was rejected"""
+
+
+class UploadOffsetError(UploadError):
+    """The chunk does not start where the upload stands"""
+
+
+class AssembledUpload(File):
+    """
+    A finished chunked upload, moved (not copied) when saved to a FileField.
+
+    The partial file is only opened when read, and closed before it is
+    moved: Windows cannot rename an open file and would copy it instead.
+    """
+
+    def __init__(self, upload):
+        self.upload = upload
+        self._path = partial_path(upload)
+        self._file = None
+        super().__init__(None, upload.filename)
+
+    @property
+    def file(self):
+        if self._file is None:
+            self._file = open(self._path, 'rb')
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
+
+    @property
+    def size(self):
+        return self.upload.size
+
+    @property
+    def closed(self):
+        return self._file is None or self._file.closed
+
+    def close(self):
+        # Reading again reopens it
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def temporary_file_path(self):
+        self.close()
+        return self._path
+
+
+def upload_root():
+    return os.path.join(settings.MEDIA_ROOT, settings.CHUNKED_UPLOAD_FOLDER)
+
+
+def partial_path(upload):
+    return os.path.join(upload_root(), upload.token.hex + PARTIAL_SUFFIX)
+
+
+def start_upload(user, purpose, filename, size):
+    """Create a ChunkedUpload and its empty partial file"""
+    if purpose not in dict(ChunkedUpload.PURPOSE_CHOICES):
+        raise UploadError('Unknown upload type')
+    filename = os.path.basename(str(filename or '').replace('\\', '/'))
+    if not filename:
+        raise UploadError('A file name is required')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('A file size is required')
+    if size <= 0:
+        raise UploadError('The file is empty')
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'The file is larger than {settings.CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)} MB')
+
+    upload = ChunkedUpload.objects.create(
+        user=user, purpose=purpose, filename=filename[:255], size=size,
+        chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    )
+    os.makedirs(upload_root(), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length, crc32):
+    """
+    Write the chunk at ``offset`` read from ``stream`` and advance the
+    upload. Raises UploadOffsetError if ``offset`` is not the received
+    offset and UploadError if the chunk is short or its CRC-32 differs.
+    """
+    if offset != upload.received:
+        raise UploadOffsetError(f'Expected offset {upload.received}')
+    expected = min(upload.chunk_size, upload.size - offset)
+    if expected <= 0:
+        raise UploadError('The upload is already complete')
+    if length != expected:
+        raise UploadError(f'Chunk must be {expected} bytes')
+
+    written = 0
+    checksum = 0
+    with open(partial_path(upload), 'r+b') as partial:
+        partial.seek(offset)
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            checksum = zlib.crc32(block, checksum)
+            partial.write(block)
+            written += len(block)
+        if written != length or checksum != crc32:
+            partial.truncate(offset)
+            raise UploadError('Chunk incomplete' if written != length else 'Chunk checksum mismatch')
+
+    # Another request may have written the same chunk meanwhile
+    advanced = ChunkedUpload.objects.filter(pk=upload.pk, received=offset).update(
+        received=offset + length, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=['received'])
+        raise UploadOffsetError(f'Expected offset {upload.received}')
+    upload.received = offset + length
+
+
+def take_upload(request, field_name, purpose):
+    """
+    The finished chunked upload of ``purpose`` whose token was posted as
+    ``<field_name>_upload``, or None. The view saves it, then calls
+    complete_upload; until then the upload can be taken again (e.g. after
+    the form was rejected).
+    """
+    token = request.POST.get(f'{field_name}_upload')
+    if not token:
+        return None
+    try:
+        upload = ChunkedUpload.objects.get(token=token, user=request.user, purpose=purpose)
+    except (ChunkedUpload.DoesNotExist, ValidationError):
+        return None
+    if not upload.is_complete or not os.path.exists(partial_path(upload)):
+        return None
+    return AssembledUpload(upload)
+
+
+def complete_upload(file):
+    """Close ``file`` and drop its ChunkedUpload once a view has saved it (other files are left alone)"""
+    if isinstance(file, AssembledUpload):
+        file.close()
+        ChunkedUpload.objects.filter(pk=file.upload.pk).delete()
+
+
+def purge_uploads(max_age_hours=None):
+    """Delete uploads idle for ``max_age_hours`` and leftover partial files; returns how many"""
+    if max_age_hours is None:
+        max_age_hours = settings.CHUNKED_UPLOAD_EXPIRY_HOURS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+
+    purged = 0
+    for upload in ChunkedUpload.objects.filter(updated_at__lt=cutoff).only('id', 'token'):
+        try:
+            os.unlink(partial_path(upload))
+        except FileNotFoundError:
+            pass
+        upload.delete()
+        purged += 1
+
+    # Partial files whose upload is gone (e.g. with its user)
+    active = {token.hex for token in ChunkedUpload.objects.values_list('token', flat=True)}
+    cutoff_timestamp = time.time() - max_age_hours * 3600
+    try:
+        entries = list(os.scandir(upload_root()))
+    except FileNotFoundError:
+        return purged
+    for entry in entries:
+        name, suffix = os.path.splitext(entry.name)
+        if suffix == PARTIAL_SUFFIX and name not in active and entry.stat().st_mtime < cutoff_timestamp:
+            try:
+                os.unlink(entry.path)
+                purged += 1
+            except OSError as e:
+                logger.warning('Could not delete %s: %s', entry.path, e)
+    return purged
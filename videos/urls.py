@@ -5,6 +5,9 @@ app_name = 'videos'
 
 urlpatterns = [
     path('<int:video_id>/', views.video_player_view, name='player'),
+    path('<int:video_id>/file/', views.video_file_view, name='video_file'),
+    path('<int:video_id>/hls/<str:version>/<path:path>', views.video_hls_file, name='video_hls'),
+    path('thumbnails/<path:path>', views.thumbnail_file, name='thumbnail'),
     path('<int:video_id>/update-progress/', views.update_progress_view, name='update_progress'),
     path('<int:video_id>/progress/', views.get_progress_view, name='get_progress'),
     path('<int:video_id>/subtitles/', views.get_subtitles_view, name='get_subtitles'),
@@ -1,8 +1,14 @@
+import os
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
+from risk_lms.images import thumbnail_root
+from risk_lms.media import safe_join, serve_file, user_can_access_course
+from .heartbeat import flush_heartbeats, get_pending_heartbeat, record_heartbeat
 from .models import Video, VideoProgress
 
 @login_required
@@ -21,18 +27,47 @@ def video_player_view(request, video_id):
     }
     return render(request, 'videos/player.html', context)
 
+@login_required
+def video_file_view(request, video_id):
+    """Stream a video file (with seeking) to users who may view its course"""
+    video = get_object_or_404(Video.objects.only('id', 'course_id', 'video_file'), id=video_id)
+    if not user_can_access_course(request.user, video.course_id):
+        return HttpResponseForbidden('You must be enrolled in this course to view content.')
+    if not video.video_file:
+        raise Http404('Video file not found')
+    # The URL stays the same when the file is replaced, so caches revalidate by ETag
+    return serve_file(request, video.video_file.path)
+
+@login_required
+def video_hls_file(request, video_id, version, path):
+    """Serve a playlist or segment of a video's current HLS renditions"""
+    video = get_object_or_404(Video.objects.only('id', 'course_id', 'hls_path', 'transcode_status'), id=video_id)
+    if not user_can_access_course(request.user, video.course_id):
+        return HttpResponseForbidden('You must be enrolled in this course to view content.')
+    if video.transcode_status != 'ready' or os.path.basename(video.hls_path) != version:
+        raise Http404('Rendition not available')
+    # Every transcode gets a new version folder, so its files never change
+    root = os.path.join(settings.MEDIA_ROOT, video.hls_path)
+    return serve_file(request, safe_join(root, path), immutable=True)
+
+@login_required
+def thumbnail_file(request, path):
+    """Serve a thumbnail variant; its name holds a hash of the image, so it never changes"""
+    return serve_file(request, safe_join(thumbnail_root(), path), immutable=True)
+
 @login_required
 @require_POST
 def update_progress_view(request, video_id):
     """AJAX endpoint to update video progress (prevent skipping)"""
-    video = get_object_or_404(Video, id=video_id)
-    progress, _ = VideoProgress.objects.get_or_create(
-        user=request.user,
-        video=video
-    )
-    
     # Handle manual completion request
     if request.POST.get('action') == 'complete':
+        video = get_object_or_404(Video, id=video_id)
+        flush_heartbeats([(request.user.id, video.id)])
+        progress, _ = VideoProgress.objects.get_or_create(
+            user=request.user,
+            video=video
+        )
+        progress.video = video
         completion_ok = False
         
         if video.duration > 0:
@@ -60,37 +95,16 @@ def update_progress_view(request, video_id):
                 'error': f'Must watch {min_requirement} to mark complete'
             })
     
-    # Regular progress update
+    # Regular progress update: buffered and written in batches, except for
+    # the ping that completes the video (see videos.heartbeat)
     watched_duration = int(request.POST.get('watched_duration', 0))
     last_position = int(request.POST.get('last_position', 0))
     
-    # Update progress
-    progress.watched_duration = max(progress.watched_duration, watched_duration)
-    progress.last_position = last_position
-    
-    # Auto-complete at 95% watched OR 60+ seconds for unknown duration
-    if video.duration > 0:
-        # For videos with known duration, use 95% rule
-        if progress.watched_duration >= video.duration * 0.95:
-            progress.is_completed = True
-            if not progress.completed_at:
-                progress.completed_at = timezone.now()
-    else:
-        # For videos with unknown duration, use time-based completion (60 seconds)
-        if progress.watched_duration >= 60:
-            progress.is_completed = True
-            if not progress.completed_at:
-                progress.completed_at = timezone.now()
-    
-    progress.save()
+    state = record_heartbeat(request.user.id, video_id, watched_duration, last_position)
+    if state is None:
+        raise Http404('Video not found')
     
-    return JsonResponse({
-        'success': True,
-        'is_completed': progress.is_completed,
-        'completion_percentage': progress.completion_percentage(),
-        'watched_duration': progress.watched_duration,
-        'last_position': progress.last_position
-    })
+    return JsonResponse({'success': True, **state})
 
 @login_required
 def get_progress_view(request, video_id):
@@ -98,6 +112,10 @@ def get_progress_view(request, video_id):
     video = get_object_or_404(Video, id=video_id)
     try:
         progress = VideoProgress.objects.get(user=request.user, video=video)
+        pending = get_pending_heartbeat(request.user.id, video.id)
+        if pending:
+            progress.watched_duration = max(progress.watched_duration, pending[0])
+            progress.last_position = pending[1]
         return JsonResponse({
             'success': True,
             'is_completed': progress.is_completed,